@@ -3,9 +3,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_bootstrap import Bootstrap
 from flask_login import LoginManager
 from config import Config
+from .replicas import RoutingSession
  
 # 1. 在全局实例化扩展，但不初始化
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession}) # 配置了只读副本时按请求读写分离
 bootstrap = Bootstrap()
 login_manager = LoginManager()
  
@@ -13,15 +14,75 @@ login_manager = LoginManager()
 login_manager.login_view = 'auth.login' # 必须指向蓝图端点
 login_manager.login_message = '请先登录以访问此页面。'
  
-def create_app():
-    # 2. 定义应用工厂
+def create_app(config_class=Config):
+    # 2. 定义应用工厂（config_class 默认为 config.py 中的 Config，基准测试等场景可以传入其子类覆盖部分配置）
     app = Flask(__name__)
-    app.config.from_object(Config) # 从 config.py 加载配置
+    app.config.from_object(config_class) # 从 config.py 加载配置
  
+    # 反向代理后面按 X-Forwarded-For 取客户端 IP（request.remote_addr）
+    if app.config['PROXY_FIX_X_FOR']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
+    # 应用日志改为后台线程写出
+    from . import logs
+    logs.init_app(app)
+
+    # 连接池参数（未显式配置 SQLALCHEMY_ENGINE_OPTIONS 时按 DB_POOL_* 生成）
+    from . import dbpool
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', dbpool.engine_options(app.config))
+
     # 3. 使用 init_app() 方法延迟初始化扩展
     db.init_app(app)
+    from .replicas import replicas
+    replicas.init_app(app)
+    dbpool.init_app(app)
     bootstrap.init_app(app)
     login_manager.init_app(app)
+
+    # 会话存储（SESSION_BACKEND 为 cookie 时保持 Flask 默认）
+    from . import sessions
+    sessions.init_app(app)
+
+    # 专业列表缓存（导入时会注册 Major 的变更订阅）
+    from .cache import major_cache
+    major_cache.init_app(app)
+
+    # 密码哈希线程池
+    from .passwords import password_hasher
+    password_hasher.init_app(app)
+
+    # 学生统计计数器
+    from .stats import student_stats
+    student_stats.init_app(app)
+
+    # 姓名搜索索引（SEARCH_NAME_INDEX 打开时使用）
+    from .search import name_index
+    name_index.init_app(app)
+
+    # 学生列表页面缓存
+    from .page_cache import page_cache
+    page_cache.init_app(app)
+
+    # 学生/专业变更事件流（导入时会注册提交事件的订阅）
+    from .feed import change_feed
+    change_feed.init_app(app)
+
+    # 限速
+    from .ratelimit import limiter
+    limiter.init_app(app)
+
+    # 带内容哈希的静态文件地址（模板中的 asset_url）和预压缩文件的分发
+    from .assets import assets
+    assets.init_app(app)
+
+    # 请求级性能统计（INSTRUMENTATION_ENABLED 打开时才注册钩子）
+    from .instrumentation import instrumentation
+    instrumentation.init_app(app)
+
+    # 用户缓存，减少每个已登录请求加载用户的查询
+    from .models import user_cache
+    user_cache.configure(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
  
     # 5. (任务三) 注册蓝图
     from .auth import auth as auth_blueprint
@@ -29,7 +90,18 @@ def create_app():
  
     from .main import main as main_blueprint
     app.register_blueprint(main_blueprint) # 主蓝图，不带前缀 (即 '/')
+
+    from .api import api as api_blueprint
+    app.register_blueprint(api_blueprint, url_prefix='/api/v1') # JSON 接口蓝图，带版本号前缀
  
+    # 模板字节码缓存和预编译（要在注册完蓝图之后，蓝图的模板目录才会被列出）
+    from .templating import template_warmup
+    template_warmup.init_app(app)
+
+    # 命令行命令（flask create-indexes 等）
+    from . import commands
+    commands.register(app)
+
     # (注意：@login_manager.user_loader 已移至 models.py)
  
     return app
\ No newline at end of file
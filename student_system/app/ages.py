@@ -0,0 +1,63 @@
+from datetime import date
+from sqlalchemy import Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+def years_before(day, years):
+    """day 往前推 years 年的同一天（2月29日在非闰年按2月28日算）"""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def age_on(birthday, today=None):
+    """按出生日期计算周岁"""
+    if birthday is None:
+        return None
+    if isinstance(birthday, str):
+        birthday = date.fromisoformat(birthday)
+    today = today or date.today()
+    return today.year - birthday.year - ((today.month, today.day) < (birthday.month, birthday.day))
+
+
+def birthday_range(min_age=None, max_age=None, today=None):
+    """
+    把年龄范围换算成出生日期范围 (最早, 最晚)，都是闭区间，不限时为 None
+    这样按年龄筛选就变成 StudentBirthday 上的范围查询，可以使用索引
+    """
+    today = today or date.today()
+    latest = years_before(today, min_age) if min_age is not None else None
+    earliest = None
+    if max_age is not None:
+        earliest = years_before(today, max_age + 1)
+        earliest = date.fromordinal(earliest.toordinal() + 1)
+    return earliest, latest
+
+
+class age_in_years(FunctionElement):
+    """SQL 表达式：按出生日期计算到今天为止的周岁，不同数据库生成不同的 SQL"""
+    type = Integer()
+    inherit_cache = True
+    name = 'age_in_years'
+
+
+@compiles(age_in_years)
+def _age_default(element, compiler, **kw):
+    birthday = compiler.process(element.clauses, **kw)
+    return (f"(EXTRACT(YEAR FROM CURRENT_DATE) - EXTRACT(YEAR FROM {birthday}) - "
+            f"CASE WHEN EXTRACT(MONTH FROM CURRENT_DATE) * 100 + EXTRACT(DAY FROM CURRENT_DATE) < "
+            f"EXTRACT(MONTH FROM {birthday}) * 100 + EXTRACT(DAY FROM {birthday}) THEN 1 ELSE 0 END)")
+
+
+@compiles(age_in_years, 'mysql')
+def _age_mysql(element, compiler, **kw):
+    return f"TIMESTAMPDIFF(YEAR, {compiler.process(element.clauses, **kw)}, CURDATE())"
+
+
+@compiles(age_in_years, 'sqlite')
+def _age_sqlite(element, compiler, **kw):
+    birthday = compiler.process(element.clauses, **kw)
+    return (f"(CAST(strftime('%Y', 'now', 'localtime') AS INTEGER) - CAST(strftime('%Y', {birthday}) AS INTEGER) - "
+            f"(strftime('%m-%d', 'now', 'localtime') < strftime('%m-%d', {birthday})))")
@@ -0,0 +1,292 @@
+import asyncio
+import io
+import logging
+from flask import Response, request
+from flask.ctx import RequestContext
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from . import db
+from .models import BasicInfo
+from .pagination import keyset_select, keyset_page
+from .exporter import student_rows_statement
+
+logger = logging.getLogger(__name__)
+
+# 同步驱动 -> 对应的异步驱动
+ASYNC_DRIVERS = {
+    'mysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_url(url):
+    """把 SQLALCHEMY_DATABASE_URI 换成异步驱动的地址（mysql+pymysql -> mysql+aiomysql 等）"""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=driver) if driver else url
+
+
+class AsyncDB:
+    """
+    异步模式（asgi.py）使用的数据库引擎和连接池，连接参数与同步引擎相同（DB_POOL_*）
+    引擎在第一次查询时才创建：它必须属于运行中的事件循环；WSGI 模式下不会用到
+    """
+
+    def __init__(self):
+        self.url = None
+        self.options = {}
+        self.engine = None
+        self._sessionmaker = None
+
+    def init_app(self, app):
+        self.url = app.config.get('ASYNC_DATABASE_URI') or async_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        self.options = {'pool_pre_ping': app.config['DB_POOL_PRE_PING']}
+        if make_url(self.url).get_backend_name() != 'sqlite':
+            self.options.update({
+                'pool_size': app.config['DB_POOL_SIZE'],
+                'max_overflow': app.config['DB_MAX_OVERFLOW'],
+                'pool_recycle': app.config['DB_POOL_RECYCLE'],
+                'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+            })
+
+    def check(self):
+        """
+        检查异步驱动是否可用（greenlet 和 aiomysql / aiosqlite 等，见 requirements-async.txt），
+        不可用时抛出 ImportError 或 ArgumentError；只导入模块，不连接数据库
+        """
+        import sqlalchemy.ext.asyncio  # noqa: F401  没有 greenlet 时导入失败
+        make_url(self.url).get_dialect().import_dbapi()
+
+    def _engine(self):
+        if self.engine is None:
+            # 可选依赖：需要 greenlet 和异步驱动（aiomysql / aiosqlite），只有使用 ASGI 入口时才导入
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+            self.engine = create_async_engine(self.url, **self.options)
+            self._sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        return self.engine
+
+    def session(self):
+        self._engine()
+        return self._sessionmaker()
+
+    async def dispose(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+
+    async def student_page(self, major_id=None, after=None, before=None, per_page=50):
+        """
+        学生列表的一页和总数，与同步的 student_page 结果相同
+        两条查询各用一个连接并发执行，所以等待时间取决于较慢的一条
+        """
+        stmt = db.select(BasicInfo).options(db.joinedload(BasicInfo.major))
+        count = db.select(db.func.count(BasicInfo.StudentID))
+        if major_id is not None:
+            stmt = stmt.where(BasicInfo.major_id == major_id)
+            count = count.where(BasicInfo.major_id == major_id)
+
+        async def fetch_rows():
+            async with self.session() as session:
+                result = await session.execute(keyset_select(stmt, BasicInfo.StudentID, after, before, per_page))
+                return result.unique().scalars().all()
+
+        async def fetch_total():
+            async with self.session() as session:
+                return await session.scalar(count)
+
+        rows, total = await asyncio.gather(fetch_rows(), fetch_total())
+        return keyset_page(rows, BasicInfo.StudentID, after, before, per_page), total
+
+    async def student_row_batches(self, major_id=None, batch_size=1000):
+        """按学号顺序分批读取导出数据，每批最多 batch_size 行（服务端游标）"""
+        async with self._engine().connect() as conn:
+            result = await conn.stream(student_rows_statement(major_id).execution_options(yield_per=batch_size))
+            async for rows in result.partitions():
+                yield rows
+
+
+aio_db = AsyncDB()
+
+
+def uses_async_db(f):
+    """标记查询数据库的异步视图：异步驱动不可用时，这些端点改由同步视图处理"""
+    f.uses_async_db = True
+    return f
+
+
+class StreamingResponse(Response):
+    """异步视图返回的流式响应：body 为异步迭代器（产出 str 或 bytes），由 AsyncApp 逐块发送"""
+
+    def __init__(self, body, **kwargs):
+        super().__init__(None, **kwargs)
+        self.body = body
+
+
+def _load_user():
+    """在线程中加载当前用户（flask_login 的 user_loader 可能查询数据库）"""
+    from flask_login import current_user
+    current_user._get_current_object()
+
+
+class AsyncApp:
+    """
+    ASGI 应用：views 中列出的端点（{端点名: 异步视图函数}）的 GET 请求在事件循环中处理，
+    数据库查询走 aio_db 的异步连接池，等待数据库时不占用线程；
+    其余请求（登录、表单提交等）交给 asgiref 的 WsgiToAsgi，在线程池中照常运行同步的 Flask 视图；
+    没有安装异步驱动时，查询数据库的端点（uses_async_db）也交给同步视图，不会因此返回500
+    异步视图运行在普通的 Flask 请求上下文中，before/after_request 钩子、错误处理、会话都和同步模式一样；
+    其中可能阻塞的同步调用（读取/保存会话、钩子、加载用户、专业缓存过期后的查询）放到线程里执行
+    """
+
+    def __init__(self, flask_app, views):
+        # 可选依赖：只有使用 ASGI 入口时才需要 asgiref
+        from asgiref.wsgi import WsgiToAsgi
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self._urls = flask_app.url_map.bind('localhost')
+        # 异步视图不经过 app.wsgi_app，客户端 IP 要在这里按 PROXY_FIX_X_FOR 单独处理
+        x_for = flask_app.config['PROXY_FIX_X_FOR']
+        self._proxy_fix = ProxyFix(lambda environ, start_response: environ, x_for=x_for) if x_for else None
+        aio_db.init_app(flask_app)
+        try:
+            aio_db.check()
+        except (ImportError, exc.ArgumentError) as e:
+            logger.warning('异步数据库驱动不可用，相关端点改由同步视图处理: %s', e)
+            views = {endpoint: view for endpoint, view in views.items() if not getattr(view, 'uses_async_db', False)}
+        self.views = views
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        view = self._match(scope)
+        if view is None:
+            return await self.wsgi(scope, receive, send)
+        await self._handle(view, scope, receive, send)
+
+    def _match(self, scope):
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return None
+        try:
+            endpoint, _ = self._urls.match(self._path_info(scope), method='GET')
+        except Exception:  # 404、405、需要重定向等情况交给 Flask 处理
+            return None
+        return self.views.get(endpoint)
+
+    async def _handle(self, view, scope, receive, send):
+        app = self.flask_app
+        environ = self._environ(scope)
+        if self._proxy_fix is not None:
+            environ = self._proxy_fix(environ, None)
+        # 会话存储可能读文件或数据库：先在线程里打开，再交给请求上下文，push 时就不再打开
+        req = app.request_class(environ)
+        req.json_module = app.json
+        session = await asyncio.to_thread(app.session_interface.open_session, app, req)
+        if session is None:
+            session = app.session_interface.make_null_session(app)
+        ctx = RequestContext(app, environ, request=req, session=session)
+        ctx.push()
+        try:
+            try:
+                try:
+                    rv = await asyncio.to_thread(app.preprocess_request)
+                    if rv is None:
+                        await asyncio.to_thread(_load_user)
+                        rv = await view(**request.view_args)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                # after_request 钩子和保存会话
+                response = await asyncio.to_thread(app.finalize_request, rv)
+            except Exception as e:
+                response = app.handle_exception(e)
+            await self._send(response, receive, send)
+        finally:
+            ctx.pop()
+
+    async def _send(self, response, receive, send):
+        streaming = isinstance(response, StreamingResponse)
+        if streaming:
+            response.headers.pop('Content-Length', None)
+        headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()]
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        if not streaming:
+            await send({'type': 'http.response.body', 'body': response.get_data()})
+            return
+        # 客户端断开后 send 不一定报错，要监听 http.disconnect 才能停止长连接（如事件流）；
+        # 等待下一段数据的同时等待断开，断开后立即结束，不必等到下一次心跳
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        body = aiter(response.body)
+        try:
+            while True:
+                chunk = asyncio.ensure_future(anext(body))
+                await asyncio.wait((chunk, disconnected), return_when=asyncio.FIRST_COMPLETED)
+                if not chunk.done():
+                    chunk.cancel()
+                    await asyncio.gather(chunk, return_exceptions=True)
+                    break
+                try:
+                    data = chunk.result()
+                except StopAsyncIteration:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    break
+                if data:
+                    await send({'type': 'http.response.body', 'more_body': True,
+                                'body': data.encode('utf-8') if isinstance(data, str) else data})
+        finally:
+            disconnected.cancel()
+            await response.body.aclose()
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await aio_db.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    def _path_info(scope):
+        path, root = scope['path'], scope.get('root_path', '')
+        return path[len(root):] if root and path.startswith(root) else path
+
+    def _environ(self, scope):
+        """由 ASGI scope 构造 WSGI environ（只用于没有请求体的 GET 请求）"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': self._path_info(scope).encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[name] = value
+                continue
+            key = f'HTTP_{name}'
+            if key in environ:
+                # 重复的请求头合并成一个（HTTP/2 会把 Cookie 拆成多个头）
+                value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+            environ[key] = value
+        return environ
@@ -0,0 +1,3 @@
+from flask import Blueprint
+api = Blueprint('api', __name__)
+from . import routes  # 导入该蓝图的路由
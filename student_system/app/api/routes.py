@@ -0,0 +1,274 @@
+from flask import jsonify, request, abort, current_app, url_for
+from . import api  # 导入当前蓝图实例
+from .. import db
+from ..models import BasicInfo, Major
+from ..cache import major_cache
+from ..decorators import admin_required
+from ..pagination import keyset_paginate
+from ..versions import conditional
+from ..main.errors import create_error_response
+from .. import importer
+from .. import batch
+from ..ratelimit import limiter
+from ..stats import student_stats
+
+# 列表接口单页最多返回的条数
+MAX_LIMIT = 500
+STUDENT_TABLES = (BasicInfo.__tablename__, Major.__tablename__)
+
+
+def student_to_dict(stud):
+    """学生序列化为字典，专业名称从专业缓存中取，不需要联表查询"""
+    major = major_cache.get(stud.major_id) if stud.major_id is not None else None
+    return {
+        'StudentID': stud.StudentID,
+        'Name': stud.Name,
+        'Gender': stud.Gender,
+        'StudentBirthday': stud.StudentBirthday.isoformat() if stud.StudentBirthday else None,
+        'Age': stud.Age,
+        'major_id': stud.major_id,
+        'major_name': major.major_name if major else None,
+    }
+
+
+def json_body(expected=dict):
+    """读取 JSON 请求体，格式不对时返回400（要求 Content-Type 为 application/json）"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, expected):
+        abort(400)
+    return data
+
+
+def student_row(data):
+    """把 JSON 学生对象转换成与导入 CSV 行相同的字符串字典，专业可以用 major_id 或 major_name 指定"""
+    if not isinstance(data, dict):
+        return {}
+    row = {k: '' if v is None else str(v) for k, v in data.items()}
+    if data.get('major_id') is not None:
+        try:
+            major = major_cache.get(int(data['major_id']))
+        except (TypeError, ValueError):
+            major = None
+        row['major_name'] = major.major_name if major else f"id={data['major_id']}"
+    return row
+
+
+def validate_student(data):
+    """用与表单相同的规则校验学生数据"""
+    choices = major_cache.choices()
+    return importer.validate_row(student_row(data), {name: major_id for major_id, name in choices}, choices)
+
+
+def validation_error(message):
+    return create_error_response(422, '数据验证失败', '提交的数据不符合要求。', message)
+
+
+def conflict(message):
+    return create_error_response(409, '数据冲突', message)
+
+
+# ---------- 学生 ----------
+
+@api.route('/students')
+@limiter.limit('RATELIMIT_API', key='user')
+@conditional(*STUDENT_TABLES)
+def list_students():
+    """学生列表：?after=<学号>&limit=<条数>&major_id=<专业id>，按学号游标分页"""
+    limit = min(request.args.get('limit', current_app.config['STUDENTS_PER_PAGE'], type=int), MAX_LIMIT)
+    query = BasicInfo.query
+    count_query = db.session.query(db.func.count(BasicInfo.StudentID))
+    major_id = request.args.get('major_id', type=int)
+    if major_id is not None:
+        query = query.filter(BasicInfo.major_id == major_id)
+        count_query = count_query.filter(BasicInfo.major_id == major_id)
+    page = keyset_paginate(query, BasicInfo.StudentID, after=request.args.get('after', type=int),
+                           before=request.args.get('before', type=int), per_page=max(limit, 1))
+    return jsonify({
+        'items': [student_to_dict(s) for s in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'total': count_query.scalar(),
+    })
+
+
+@api.route('/students/<int:StudentID>')
+@limiter.limit('RATELIMIT_API', key='user')
+@conditional(*STUDENT_TABLES)
+def get_student(StudentID):
+    stud = db.session.get(BasicInfo, StudentID)
+    if stud is None:
+        abort(404)
+    return jsonify(student_to_dict(stud))
+
+
+@api.route('/students', methods=['POST'])
+@admin_required
+def create_student():
+    values, error = validate_student(json_body())
+    if error:
+        return validation_error(error)
+    if db.session.get(BasicInfo, values['StudentID']) is not None:
+        return conflict(f"学号 {values['StudentID']} 已存在。")
+    stud = BasicInfo(**values)
+    db.session.add(stud)
+    db.session.commit()
+    response = jsonify(student_to_dict(stud))
+    response.status_code = 201
+    response.headers['Location'] = url_for('api.get_student', StudentID=stud.StudentID)
+    return response
+
+
+@api.route('/students/<int:StudentID>', methods=['PUT', 'PATCH'])
+@admin_required
+def update_student(StudentID):
+    stud = db.session.get(BasicInfo, StudentID)
+    if stud is None:
+        abort(404)
+    # PUT 和 PATCH 都允许只提交需要修改的字段，其余字段保持原值
+    data = student_to_dict(stud)
+    data.pop('major_name')
+    body = json_body()
+    if 'major_name' in body and 'major_id' not in body:
+        data.pop('major_id')
+    data.update(body)
+    values, error = validate_student(data)
+    if error:
+        return validation_error(error)
+    if values['StudentID'] != StudentID and db.session.get(BasicInfo, values['StudentID']) is not None:
+        return conflict(f"学号 {values['StudentID']} 已存在。")
+    for key, value in values.items():
+        setattr(stud, key, value)
+    db.session.commit()
+    return jsonify(student_to_dict(stud))
+
+
+@api.route('/students/<int:StudentID>', methods=['DELETE'])
+@admin_required
+def delete_student(StudentID):
+    stud = db.session.get(BasicInfo, StudentID)
+    if stud is None:
+        abort(404)
+    db.session.delete(stud)
+    db.session.commit()
+    return '', 204
+
+
+@api.route('/students/bulk', methods=['POST'])
+@admin_required
+def bulk_create_students():
+    """批量新增：请求体为学生对象数组，分批插入，返回逐条错误（index 从 0 开始）"""
+    rows = ((index, student_row(item)) for index, item in enumerate(json_body(list)))
+    report = importer.import_students(rows, batch_size=current_app.config['IMPORT_BATCH_SIZE'])
+    return jsonify({
+        'inserted': report.inserted,
+        'failed': report.failed,
+        'errors': [{'index': i, 'StudentID': sid, 'message': msg} for i, sid, msg in report.errors],
+    })
+
+
+@api.route('/students/bulk', methods=['DELETE'])
+@admin_required
+def bulk_delete_students():
+    """批量删除：请求体为 {"ids": [学号, ...]}，在一个事务中删除，返回删除的行数"""
+    ids = json_body().get('ids')
+    if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+        return validation_error('ids 必须是学号（整数）数组')
+    deleted = batch.delete_students(ids, chunk_size=current_app.config['BATCH_CHUNK_SIZE'])
+    db.session.commit()
+    return jsonify({'deleted': deleted})
+
+
+@api.route('/students/bulk', methods=['PATCH'])
+@admin_required
+def bulk_update_students():
+    """批量修改专业：请求体为 {"ids": [学号, ...], "major_id": 专业id或null}，在一个事务中修改，返回修改的行数"""
+    data = json_body()
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+        return validation_error('ids 必须是学号（整数）数组')
+    if 'major_id' not in data:
+        return validation_error('缺少 major_id')
+    major_id = data['major_id']
+    if major_id is not None and (not isinstance(major_id, int) or major_cache.get(major_id) is None):
+        return validation_error('专业不存在')
+    updated = batch.update_students(ids, {'major_id': major_id}, chunk_size=current_app.config['BATCH_CHUNK_SIZE'])
+    db.session.commit()
+    return jsonify({'updated': updated})
+
+
+@api.route('/stats')
+@limiter.limit('RATELIMIT_API', key='user')
+@conditional(*STUDENT_TABLES)
+def get_stats():
+    """统计数据：总人数、各专业人数及男女人数、总体男女人数、年龄分布"""
+    return jsonify(student_stats.summary())
+
+
+# ---------- 专业 ----------
+
+@api.route('/majors')
+@conditional(Major.__tablename__)
+def list_majors():
+    return jsonify({'items': [m._asdict() for m in major_cache.majors()]})
+
+
+@api.route('/majors/<int:major_id>')
+@conditional(Major.__tablename__)
+def get_major(major_id):
+    major = major_cache.get(major_id)
+    if major is None:
+        abort(404)
+    return jsonify(major._asdict())
+
+
+def _major_name(body):
+    name = body.get('major_name')
+    if not isinstance(name, str) or not name.strip() or len(name.strip()) > 100:
+        return None
+    return name.strip()
+
+
+@api.route('/majors', methods=['POST'])
+@admin_required
+def create_major():
+    name = _major_name(json_body())
+    if name is None:
+        return validation_error('major_name 不能为空，且不超过100个字符')
+    if Major.query.filter_by(major_name=name).first() is not None:
+        return conflict(f'专业 {name} 已存在。')
+    major = Major(major_name=name)
+    db.session.add(major)
+    db.session.commit()
+    response = jsonify({'id': major.id, 'major_name': major.major_name})
+    response.status_code = 201
+    response.headers['Location'] = url_for('api.get_major', major_id=major.id)
+    return response
+
+
+@api.route('/majors/<int:major_id>', methods=['PUT', 'PATCH'])
+@admin_required
+def update_major(major_id):
+    major = db.session.get(Major, major_id)
+    if major is None:
+        abort(404)
+    name = _major_name(json_body())
+    if name is None:
+        return validation_error('major_name 不能为空，且不超过100个字符')
+    if Major.query.filter(Major.major_name == name, Major.id != major_id).first() is not None:
+        return conflict(f'专业 {name} 已存在。')
+    major.major_name = name
+    db.session.commit()
+    return jsonify({'id': major.id, 'major_name': major.major_name})
+
+
+@api.route('/majors/<int:major_id>', methods=['DELETE'])
+@admin_required
+def delete_major(major_id):
+    major = db.session.get(Major, major_id)
+    if major is None:
+        abort(404)
+    if major.students.limit(1).count():
+        return conflict('该专业下还有学生，不能删除。')
+    db.session.delete(major)
+    db.session.commit()
+    return '', 204
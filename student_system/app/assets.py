@@ -0,0 +1,277 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+from flask import request, url_for, abort, send_file
+from werkzeug.security import safe_join
+
+# 参与构建的静态文件类型；文本类文件额外生成预压缩版本，图片额外生成缩放/WebP 版本
+ASSET_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.ico', '.woff', '.woff2',
+                    '.jpg', '.jpeg', '.png', '.gif', '.webp'}
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.ico', '.html'}
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+# 预压缩版本的后缀，按优先顺序
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+MANIFEST = 'manifest.json'
+# 带内容哈希的文件永远不会变化，浏览器可以缓存一年且不必重新验证
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(name, data, suffix=''):
+    """css/style.css -> css/style.<哈希>.css；suffix 用于图片的派生版本，如 .640"""
+    root, ext = os.path.splitext(name)
+    return f'{root}{suffix}.{content_hash(data)}{ext}'
+
+
+def _brotli():
+    try:
+        import brotli  # 可选依赖，未安装时只生成 gzip 版本
+    except ImportError:
+        return None
+    return brotli
+
+
+def compress(data):
+    """返回 {编码: 压缩后的字节}，只保留比原文件小的版本"""
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    brotli = _brotli()
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+
+def image_derivatives(data, ext, widths, quality):
+    """
+    生成缩小的同格式版本和 WebP 版本（需要 Pillow，未安装时返回 None）
+    返回原图宽度和 [(宽度, 扩展名, MIME 类型, 字节)]；只生成比原图窄的尺寸，另外加一份原尺寸的 WebP
+    """
+    try:
+        from io import BytesIO
+        from PIL import Image
+    except ImportError:
+        return None
+    with Image.open(BytesIO(data)) as image:
+        image.load()
+    width, height = image.size
+    fmt = 'JPEG' if ext in ('.jpg', '.jpeg') else 'PNG'
+    results = []
+    for target in sorted({w for w in widths if w < width} | {width}):
+        resized = image if target == width else image.resize((target, round(height * target / width)),
+                                                              Image.LANCZOS)
+        outputs = [('.webp', 'image/webp', 'WEBP', {'quality': quality, 'method': 6})]
+        if target != width:
+            options = {'quality': quality, 'optimize': True, 'progressive': True} if fmt == 'JPEG' else {'optimize': True}
+            outputs.append((ext, mimetypes.guess_type('x' + ext)[0], fmt, options))
+        for out_ext, mimetype, out_fmt, options in outputs:
+            source = resized.convert('RGB') if out_fmt == 'JPEG' and resized.mode not in ('RGB', 'L') else resized
+            buffer = BytesIO()
+            source.save(buffer, out_fmt, **options)
+            results.append((target, out_ext, mimetype, buffer.getvalue()))
+    return width, results
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):  # 文件名含内容哈希，已存在的一定相同
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+def build(source, output, widths=(320, 640, 1280), quality=80, pages=()):
+    """
+    把 source 目录下的静态文件构建到 output 目录：
+    - 每个文件复制为带内容哈希的文件名（css/style.css -> css/style.<哈希>.css），内容不变则文件名不变
+    - css/js/svg 等文本文件生成 .gz（和安装了 brotli 时的 .br）预压缩版本
+    - jpg/png 图片生成各个宽度的缩小版本和 WebP 版本（需要 Pillow）
+    - pages 中列出的 HTML 页面（相对 source 的路径）把对静态文件的引用改写为哈希文件名后复制到 output，
+      图片改写为带 WebP 和多尺寸 srcset 的 <picture>；页面本身不改名
+    output 中旧版本的文件不会删除，部署过程中仍在使用旧页面的客户端还能取到对应的文件
+    映射关系写入 output/manifest.json，返回 (manifest, 警告信息列表)
+    """
+    source, output = os.path.abspath(source), os.path.abspath(output)
+    manifest = {'files': {}, 'encodings': {}, 'images': {}}
+    warnings = []
+    for root, dirs, files in os.walk(source):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and os.path.join(root, d) != output)
+        for filename in sorted(files):
+            ext = os.path.splitext(filename)[1].lower()
+            if ext not in ASSET_EXTENSIONS:
+                continue
+            name = os.path.relpath(os.path.join(root, filename), source).replace(os.sep, '/')
+            with open(os.path.join(root, filename), 'rb') as f:
+                data = f.read()
+            hashed = hashed_name(name, data)
+            _write(os.path.join(output, hashed), data)
+            manifest['files'][name] = hashed
+            if ext in COMPRESSIBLE_EXTENSIONS:
+                _add_compressed(manifest, output, hashed, data)
+            if ext in IMAGE_EXTENSIONS:
+                derived = image_derivatives(data, ext, widths, quality)
+                if derived is None:
+                    warnings.append(f'未安装 Pillow，跳过 {name} 的缩放和 WebP 版本')
+                    continue
+                width, variants = derived
+                entries = []
+                for target, out_ext, mimetype, body in variants:
+                    variant = hashed_name(os.path.splitext(name)[0] + out_ext, body, f'.{target}')
+                    _write(os.path.join(output, variant), body)
+                    entries.append({'file': variant, 'width': target, 'type': mimetype})
+                manifest['images'][name] = {'width': width, 'variants': entries}
+    for page in pages:
+        with open(os.path.join(source, page), encoding='utf-8') as f:
+            html = rewrite_html(f.read(), manifest, os.path.dirname(page))
+        data = html.encode('utf-8')
+        path = os.path.join(output, page)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:  # 页面名不含哈希，每次构建都覆盖
+            f.write(data)
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        _add_compressed(manifest, output, page, data)
+    with open(os.path.join(output, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    if _brotli() is None:
+        warnings.append('未安装 brotli，只生成了 gzip 预压缩版本')
+    return manifest, warnings
+
+
+def _add_compressed(manifest, output, name, data):
+    variants = compress(data)
+    for encoding, suffix in ENCODINGS:
+        if encoding in variants:
+            _write(os.path.join(output, name + suffix), variants[encoding])
+    if variants:
+        manifest['encodings'][name] = [encoding for encoding, _ in ENCODINGS if encoding in variants]
+
+
+# 匹配 HTML 中的 src="..." / href="..." 属性，以及整个 <img ...> 标签
+_ATTR_RE = re.compile(r'''\b(src|href)=(["'])([^"'#?]+)\2''')
+_IMG_RE = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+
+
+def rewrite_html(html, manifest, base=''):
+    """把静态页面中的相对引用改写为哈希文件名；有派生版本的 <img> 改写为 <picture>（WebP 优先，按宽度选尺寸）"""
+    def resolve(ref):
+        return os.path.normpath(os.path.join(base, ref)).replace(os.sep, '/')
+
+    def relative(name):
+        return os.path.relpath(name, base or '.').replace(os.sep, '/')
+
+    def picture(match):
+        tag = match.group(0)
+        src = _ATTR_RE.search(tag)
+        image = manifest['images'].get(resolve(src.group(3))) if src and src.group(1) == 'src' else None
+        if image is None:
+            return tag
+        width = re.search(r'''\bwidth=["']?(\d+)''', tag)
+        sizes = f'{width.group(1)}px' if width else '100vw'
+        by_type = {}
+        for variant in image['variants']:
+            by_type.setdefault(variant['type'], []).append(f"{relative(variant['file'])} {variant['width']}w")
+        original_type = mimetypes.guess_type(src.group(3))[0]
+        # 原尺寸的原图也作为候选
+        by_type.setdefault(original_type, []).append(
+            f"{relative(manifest['files'][resolve(src.group(3))])} {image['width']}w")
+        sources = ''.join(f'<source type="{mimetype}" srcset="{", ".join(candidates)}" sizes="{sizes}">'
+                          for mimetype, candidates in by_type.items() if mimetype != original_type)
+        img = tag[:-1].rstrip('/').rstrip() + f' srcset="{", ".join(by_type[original_type])}" sizes="{sizes}">'
+        return f'<picture>{sources}{img}</picture>'
+
+    def attribute(match):
+        attr, quote, ref = match.groups()
+        hashed = manifest['files'].get(resolve(ref))
+        if hashed is None or '://' in ref or ref.startswith('/'):
+            return match.group(0)
+        return f'{attr}={quote}{relative(hashed)}{quote}'
+
+    return _ATTR_RE.sub(attribute, _IMG_RE.sub(picture, html))
+
+
+class Assets:
+    """
+    构建后静态文件的地址和分发
+    - asset_url('style.css') 返回带内容哈希的地址（ASSETS_URL_PREFIX 下），没有构建过或清单中没有时退回 /static/ 原文件
+    - 哈希地址的响应带一年的 immutable 缓存头；客户端支持时直接返回预压缩的 .br/.gz 文件
+    - 清单在第一次用到时才读取（flask build-assets 之后需重启进程生效）
+    """
+
+    def __init__(self):
+        self.directory = None
+        self._manifest = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.directory = app.config['ASSETS_DIR'] or os.path.join(app.instance_path, 'assets')
+        self._manifest = None
+        app.add_url_rule(app.config['ASSETS_URL_PREFIX'] + '/<path:filename>', 'assets', self.serve)
+        app.jinja_env.globals.update(asset_url=self.url, asset_srcset=self.srcset)
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            with self._lock:
+                if self._manifest is None:
+                    try:
+                        with open(os.path.join(self.directory, MANIFEST), encoding='utf-8') as f:
+                            self._manifest = json.load(f)
+                    except FileNotFoundError:
+                        self._manifest = {'files': {}, 'encodings': {}, 'images': {}}
+        return self._manifest
+
+    def url(self, filename):
+        hashed = self.manifest['files'].get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=hashed)
+
+    def srcset(self, filename, mimetype=None):
+        """图片各尺寸版本的 srcset，mimetype 如 'image/webp'，默认与原图同格式"""
+        image = self.manifest['images'].get(filename)
+        if image is None:
+            return ''
+        mimetype = mimetype or mimetypes.guess_type(filename)[0]
+        candidates = [f"{url_for('assets', filename=v['file'])} {v['width']}w"
+                      for v in image['variants'] if v['type'] == mimetype]
+        if mimetype == mimetypes.guess_type(filename)[0]:
+            candidates.append(f"{self.url(filename)} {image['width']}w")
+        return ', '.join(candidates)
+
+    def serve(self, filename):
+        path = safe_join(self.directory, filename)
+        if path is None or filename == MANIFEST or not os.path.isfile(path):
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        for candidate in self.manifest['encodings'].get(filename, ()):
+            if request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        if encoding is not None:
+            path += dict(ENCODINGS)[encoding]
+        response = send_file(path, mimetype=mimetype, conditional=True, max_age=31536000)
+        response.headers['Cache-Control'] = IMMUTABLE
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        if filename in self.manifest['encodings']:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+assets = Assets()
+
+
+def build_app_assets(app, widths=None, quality=None):
+    """构建应用自身的静态目录（app/static）到 ASSETS_DIR"""
+    manifest, warnings = build(app.static_folder, assets.directory,
+                               widths or app.config['ASSETS_IMAGE_WIDTHS'],
+                               quality or app.config['ASSETS_IMAGE_QUALITY'])
+    assets._manifest = None
+    return manifest, warnings
@@ -4,6 +4,8 @@ from .. import db    # 导入 app 实例
 from ..models import User
 from ..forms import LoginForm, RegisterForm
 from flask_login import login_user, logout_user, login_required, current_user
+from ..ratelimit import limiter, ip_key
+from ..decorators import use_primary
 from functools import wraps
 
 def anonymous_required(f):
@@ -19,7 +21,16 @@ def anonymous_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def login_key():
+    """
+    按客户端 IP + 提交的用户名限速，限制同一来源对同一账号的密码猜测；
+    不单独按用户名限速，否则任何人都能用错误密码把已知用户名锁在登录页外
+    """
+    return f"{ip_key()}:username:{request.form.get('username') or ''}"
+
 @auth.route('/register', methods=['GET', 'POST'])
+@use_primary # 检查用户名是否已被注册要读主库
+@limiter.limit('RATELIMIT_REGISTER', key='ip', methods=('POST',))
 @anonymous_required # 确保用户未登录时才能访问该路由
 def register():
     form = RegisterForm()
@@ -41,12 +52,18 @@ def register():
     return render_template('register.html', form=form)
 
 @auth.route('/login', methods=['GET', 'POST'])
+@limiter.limit('RATELIMIT_LOGIN', key='ip', methods=('POST',))
+@limiter.limit('RATELIMIT_LOGIN_USER', key=login_key, methods=('POST',))
 @anonymous_required # 确保用户未登录时才能访问该路由
 def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
         if user and user.check_password(form.password.data):
+            # 配置的哈希算法或代价变了，借这次登录用明文密码重新生成哈希
+            if user.password_needs_rehash():
+                user.set_password(form.password.data)
+                db.session.commit()
             login_user(user, remember=form.remember_me.data)
             flash('登录成功！', 'success')
             return redirect(url_for('main.index')) # (任务四修复)
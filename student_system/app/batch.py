@@ -0,0 +1,57 @@
+from . import db
+from .models import BasicInfo
+from .events import record_change
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _existing_ids(chunk):
+    """
+    chunk 中实际存在的学号，并锁住这些行（SELECT ... FOR UPDATE，SQLite 忽略），
+    随后的 UPDATE/DELETE 到提交为止影响的正好是这些行，变更事件只登记它们
+    """
+    return list(db.session.scalars(db.select(BasicInfo.StudentID).where(BasicInfo.StudentID.in_(chunk))
+                                   .order_by(BasicInfo.StudentID).with_for_update()))
+
+
+def delete_students(ids, chunk_size=500):
+    """
+    批量删除学生：每 chunk_size 个学号先查出其中存在的学号，再一条 DELETE ... WHERE StudentID IN (...)，
+    全部在同一个事务中执行，返回实际删除的行数（调用方负责提交）
+    """
+    ids = sorted({int(i) for i in ids})
+    deleted = 0
+    for chunk in _chunks(ids, chunk_size):
+        existing = _existing_ids(chunk)
+        if not existing:
+            continue
+        result = db.session.execute(db.delete(BasicInfo).where(BasicInfo.StudentID.in_(existing))
+                                    .execution_options(synchronize_session=False))
+        deleted += result.rowcount
+        for student_id in existing:
+            record_change(db.session, 'deleted', BasicInfo, student_id)
+    return deleted
+
+
+def update_students(ids, values, chunk_size=500):
+    """
+    批量修改学生：把 values（{列名: 新值}，如 {'major_id': 3}）写入所有选中的学生，
+    每 chunk_size 个学号先查出其中存在的学号，再一条 UPDATE ... WHERE StudentID IN (...)，全部在同一个事务中执行，
+    返回匹配的行数（调用方负责提交）
+    """
+    ids = sorted({int(i) for i in ids})
+    updated = 0
+    for chunk in _chunks(ids, chunk_size):
+        existing = _existing_ids(chunk)
+        if not existing:
+            continue
+        result = db.session.execute(db.update(BasicInfo).where(BasicInfo.StudentID.in_(existing)).values(values)
+                                    .execution_options(synchronize_session=False))
+        updated += result.rowcount
+        # 旧值未知，变更事件只带学号和新值；依赖完整列数据的订阅者（如统计计数器）会自行重新加载
+        for student_id in existing:
+            record_change(db.session, 'updated', BasicInfo, student_id, dict(values, StudentID=student_id))
+    return updated
@@ -0,0 +1,81 @@
+from collections import namedtuple
+import threading
+import time
+from . import db
+from .events import on_commit
+from .models import Major
+from . import metrics
+
+# 缓存中的专业条目，只保留模板和表单需要的字段，避免把 ORM 对象跨请求共享
+MajorItem = namedtuple('MajorItem', ['id', 'major_name'])
+
+
+class MajorCache:
+    """
+    进程内的专业列表缓存
+    专业数据很少变化，所以整体缓存一份，过期时间由 MAJOR_CACHE_TTL 控制；
+    Major 有变更提交时版本号加一，旧数据立即作废
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entry = None  # (版本号, 过期时间, 按id排序的列表, 按id索引的字典, 按名称排序的选项)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('MAJOR_CACHE_TTL', self.ttl)
+        self.invalidate()
+
+    def invalidate(self):
+        """作废当前缓存，下次访问时重新查询"""
+        with self._lock:
+            self._version += 1
+            self._entry = None
+            self.invalidations += 1
+
+    def _load(self):
+        entry = self._entry
+        if entry is not None and entry[0] == self._version and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry
+        self.misses += 1
+        version = self._version
+        majors = [MajorItem(m.id, m.major_name)
+                  for m in db.session.query(Major.id, Major.major_name).order_by(Major.id)]
+        entry = (version, time.monotonic() + self.ttl, majors,
+                 {m.id: m for m in majors},
+                 [(m.id, m.major_name) for m in sorted(majors, key=lambda m: m.major_name)])
+        with self._lock:
+            # 查询期间如果发生了失效，这份数据可能已经过时，只用于本次请求，不写回缓存
+            if self._version == version:
+                self._entry = entry
+        return entry
+
+    def majors(self):
+        """全部专业，按 id 排序（用于筛选按钮）"""
+        return self._load()[2]
+
+    def get(self, major_id):
+        """按 id 取单个专业，不存在时返回 None"""
+        return self._load()[3].get(major_id)
+
+    def choices(self):
+        """表单下拉框选项 [(id, major_name)]，按专业名称排序"""
+        return self._load()[4]
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'invalidations': self.invalidations, 'version': self._version}
+
+
+major_cache = MajorCache()
+metrics.register('major_cache', major_cache.stats)
+
+
+@on_commit(Major)
+def _invalidate_major_cache(changes):
+    major_cache.invalidate()
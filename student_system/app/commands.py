@@ -0,0 +1,80 @@
+import click
+from . import db
+from .ages import age_in_years
+from . import assets
+from . import versions
+from .models import TableVersion
+
+
+def register(app):
+    """注册自定义的 flask 命令行命令"""
+
+    @app.cli.command('create-indexes')
+    def create_indexes():
+        """为已有的数据表补建模型中声明的索引（已存在的会跳过）"""
+        with db.engine.begin() as conn:
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+                    click.echo(f'{table.name}.{index.name}')
+
+    @app.cli.command('create-version-table')
+    def create_version_table():
+        """为已有的数据库补建 JSON 接口 ETag 使用的 table_versions 表及各表的版本记录（应用第一次用到时也会自动补建）"""
+        with db.engine.begin() as conn:
+            TableVersion.__table__.create(conn, checkfirst=True)
+            versions.ensure_rows(conn)
+        click.echo(TableVersion.__tablename__)
+
+    @app.cli.command('reconcile-ages')
+    @click.option('--batch-size', default=5000, show_default=True, help='每批更新的行数')
+    def reconcile_ages(batch_size):
+        """
+        按出生日期校正 basicinfo 表中保留的 Age 列
+        按主键分段，每段一条 UPDATE ... SET Age = <由出生日期计算的年龄> WHERE Age 不一致，
+        计算全部在数据库中完成，不加载 ORM 对象；每段单独提交，不会长时间锁表
+        """
+        table = db.metadata.tables['basicinfo']
+        age = age_in_years(table.c.StudentBirthday)
+        last, updated = None, 0
+        while True:
+            # 找出本段的最后一个学号（只走主键索引）
+            bound = db.select(table.c.StudentID).order_by(table.c.StudentID).offset(batch_size - 1).limit(1)
+            if last is not None:
+                bound = bound.where(table.c.StudentID > last)
+            upper = db.session.execute(bound).scalar()
+            stmt = db.update(table).values(Age=age).where(table.c.Age != age)
+            if last is not None:
+                stmt = stmt.where(table.c.StudentID > last)
+            if upper is not None:
+                stmt = stmt.where(table.c.StudentID <= upper)
+            updated += db.session.execute(stmt).rowcount
+            db.session.commit()
+            if upper is None:
+                break
+            last = upper
+        click.echo(f'已校正 {updated} 条记录的年龄')
+
+    @app.cli.command('build-assets')
+    @click.option('--source', type=click.Path(exists=True, file_okay=False),
+                  help='要构建的静态文件目录，默认是应用的 static 目录')
+    @click.option('--output', type=click.Path(file_okay=False), help='输出目录，默认是 ASSETS_DIR')
+    @click.option('--page', 'pages', multiple=True, help='需要改写引用的 HTML 页面（相对 --source 的路径，可重复）')
+    def build_assets(source, output, pages):
+        """
+        生成带内容哈希的静态文件、预压缩版本（.gz/.br）和图片的缩放/WebP 版本，并写出 manifest.json
+        不带参数时构建应用自身的静态文件（模板中 asset_url() 使用），重启后生效；
+        也可以构建独立的静态站点，如仓库根目录的个人主页：
+            flask build-assets --source .. --output ../dist --page index.html
+        """
+        if source is None and output is None:
+            manifest, warnings = assets.build_app_assets(app)
+        else:
+            manifest, warnings = assets.build(source or app.static_folder,
+                                              output or assets.assets.directory,
+                                              app.config['ASSETS_IMAGE_WIDTHS'],
+                                              app.config['ASSETS_IMAGE_QUALITY'], pages)
+        for name, hashed in sorted(manifest['files'].items()):
+            click.echo(f'{name} -> {hashed}')
+        for warning in warnings:
+            click.echo(warning, err=True)
@@ -0,0 +1,136 @@
+import threading
+import time
+import weakref
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from . import db
+from . import metrics
+
+
+class PoolStats:
+    """连接池统计：取连接次数、等待时间、超时次数、持有时间、新建/失效连接数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+        self.connects = 0
+        self.invalidations = 0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_hold(self, seconds):
+        with self._lock:
+            self.hold_total += seconds
+            self.hold_max = max(self.hold_max, seconds)
+
+
+stats = PoolStats()
+_pools = weakref.WeakSet()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """在 QueuePool 的基础上统计取连接时的等待时间，池满等待超时也会计数"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools.add(self)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        stats.record_wait(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        _pools.add(pool)
+        return pool
+
+
+def engine_options(config):
+    """
+    根据配置生成 SQLALCHEMY_ENGINE_OPTIONS
+    pool_pre_ping 在取出连接时先探测一次，避免使用已被 MySQL 断开的连接（"MySQL server has gone away"）；
+    pool_recycle 应小于 MySQL 的 wait_timeout，让空闲连接在被服务端关闭前主动重建
+    SQLite 不使用连接队列，只保留 pre_ping
+    """
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+    if make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite':
+        return options
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    })
+    return options
+
+
+def pool_stats():
+    """当前连接池状态：累计计数 + 各连接池的实时占用"""
+    result = {
+        'checkouts': stats.checkouts,
+        'timeouts': stats.timeouts,
+        'wait_seconds_total': round(stats.wait_total, 6),
+        'wait_seconds_max': round(stats.wait_max, 6),
+        'hold_seconds_total': round(stats.hold_total, 6),
+        'hold_seconds_max': round(stats.hold_max, 6),
+        'connects': stats.connects,
+        'invalidations': stats.invalidations,
+        'size': 0,
+        'checked_out': 0,
+        'overflow': 0,
+    }
+    for pool in list(_pools):
+        result['size'] += pool.size()
+        result['checked_out'] += pool.checkedout()
+        result['overflow'] += max(pool.overflow(), 0)
+    return result
+
+
+def init_app(app):
+    """为应用的数据库引擎（主库和只读副本）注册连接池事件，并把统计注册到监控指标"""
+    from .replicas import replicas
+    with app.app_context():
+        engines = [db.engine, *replicas.engines]
+    for engine in engines:
+        _instrument(engine)
+    metrics.register('db_pool', pool_stats)
+
+
+def _instrument(engine):
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checkout_at'] = time.perf_counter()
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        start = connection_record.info.pop('checkout_at', None)
+        if start is not None:
+            stats.record_hold(time.perf_counter() - start)
+
+    @event.listens_for(engine, 'invalidate')
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
@@ -0,0 +1,30 @@
+from functools import wraps
+from flask import abort, g
+from flask_login import current_user
+
+
+def admin_required(f):
+    """
+    装饰器：确保用户具有admin角色才能访问该路由
+    未登录时返回401（页面请求会被401处理函数重定向到登录页，API请求返回JSON），非管理员返回403
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated:
+            abort(401)
+        if current_user.role != 'admin':
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def use_primary(f):
+    """
+    装饰器：视图中的所有查询都走主库（配置了只读副本时），用于先读后写的页面，
+    避免编辑表单填入副本上的旧数据、GET 删除找不到刚创建的记录
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_primary = True
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,89 @@
+from collections import namedtuple
+import logging
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# 一条数据变更：op 为 'created' / 'updated' / 'deleted'，model 为模型类，pk 为主键值
+# data 为变更后（删除时为删除前）的列值，previous 为被修改列的旧值；批量操作时二者可能为 None
+ChangeEvent = namedtuple('ChangeEvent', ['op', 'model', 'pk', 'data', 'previous'])
+
+_subscribers = {}  # 模型类 -> 回调函数列表
+
+
+def on_commit(*models):
+    """
+    装饰器：订阅指定模型的变更，事务提交成功后以 ChangeEvent 列表调用回调函数
+    回滚的事务不会触发回调，适合做缓存失效、计数器维护等
+    """
+    def decorator(f):
+        for model in models:
+            _subscribers.setdefault(model, []).append(f)
+        return f
+    return decorator
+
+
+def record_change(session, op, model, pk=None, data=None, previous=None):
+    """手动登记一条变更，用于绕过 ORM 的批量 INSERT/UPDATE/DELETE（它们不会触发 flush 事件）"""
+    session.info.setdefault('pending_changes', []).append(ChangeEvent(op, model, pk, data, previous))
+
+
+def _snapshot(state):
+    """读取实例中已加载的列值，不会触发额外的查询"""
+    return {attr.key: state.dict[attr.key]
+            for attr in state.mapper.column_attrs if attr.key in state.dict}
+
+
+def _pk(state):
+    """取实例的主键值（本应用的表都是单列主键）"""
+    if state.identity:
+        return state.identity[0]
+    return state.dict.get(state.mapper.get_property_by_column(state.mapper.primary_key[0]).key)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    """flush 之后收集本次写入的实例（此时主键已生成，修改历史还在）"""
+    for obj in session.new:
+        state = inspect(obj)
+        if type(obj) in _subscribers:
+            record_change(session, 'created', type(obj), _pk(state), _snapshot(state))
+    for obj in session.dirty:
+        if type(obj) not in _subscribers or not session.is_modified(obj, include_collections=False):
+            continue
+        state = inspect(obj)
+        previous = {}
+        for attr in state.mapper.column_attrs:
+            history = state.attrs[attr.key].history
+            if history.has_changes():
+                previous[attr.key] = history.deleted[0] if history.deleted else None
+        record_change(session, 'updated', type(obj), _pk(state), _snapshot(state), previous)
+    for obj in session.deleted:
+        state = inspect(obj)
+        if type(obj) in _subscribers:
+            record_change(session, 'deleted', type(obj), _pk(state), _snapshot(state))
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    """事务提交成功后，按模型把变更分发给订阅者"""
+    changes = session.info.pop('pending_changes', None)
+    if not changes:
+        return
+    by_model = {}
+    for change in changes:
+        by_model.setdefault(change.model, []).append(change)
+    for model, model_changes in by_model.items():
+        for callback in _subscribers.get(model, ()):
+            try:
+                callback(model_changes)
+            except Exception:
+                # 订阅者出错不能影响已经提交的请求
+                logger.exception(f"处理 {model.__name__} 变更事件失败: {callback.__name__}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    """事务回滚，丢弃尚未分发的变更"""
+    session.info.pop('pending_changes', None)
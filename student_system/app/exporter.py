@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+from . import db
+from .models import BasicInfo, Major
+
+# 导出的列，顺序即 CSV 表头顺序
+EXPORT_COLUMNS = ['StudentID', 'Name', 'Gender', 'StudentBirthday', 'Age', 'major_name']
+
+
+def student_rows(major_id=None, batch_size=1000):
+    """
+    按学号顺序逐行读取学生数据（只取列值，不构建 ORM 对象）
+    使用服务端游标 + yield_per，每次只从数据库取 batch_size 行，整表导出时内存占用恒定
+    """
+    result = db.session.execute(student_rows_statement(major_id)
+                                .execution_options(stream_results=True, yield_per=batch_size))
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def student_rows_statement(major_id=None):
+    """导出用的查询语句（同步导出和异步导出共用）"""
+    stmt = (db.select(BasicInfo.StudentID, BasicInfo.Name, BasicInfo.Gender,
+                      BasicInfo.StudentBirthday, BasicInfo.Age, Major.major_name)
+            .outerjoin(Major, BasicInfo.major_id == Major.id)
+            .order_by(BasicInfo.StudentID))
+    if major_id is not None:
+        stmt = stmt.where(BasicInfo.major_id == major_id)
+    return stmt
+
+
+def iter_csv(rows, chunk_rows=500, header=True):
+    """
+    把行数据编码成 CSV 文本块，每 chunk_rows 行输出一次，减少响应分块的数量
+    异步导出按批调用，只有第一批需要输出表头（header=True）
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows, chunk_rows=500, header=True):
+    """把行数据编码成 JSON Lines（每行一个 JSON 对象）；没有表头，header 参数只是为了与 iter_csv 的调用方式一致"""
+    chunk = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record['StudentBirthday'] = record['StudentBirthday'].isoformat() if record['StudentBirthday'] else None
+        chunk.append(json.dumps(record, ensure_ascii=False))
+        if len(chunk) >= chunk_rows:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+# 导出格式 -> (编码函数, Content-Type, 文件扩展名)
+FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson; charset=utf-8', 'ndjson'),
+}
@@ -0,0 +1,292 @@
+import asyncio
+from collections import deque
+from datetime import date
+import json
+import secrets
+import threading
+import time
+from flask import g
+from .ages import age_on
+from .events import on_commit
+from .models import BasicInfo, Major
+from .versions import versions
+from . import metrics
+
+# 推送给前端的学生字段（年龄由出生日期计算）
+STUDENT_FIELDS = ('StudentID', 'Name', 'Gender', 'StudentBirthday', 'major_id')
+# 事件流涉及的表，重连到其他进程时按它们的最近变更时间判断客户端是否错过了变更
+FEED_TABLES = (BasicInfo.__tablename__, Major.__tablename__)
+
+
+class Subscriber:
+    """
+    一个 SSE 连接的事件缓冲区，最多缓存 maxsize 条；客户端读得太慢、缓冲区满时不再追加，
+    标记为 overflowed，连接随后以 reset 事件结束，由客户端重新加载页面
+    同时支持线程中阻塞等待（同步视图）和事件循环中等待（异步视图）
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.overflowed = False
+        self.start_id = None
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._loop = None
+        self._ready = None
+
+    def push(self, item):
+        with self._cond:
+            if len(self._buffer) >= self.maxsize:
+                self.overflowed = True
+                self._buffer.clear()
+            elif not self.overflowed:
+                self._buffer.append(item)
+            self._cond.notify()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    def _take(self):
+        items = list(self._buffer)
+        self._buffer.clear()
+        return items
+
+    def wait(self, timeout):
+        """等待新事件，返回待发送的事件列表（超时返回空列表）"""
+        with self._cond:
+            if not self._buffer and not self.overflowed:
+                self._cond.wait(timeout)
+            return self._take()
+
+    async def wait_async(self, timeout):
+        if self._loop is None:
+            self._ready = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+        with self._cond:
+            if self._buffer or self.overflowed:
+                return self._take()
+            self._ready.clear()
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._cond:
+            return self._take()
+
+
+def _format(event_id, kind, payload):
+    return f'id: {event_id}\nevent: {kind}\ndata: {json.dumps(payload, ensure_ascii=False, default=_json_default)}\n\n'
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'无法序列化 {type(value).__name__}')
+
+
+class ChangeFeed:
+    """
+    学生和专业变更的进程内发布/订阅，供 /events（Server-Sent Events）推送给前端
+    - 事件在提交后由 on_commit 回调发布，每条只序列化一次，所有连接共用同一段文本
+    - 最近 history 条事件保留在内存中，断线重连时按 Last-Event-ID 补发；
+      事件 id 带有进程标识，换了进程（重启、连到别的 worker）时，若连接以来数据库中的数据没有变化（见视图中的检查）
+      则当作新连接继续，否则和缺口超出保留范围时一样发送 reset，由客户端重新加载页面
+    - 只能看到本进程提交的变更：多 worker 部署时各进程的连接只收到本进程的修改，其他修改要等重新加载
+    - 应通过 asgi.py 提供：同步（WSGI）部署中每个连接占用一个线程，连接只保持 FEED_WSGI_MAX_SECONDS 秒
+    """
+
+    def __init__(self):
+        self.epoch = secrets.token_hex(4)
+        self.heartbeat = 15
+        self.client_buffer = 100
+        self.max_clients = 500
+        self._history = deque(maxlen=1000)
+        self._seq = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.resets = 0
+
+    def init_app(self, app):
+        self.heartbeat = app.config['FEED_HEARTBEAT']
+        self.client_buffer = app.config['FEED_CLIENT_BUFFER']
+        self.max_clients = app.config['FEED_MAX_CLIENTS']
+        self._history = deque(self._history, maxlen=app.config['FEED_HISTORY'])
+        metrics.register('feed', self.stats)
+
+    def publish(self, kind, payload):
+        with self._lock:
+            self._seq += 1
+            item = (self._seq, _format(f'{self.epoch}-{self._seq}', kind, payload))
+            self._history.append(item)
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscriber in subscribers:
+            try:
+                subscriber.push(item)
+            except RuntimeError:
+                # 异步连接所在的事件循环已经关闭（进程退出、测试结束），连接不会再读取事件
+                self.unsubscribe(subscriber)
+
+    def full(self):
+        """连接数已达 FEED_MAX_CLIENTS"""
+        return len(self._subscribers) >= self.max_clients
+
+    @staticmethod
+    def parse_event_id(last_event_id):
+        """
+        事件 id 为 '<进程标识>-<序号>'；新连接开始时另外发送 '<进程标识>-<序号>-<连接时间>'，
+        让客户端重连到别的进程时能判断连接以来数据是否有变化。返回 (进程标识, 序号, 连接时间)，无法解析的部分为 None
+        """
+        epoch, _, rest = (last_event_id or '').partition('-')
+        seq, _, since = rest.partition('-')
+        return epoch or None, int(seq) if seq.isdigit() else None, int(since) if since.isdigit() else None
+
+    def foreign_since(self, last_event_id):
+        """last_event_id 来自其他进程（或重启前）且带有连接时间时返回该时间（Unix 秒），否则返回 None"""
+        epoch, seq, since = self.parse_event_id(last_event_id)
+        return since if epoch is not None and epoch != self.epoch else None
+
+    def subscribe(self, last_event_id=None):
+        """
+        新建一个订阅，连接数已满时返回 None
+        带 last_event_id 时先放入此后的历史事件；无法补全时订阅一开始就是 overflowed 状态（发送 reset）
+        """
+        subscriber = Subscriber(self.client_buffer)
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            if last_event_id:
+                epoch, seq, _ = self.parse_event_id(last_event_id)
+                oldest = self._history[0][0] if self._history else self._seq + 1
+                if epoch != self.epoch or seq is None or seq < oldest - 1:
+                    subscriber.overflowed = True
+                else:
+                    for item in self._history:
+                        if item[0] > seq:
+                            subscriber.push(item)
+            else:
+                # 新连接：客户端的数据截至此刻，重连时据此判断是否错过了变更
+                subscriber.start_id = f'{self.epoch}-{self._seq}-{int(time.time())}'
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @staticmethod
+    def _opening(subscriber):
+        if subscriber.start_id is None:
+            return 'retry: 3000\n\n'
+        # 只有 id 的事件不会触发客户端的事件回调，但会更新 Last-Event-ID
+        return f'retry: 3000\nid: {subscriber.start_id}\n\n'
+
+    def _chunks(self, subscriber, items):
+        if subscriber.overflowed:
+            self.resets += 1
+            return ['event: reset\ndata: {}\n\n']
+        # 没有新事件时发送注释行作为心跳，保持代理不断开，也能及时发现已断开的连接
+        return [text for _, text in items] or [': ping\n\n']
+
+    def stream(self, last_event_id=None, max_seconds=None):
+        """
+        同步视图的响应体：开始发送时才订阅，生成器结束或被关闭（连接断开）时取消订阅，
+        响应体没有被读取（HEAD、响应中止）时不会留下订阅
+        每个连接占用一个线程，max_seconds 秒后结束响应，浏览器按 retry 自动重连并用 Last-Event-ID 补发
+        """
+        subscriber = self.subscribe(last_event_id)
+        if subscriber is None:
+            yield 'retry: 3000\n\n'
+            return  # 检查之后连接数又满了：让客户端稍后重连
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        try:
+            yield self._opening(subscriber)
+            while True:
+                timeout = self.heartbeat
+                if deadline is not None:
+                    timeout = min(timeout, deadline - time.monotonic())
+                    if timeout <= 0:
+                        return
+                items = subscriber.wait(timeout)
+                yield from self._chunks(subscriber, items)
+                if subscriber.overflowed:
+                    return
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def stream_async(self, last_event_id=None):
+        """异步视图（asgi.py）的响应体，等待新事件时不占用线程，连接不限时长"""
+        subscriber = self.subscribe(last_event_id)
+        if subscriber is None:
+            yield 'retry: 3000\n\n'
+            return
+        try:
+            yield self._opening(subscriber)
+            while True:
+                items = await subscriber.wait_async(self.heartbeat)
+                for chunk in self._chunks(subscriber, items):
+                    yield chunk
+                if subscriber.overflowed:
+                    return
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        return {'clients': len(self._subscribers), 'published': self.published,
+                'history': len(self._history), 'resets': self.resets}
+
+
+change_feed = ChangeFeed()
+
+
+def resume_event_id(last_event_id):
+    """
+    重连到其他进程（多 worker 部署、同步模式下连接限时结束）时，若 last_event_id 记录的连接时间之后
+    学生和专业都没有变化，客户端没有错过任何变更，返回 None 当作新连接，不发送 reset、页面不必重新加载；
+    否则原样返回。有连接时间时查询一次主库上的版本表（副本可能落后）
+    """
+    since = change_feed.foreign_since(last_event_id)
+    if since is not None:
+        g.db_primary = True
+        _, modified = versions(*FEED_TABLES)
+        if modified is not None and modified.timestamp() < since:
+            return None
+    return last_event_id
+
+
+def _int(value):
+    # 表单提交的学号在写入前可能还是字符串
+    return int(value) if value is not None else None
+
+
+def student_payload(change):
+    payload = {'op': change.op, 'pk': _int(change.pk)}
+    if change.data:
+        data = {key: change.data[key] for key in STUDENT_FIELDS if key in change.data}
+        for key in ('StudentID', 'major_id'):
+            if key in data:
+                data[key] = _int(data[key])
+        if 'StudentBirthday' in data:
+            data['Age'] = age_on(data['StudentBirthday'])
+        payload['data'] = data
+    previous = _int((change.previous or {}).get('StudentID'))
+    if previous is not None and previous != payload['pk']:
+        payload['from'] = previous  # 修改了学号时，前端按旧学号找到这一行
+    return payload
+
+
+@on_commit(BasicInfo)
+def _publish_students(changes):
+    if len(changes) > change_feed.client_buffer:
+        # 批量导入/修改：逐条推送会撑满客户端缓冲区，改为通知客户端重新加载
+        change_feed.publish('reload', {'count': len(changes)})
+        return
+    for change in changes:
+        change_feed.publish('student', student_payload(change))
+
+
+@on_commit(Major)
+def _publish_majors(changes):
+    for change in changes:
+        data = change.data or {}
+        change_feed.publish('major', {'op': change.op, 'pk': change.pk, 'major_name': data.get('major_name')})
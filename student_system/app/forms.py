@@ -1,6 +1,8 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, IntegerField, DateField, SubmitField, PasswordField, BooleanField
-from wtforms.validators import InputRequired, Length, EqualTo
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import StringField, SelectField, SelectMultipleField, IntegerField, DateField, SubmitField, PasswordField, \
+    BooleanField
+from wtforms.validators import InputRequired, Length, EqualTo, Optional, Regexp, NumberRange
 
 
 class BasicForm(FlaskForm):
@@ -8,7 +10,6 @@ class BasicForm(FlaskForm):
     Name = StringField('请输入学生姓名')
     Gender = SelectField('请选择学生性别', choices=[('male', '男'), ('female', '女')])
     StudentBirthday = DateField('请输入学生出生日期', format='%Y-%m-%d')
-    Age = IntegerField('请输入学生年龄')
     # 新增 SelectField，coerce=int 确保表单返回的是整数ID
     major = SelectField('Major', coerce=int)
     submit = SubmitField('提交')
@@ -16,6 +17,31 @@ class BasicForm(FlaskForm):
 class EditForm(BasicForm):  # 继承自 BasicForm
     submit = SubmitField("修改") 
 
+class ImportForm(FlaskForm):
+    file = FileField('请选择学生信息文件（CSV 或 Excel）',
+                     validators=[FileRequired(), FileAllowed(['csv', 'xlsx'], '只支持 CSV 或 xlsx 文件')])
+    submit = SubmitField('导入')
+
+class SearchForm(FlaskForm):
+    name = StringField('姓名', validators=[Optional(), Length(max=255)])
+    name_mode = SelectField('姓名匹配方式', choices=[('contains', '包含'), ('prefix', '开头是')], default='contains')
+    student_id = StringField('学号前缀', validators=[Optional(), Regexp(r'^\d{1,10}$', message='学号只能包含数字')])
+    gender = SelectField('性别', choices=[('', '不限'), ('male', '男'), ('female', '女')], default='')
+    age_min = IntegerField('最小年龄', validators=[Optional(), NumberRange(0, 150)])
+    age_max = IntegerField('最大年龄', validators=[Optional(), NumberRange(0, 150)])
+    # 0 表示不限专业
+    major = SelectField('专业', coerce=int, default=0)
+    submit = SubmitField('搜索')
+
+class BatchForm(FlaskForm):
+    # 列表中勾选的学号，选项不固定（取决于当前页），所以不校验是否在 choices 中
+    ids = SelectMultipleField('选中的学生', coerce=int, validate_choice=False,
+                              validators=[InputRequired(message='请先勾选学生')])
+    # 0 表示改为未分配专业
+    major = SelectField('改为专业', coerce=int, default=0)
+    update = SubmitField('修改专业')
+    delete = SubmitField('删除选中')
+
 class RegisterForm(FlaskForm):
     username = StringField('用户名', validators=[InputRequired(), Length(1, 64)])
     password = PasswordField('密码', validators=[InputRequired(), Length(8, 255)])
@@ -0,0 +1,166 @@
+import csv
+import io
+from sqlalchemy import exc
+from werkzeug.datastructures import MultiDict
+from . import db
+from .models import BasicInfo
+from .forms import BasicForm
+from .events import record_change
+from .cache import major_cache
+
+# CSV 表头，与 BasicForm 的字段对应，专业用名称 major_name 表示（年龄由出生日期计算，文件中的 Age 列会被忽略）
+IMPORT_COLUMNS = ['StudentID', 'Name', 'Gender', 'StudentBirthday', 'major_name']
+# 错误报告最多保留的条数，超出部分只计数，保证超大文件导入时内存有上限
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportReport:
+    """
+    导入结果：成功条数、失败条数和逐行错误 [(行号, 学号, 错误信息)]
+    文件读到一半无法解析（编码错误、Excel 文件损坏）时 aborted 为原因，last_line 为最后读到的行，此前的批次已经提交
+    """
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.aborted = None
+        self.last_line = None
+
+    def add_error(self, line, student_id, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, student_id, message))
+
+    @property
+    def truncated(self):
+        return self.failed > len(self.errors)
+
+
+def iter_csv_rows(stream):
+    """逐行读取上传的 CSV（兼容 Excel 导出的带 BOM 的 UTF-8），产出 (行号, 行字典)"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_xlsx_rows(stream):
+    """逐行读取 .xlsx 的第一个工作表（只读模式，不会把整个文件载入内存），需要安装 openpyxl"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('导入 Excel 文件需要安装 openpyxl，或先另存为 CSV 再上传')
+    try:
+        sheet = load_workbook(stream, read_only=True, data_only=True).worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else '' for h in next(rows, ())]
+        for line, values in enumerate(rows, start=2):
+            yield line, {k: '' if v is None else (v.strftime('%Y-%m-%d') if hasattr(v, 'strftime') else str(v))
+                         for k, v in zip(header, values)}
+    except Exception as e:
+        # openpyxl 对损坏的文件会抛出各种异常（zipfile、XML 解析、KeyError 等），统一当作无法解析
+        raise ValueError(f'Excel 文件无法解析: {e}') from e
+
+
+def validate_row(row, major_ids, choices):
+    """
+    用 BasicForm 的规则校验一行数据，返回 (插入用的字典, None) 或 (None, 错误信息)
+    major_ids 为 {专业名称: id} 映射，在整个导入过程中只构建一次
+    """
+    major_name = (row.get('major_name') or '').strip()
+    if major_name not in major_ids:
+        return None, f'专业不存在: {major_name}' if major_name else '缺少专业'
+    formdata = MultiDict({k: (row.get(k) or '').strip() for k in IMPORT_COLUMNS[:-1]})
+    formdata['major'] = str(major_ids[major_name])
+    form = BasicForm(formdata=formdata, meta={'csrf': False})
+    form.major.choices = choices
+    if not form.validate():
+        return None, '; '.join(f'{name}: {", ".join(errs)}' for name, errs in form.errors.items())
+    try:
+        student_id = int(form.StudentID.data)
+    except ValueError:
+        return None, 'StudentID: 学号必须是整数'
+    if not form.Name.data:
+        return None, 'Name: 姓名不能为空'
+    return {'StudentID': student_id,
+            'Name': form.Name.data,
+            'Gender': form.Gender.data,
+            'StudentBirthday': form.StudentBirthday.data,
+            'major_id': form.major.data}, None
+
+
+def _read(rows, report):
+    """逐行产出，文件读到一半无法解析时把原因记到报告中并结束（已校验的行照常写入）"""
+    try:
+        for line, row in rows:
+            report.last_line = line
+            yield line, row
+    except ValueError as e:  # 包括 UnicodeDecodeError
+        report.aborted = str(e)
+
+
+def import_students(rows, batch_size=1000):
+    """
+    批量导入学生：逐行校验，攒够 batch_size 行后用一条 executemany INSERT 写入并提交
+    任何时候内存中最多只有一个批次的数据；每个批次单独提交，文件中途出错时返回已导入部分的报告
+    """
+    report = ImportReport()
+    choices = major_cache.choices()
+    major_ids = {name: major_id for major_id, name in choices}
+    batch = []  # [(行号, 插入字典)]
+    for line, row in _read(rows, report):
+        values, error = validate_row(row, major_ids, choices)
+        if error:
+            report.add_error(line, row.get('StudentID'), error)
+            continue
+        batch.append((line, values))
+        if len(batch) >= batch_size:
+            _insert_batch(batch, report)
+            batch = []
+    if batch:
+        _insert_batch(batch, report)
+    return report
+
+
+def _insert_batch(batch, report):
+    """写入一个批次：先用一次 IN 查询剔除已存在的学号，再一次性插入其余的行"""
+    ids = [values['StudentID'] for _, values in batch]
+    existing = {sid for (sid,) in db.session.query(BasicInfo.StudentID).filter(BasicInfo.StudentID.in_(ids))}
+    seen = set()
+    rows = []  # [(行号, 插入字典)]
+    for line, values in batch:
+        sid = values['StudentID']
+        if sid in existing:
+            report.add_error(line, sid, '学号已存在')
+        elif sid in seen:
+            report.add_error(line, sid, '文件中学号重复')
+        else:
+            seen.add(sid)
+            rows.append((line, values))
+    if not rows:
+        return
+    try:
+        db.session.execute(BasicInfo.__table__.insert(), [values for _, values in rows])
+    except exc.IntegrityError:
+        # 检查之后其他请求插入了相同的学号：整批回滚，逐行插入以找出冲突的行
+        db.session.rollback()
+        _insert_rows(rows, report)
+        return
+    for _, values in rows:
+        record_change(db.session, 'created', BasicInfo, values['StudentID'], values)
+    db.session.commit()
+    report.inserted += len(rows)
+
+
+def _insert_rows(rows, report):
+    """逐行插入并提交，冲突的行记为错误"""
+    for line, values in rows:
+        try:
+            db.session.execute(BasicInfo.__table__.insert(), [values])
+        except exc.IntegrityError:
+            db.session.rollback()
+            report.add_error(line, values['StudentID'], '学号已存在')
+            continue
+        record_change(db.session, 'created', BasicInfo, values['StudentID'], values)
+        db.session.commit()
+        report.inserted += 1
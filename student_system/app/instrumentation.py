@@ -0,0 +1,247 @@
+from bisect import bisect_left
+from collections import deque
+import logging
+import re
+import threading
+import time
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+from . import db
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# 请求耗时直方图的桶上限（秒），与 Prometheus 客户端库的默认值一致
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 每个请求最多记录多少条 SQL 用于慢请求日志，避免批量操作撑大内存
+MAX_RECORDED_STATEMENTS = 50
+
+
+class Histogram:
+    """固定分桶的直方图：各桶计数（非累计）、总和、总数"""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q):
+        """按桶估算分位数（取所在桶的上限），落在最后一个桶时返回最大的桶上限"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return LATENCY_BUCKETS[min(i, len(LATENCY_BUCKETS) - 1)]
+        return LATENCY_BUCKETS[-1]
+
+
+class EndpointStats:
+    """
+    单个端点的统计
+    latency 是自启动以来的累计直方图（Prometheus 需要单调递增的计数）；
+    另外按时间窗口保留最近几段的直方图，用来计算“最近一段时间”的分位数
+    """
+
+    def __init__(self, window, windows):
+        self.window = window
+        self.latency = Histogram()
+        self.recent = deque(maxlen=windows)
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.response_bytes = 0
+        self.errors = 0
+
+    def observe(self, record, now):
+        self.latency.observe(record['seconds'])
+        start = now - now % self.window
+        if not self.recent or self.recent[-1][0] != start:
+            self.recent.append((start, Histogram()))
+        self.recent[-1][1].observe(record['seconds'])
+        self.sql_count += record['sql_count']
+        self.sql_seconds += record['sql_seconds']
+        self.template_seconds += record['template_seconds']
+        self.response_bytes += record['response_bytes']
+        if record['status'] >= 500:
+            self.errors += 1
+
+    def rolling(self, now):
+        """最近 windows 个时间窗口合并后的直方图"""
+        merged = Histogram()
+        oldest = now - self.window * self.recent.maxlen
+        for start, hist in self.recent:
+            if start > oldest:
+                merged.merge(hist)
+        return merged
+
+
+class Instrumentation:
+    """
+    请求级性能统计（默认关闭，INSTRUMENTATION_ENABLED=1 时启用）
+    按端点记录：总耗时、SQL 条数和耗时（游标执行事件）、模板渲染耗时（模板渲染信号）、响应大小，
+    超过 SLOW_REQUEST_MS 的请求连同它执行的 SQL 一起写入慢请求日志
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_seconds = 0.5
+        self.window = 60
+        self.windows = 10
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.slow_requests = 0
+
+    def init_app(self, app):
+        self.enabled = app.config['INSTRUMENTATION_ENABLED']
+        if not self.enabled:
+            return
+        self.slow_seconds = app.config['SLOW_REQUEST_MS'] / 1000
+        self.window = app.config['INSTRUMENTATION_WINDOW']
+        self.windows = app.config['INSTRUMENTATION_WINDOWS']
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        before_render_template.connect(self._template_start, app)
+        template_rendered.connect(self._template_end, app)
+        from .replicas import replicas
+        with app.app_context():
+            engines = [db.engine, *replicas.engines]
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._sql_start)
+            event.listen(engine, 'after_cursor_execute', self._sql_end)
+        metrics.register('requests', self.stats)
+
+    # ---- 请求内的采集，数据放在 g 上，只在请求上下文中记录 ----
+
+    def _start(self):
+        g.instrumentation = {'start': time.perf_counter(), 'sql_count': 0, 'sql_seconds': 0.0,
+                             'statements': [], 'template_seconds': 0.0, 'template_start': []}
+
+    def _sql_start(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'instrumentation' in g:
+            conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _sql_end(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start')
+        if not starts or not has_request_context() or 'instrumentation' not in g:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        record = g.instrumentation
+        record['sql_count'] += 1
+        record['sql_seconds'] += elapsed
+        if len(record['statements']) < MAX_RECORDED_STATEMENTS:
+            record['statements'].append((elapsed, statement))
+
+    def _template_start(self, sender, template, context, **extra):
+        if 'instrumentation' in g:
+            g.instrumentation['template_start'].append(time.perf_counter())
+
+    def _template_end(self, sender, template, context, **extra):
+        if 'instrumentation' in g and g.instrumentation['template_start']:
+            g.instrumentation['template_seconds'] += time.perf_counter() - g.instrumentation['template_start'].pop()
+
+    def _finish(self, response):
+        record = g.pop('instrumentation', None)
+        if record is None:
+            return response
+        record['seconds'] = time.perf_counter() - record['start']
+        record['status'] = response.status_code
+        # 流式响应（如导出）在这里还不知道总长度，按0计
+        record['response_bytes'] = response.content_length or 0
+        endpoint = request.endpoint or 'unmatched'
+        now = time.time()
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats(self.window, self.windows)
+            stats.observe(record, now)
+        if record['seconds'] >= self.slow_seconds:
+            self.slow_requests += 1
+            self._log_slow(endpoint, record)
+        return response
+
+    def _log_slow(self, endpoint, record):
+        statements = sorted(record['statements'], key=lambda s: s[0], reverse=True)
+        lines = [f"慢请求 {request.method} {request.full_path.rstrip('?')} ({endpoint}): "
+                 f"{record['seconds'] * 1000:.1f}ms，SQL {record['sql_count']} 条共 {record['sql_seconds'] * 1000:.1f}ms，"
+                 f"模板 {record['template_seconds'] * 1000:.1f}ms"]
+        for elapsed, statement in statements[:10]:
+            lines.append(f"  {elapsed * 1000:.1f}ms  {' '.join(statement.split())}")
+        logger.warning('\n'.join(lines))
+
+    # ---- 输出 ----
+
+    def stats(self):
+        """各端点最近一段时间的请求数和耗时分位数（毫秒），供 JSON 格式的监控端点使用"""
+        now = time.time()
+        result = {'slow_requests': self.slow_requests}
+        with self._lock:
+            for endpoint, stats in sorted(self._endpoints.items()):
+                recent = stats.rolling(now)
+                result[endpoint] = {
+                    'count': stats.latency.count,
+                    'recent_count': recent.count,
+                    'recent_p50_ms': _ms(recent.quantile(0.5)),
+                    'recent_p95_ms': _ms(recent.quantile(0.95)),
+                    'recent_p99_ms': _ms(recent.quantile(0.99)),
+                    'avg_sql_count': round(stats.sql_count / stats.latency.count, 2),
+                }
+        return result
+
+    def prometheus(self):
+        """Prometheus 文本格式：请求耗时直方图、SQL/模板/响应大小计数器，以及其他模块注册的指标"""
+        lines = []
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines += ['# HELP http_request_duration_seconds 请求处理耗时',
+                      '# TYPE http_request_duration_seconds histogram']
+            for endpoint, stats in endpoints:
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS + ('+Inf',), stats.latency.counts):
+                    cumulative += n
+                    lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats.latency.sum}')
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats.latency.count}')
+            for name, attr, help_text in (
+                    ('http_request_sql_statements_total', 'sql_count', '请求中执行的 SQL 条数'),
+                    ('http_request_sql_seconds_total', 'sql_seconds', '请求中执行 SQL 的耗时'),
+                    ('http_request_template_seconds_total', 'template_seconds', '请求中渲染模板的耗时'),
+                    ('http_response_bytes_total', 'response_bytes', '响应体大小（不含流式响应）'),
+                    ('http_request_errors_total', 'errors', '5xx 响应数')):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for endpoint, stats in endpoints:
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {getattr(stats, attr)}')
+        lines += ['# TYPE http_slow_requests_total counter', f'http_slow_requests_total {self.slow_requests}']
+        for source, values in metrics.collect().items():
+            if source == 'requests':
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'{_metric_name(source, key)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _metric_name(source, key):
+    return 'student_system_' + re.sub(r'[^a-zA-Z0-9_]', '_', f'{source}_{key}')
+
+
+instrumentation = Instrumentation()
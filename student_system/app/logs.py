@@ -0,0 +1,126 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from .lru import LRUCache
+from . import metrics
+
+
+class SamplingFilter(logging.Filter):
+    """
+    对带 sample_key 的日志采样（logger.warning(..., extra={'sample_key': (分组, 键)})）：
+    每个窗口内同一个键最多记录 repeats 条，同一分组（如 404）最多记录 limit 条，其余丢弃并计数，
+    下一条通过的同组日志末尾附上上个窗口丢弃的条数；没有 sample_key 的日志不受影响
+    """
+
+    def __init__(self, window=60, repeats=1, limit=100, maxkeys=10000):
+        super().__init__()
+        self.window = window
+        self.repeats = repeats
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._keys = LRUCache(maxsize=maxkeys)  # 随机路径的扫描不会让计数表无限增长
+        self._groups = {}
+        self._suppressed = {}
+        self.sampled = 0
+
+    def filter(self, record):
+        sample_key = getattr(record, 'sample_key', None)
+        if sample_key is None:
+            return True
+        group = sample_key[0]
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start = now
+                self._keys.clear()
+                self._groups.clear()
+            count = self._keys.get(sample_key) or 0
+            group_count = self._groups.get(group, 0)
+            if count >= self.repeats or group_count >= self.limit:
+                self._suppressed[group] = self._suppressed.get(group, 0) + 1
+                self.sampled += 1
+                return False
+            self._keys.set(sample_key, count + 1)
+            self._groups[group] = group_count + 1
+            suppressed = self._suppressed.pop(group, 0)
+        if suppressed:
+            record.msg = f'{record.msg}（此前另有 {suppressed} 条同类日志被采样丢弃）'
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    把日志放进内存队列，由后台线程写出，请求线程不做格式化和磁盘 I/O
+    队列满时直接丢弃并计数，不阻塞请求；后台线程在第一条日志时按进程启动（兼容 gunicorn --preload 的 fork）
+    """
+
+    def __init__(self, handlers, maxsize):
+        super().__init__(queue.Queue(maxsize))
+        self.handlers = handlers
+        self.listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.dropped = 0
+
+    def _ensure_listener(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+                    self.listener.start()
+                    self._pid = os.getpid()
+                    atexit.register(self.listener.stop)
+
+    def prepare(self, record):
+        # 同一进程内的队列不需要像默认实现那样在请求线程里完整格式化；只合并参数，
+        # 避免后台线程格式化时参数对象已被修改。异常堆栈留给后台线程格式化
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+            self.queued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self):
+        return {'queued': self.queued, 'dropped': self.dropped, 'pending': self.queue.qsize()}
+
+
+def _effective_handlers(logger):
+    """日志记录实际会经过的所有 handler（沿 logger 层级向上，直到 propagate=False）"""
+    handlers = []
+    while logger is not None:
+        handlers.extend(logger.handlers)
+        if not logger.propagate:
+            break
+        logger = logger.parent
+    return handlers
+
+
+def init_app(app):
+    """
+    LOG_QUEUE_ENABLED 打开时，把应用日志（app.logger 及 app.* 模块的 logger）原本的输出 handler
+    移到后台线程，应用 logger 只保留一个带采样过滤的非阻塞队列 handler
+    """
+    if not app.config['LOG_QUEUE_ENABLED']:
+        return
+    logger = app.logger  # 第一次访问时 Flask 会按需加上默认的 stderr handler
+    if any(isinstance(h, NonBlockingQueueHandler) for h in logger.handlers):
+        return  # 同一进程中多次 create_app
+    handler = NonBlockingQueueHandler(_effective_handlers(logger), app.config['LOG_QUEUE_SIZE'])
+    sampler = SamplingFilter(app.config['LOG_SAMPLE_WINDOW'], app.config['LOG_SAMPLE_REPEATS'],
+                             app.config['LOG_SAMPLE_LIMIT'])
+    handler.addFilter(sampler)
+    logger.handlers = [handler]
+    logger.propagate = False
+    metrics.register('logging', lambda: dict(handler.stats(), sampled=sampler.sampled))
@@ -0,0 +1,111 @@
+import asyncio
+from functools import wraps
+from flask import render_template, request, current_app, abort, make_response
+from markupsafe import Markup
+from ..aio import aio_db, StreamingResponse, uses_async_db
+from ..cache import major_cache
+from ..page_cache import page_cache
+from ..ratelimit import limiter, user_key
+from .. import exporter
+from ..feed import change_feed, resume_event_id
+from .routes import render_index
+
+# 异步模式（asgi.py）下由事件循环处理的只读端点，与 routes.py 中同名视图的行为一致：
+# 同样的限速、页面缓存、模板和响应，只是数据库查询通过 aio_db 异步执行
+
+
+def listing_view(f):
+    """相当于同步视图上的 @limiter.limit('RATELIMIT_LISTING', key='user') + @page_cache.cached_page"""
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        if limiter.enabled:
+            await asyncio.to_thread(limiter.check, 'RATELIMIT_LISTING', user_key, request.endpoint)
+        key = page_cache.page_key()
+        body = page_cache.get_page(key)
+        if body is not None:
+            return make_response(body)
+        response = make_response(await f(*args, **kwargs))
+        page_cache.put_page(key, response)
+        return response
+    return decorated_function
+
+
+async def render_listing(major_id=None):
+    """异步版的 render_listing：列表片段未命中缓存时异步查询"""
+    key = page_cache.fragment_key()
+    value = page_cache.get_fragment(key)
+    if value is None:
+        page, total = await aio_db.student_page(major_id,
+                                                after=request.args.get('after', type=int),
+                                                before=request.args.get('before', type=int),
+                                                per_page=current_app.config['STUDENTS_PER_PAGE'])
+        value = Markup(render_template('_students.html', studs=page.items, page=page)), total
+        page_cache.put_fragment(key, value)
+    # 外层页面要用专业列表（缓存过期时会同步查询），放到线程里渲染
+    return await asyncio.to_thread(render_index, *value)
+
+
+@uses_async_db
+@listing_view
+async def index():
+    return await render_listing()
+
+
+@uses_async_db
+@listing_view
+async def filter_by_major(major_id):
+    major = await asyncio.to_thread(major_cache.get, major_id)
+    if major is None:
+        abort(404)
+    return await render_listing(major.id)
+
+
+@uses_async_db
+async def export():
+    """异步版的流式导出，参数与 /export 相同"""
+    if limiter.enabled:
+        await asyncio.to_thread(limiter.check, 'RATELIMIT_EXPORT', user_key, request.endpoint)
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exporter.FORMATS:
+        abort(400)
+    major_id = request.args.get('major_id', type=int)
+    if major_id is not None and await asyncio.to_thread(major_cache.get, major_id) is None:
+        abort(404)
+    encode, content_type, ext = exporter.FORMATS[fmt]
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+
+    async def body():
+        first = True
+        async for rows in aio_db.student_row_batches(major_id, batch_size):
+            for chunk in encode(rows, header=first):
+                yield chunk
+            first = False
+        if first:  # 没有数据时也要输出表头
+            for chunk in encode([]):
+                yield chunk
+
+    response = StreamingResponse(body(), content_type=content_type)
+    response.headers['Content-Disposition'] = f'attachment; filename=students.{ext}'
+    return response
+
+
+async def events():
+    """异步版的变更事件流：等待新事件时不占用线程，一个进程可以保持大量连接"""
+    if limiter.enabled:
+        await asyncio.to_thread(limiter.check, 'RATELIMIT_EVENTS', user_key, request.endpoint)
+    if change_feed.full():
+        abort(503)
+    last_event_id = await asyncio.to_thread(resume_event_id, request.headers.get('Last-Event-ID')
+                                            or request.args.get('last_event_id'))
+    stream = change_feed.stream_async(last_event_id)
+    return StreamingResponse(stream, content_type='text/event-stream; charset=utf-8',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# 端点名 -> 异步视图
+ASYNC_VIEWS = {
+    'main.index': index,
+    'main.filter_by_major': filter_by_major,
+    'main.export': export,
+    'main.events': events,
+}
@@ -1,15 +1,50 @@
-from flask import render_template, request, jsonify, flash, redirect, url_for
+from flask import render_template, request, jsonify, flash, redirect, url_for, make_response, session
+from flask_login import current_user
 from . import main
+from ..passwords import HashQueueFull
 import logging
 import traceback
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
 
+# 渲染好的错误页面：(模板, 应用根路径, 模板参数) -> HTML
+_error_pages = {}
+
+def log_client_error(code, message):
+    """
+    记录 4xx 错误：参数惰性格式化，被过滤或采样丢弃的日志不做字符串拼接；
+    同一状态码、同一路径的重复错误按 LOG_SAMPLE_* 配置采样（见 app/logs.py）
+    """
+    logger.warning('%d错误 - %s: %s %s', code, message, request.method, request.url,
+                   extra={'sample_key': (code, request.path)})
+
+def error_page(template, status, **context):
+    """
+    错误页面的 HTML 响应。页面内容只取决于模板参数，所以匿名且没有待显示 flash 消息的请求
+    （如扫描随机地址的爬虫）直接使用第一次渲染的结果；已登录用户的导航栏里有用户名，照常渲染
+    """
+    if current_user.is_authenticated or session.get('_flashes'):
+        body = render_template(template, **context)
+    else:
+        key = (template, request.script_root, tuple(sorted(context.items())))
+        body = _error_pages.get(key)
+        if body is None:
+            body = _error_pages[key] = render_template(template, **context)
+    response = make_response(body, status)
+    response.vary.add('Accept')  # 同一地址按 Accept 返回 HTML 或 JSON
+    return response
+
+def wants_json():
+    """是否应返回JSON：AJAX请求，或者 /api/ 下的接口请求"""
+    if request.path.startswith('/api/'):
+        return True
+    return request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html
+
 def create_error_response(error_code, error_name, error_description, error_details=None):
     """创建统一的错误响应"""
-    # 如果是AJAX请求，返回JSON响应
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    # 如果是AJAX或API请求，返回JSON响应
+    if wants_json():
         response_data = {
             'error': error_name,
             'message': error_description,
@@ -20,32 +55,42 @@ def create_error_response(error_code, error_name, error_description, error_detai
         
         response = jsonify(response_data)
         response.status_code = error_code
+        response.vary.add('Accept')
         return response
     
-    # 对于普通请求，渲染错误页面
-    return render_template(
+    # 对于普通请求，渲染错误页面（带详细信息的页面每次内容不同，不缓存）
+    if error_details:
+        return render_template(
+            'errors/generic.html',
+            error_code=error_code,
+            error_name=error_name,
+            error_description=error_description,
+            error_details=error_details
+        ), error_code
+    return error_page(
         'errors/generic.html',
+        error_code,
         error_code=error_code,
         error_name=error_name,
-        error_description=error_description,
-        error_details=error_details
-    ), error_code
+        error_description=error_description
+    )
 
 @main.app_errorhandler(404)
 def page_not_found(e):
      """处理404页面未找到错误"""
-     logger.warning(f"404错误 - 请求的页面不存在: {request.url}")
+     log_client_error(404, '请求的页面不存在')
+     # 请求路径只放在 JSON 中，HTML 页面与地址无关，可以缓存
      return create_error_response(
          404, 
          '页面未找到', 
          '请求的页面不存在，请检查URL是否正确。',
-         f"请求路径: {request.url}"
+         f"请求路径: {request.url}" if wants_json() else None
      )
 
 @main.app_errorhandler(500)
 def internal_server_error(e):
     """处理500服务器内部错误"""
-    logger.error(f"500错误 - 服务器内部错误: {str(e)}")
+    logger.error('500错误 - 服务器内部错误: %s', e)
     # 在开发环境中显示详细错误信息
     error_details = None
     from flask import current_app
@@ -62,10 +107,10 @@ def internal_server_error(e):
 @main.app_errorhandler(403)
 def forbidden(e):
     """处理403禁止访问错误"""
-    logger.warning(f"403错误 - 禁止访问: {request.url}")
+    log_client_error(403, '禁止访问')
     
-    # 如果是AJAX请求，返回JSON响应
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    # 如果是AJAX或API请求，返回JSON响应
+    if wants_json():
         return create_error_response(
             403,
             '禁止访问',
@@ -73,15 +118,15 @@ def forbidden(e):
             f"请求路径: {request.url}"
         )
     
-    return render_template('errors/403.html'), 403
+    return error_page('errors/403.html', 403)
 
 @main.app_errorhandler(400)
 def bad_request(e):
     """处理400错误请求错误"""
-    logger.warning(f"400错误 - 错误请求: {request.url}")
+    log_client_error(400, '错误请求')
     
-    # 如果是AJAX请求，返回JSON响应
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    # 如果是AJAX或API请求，返回JSON响应
+    if wants_json():
         return create_error_response(
             400,
             '错误请求',
@@ -89,15 +134,15 @@ def bad_request(e):
             f"请求路径: {request.url}"
         )
     
-    return render_template('errors/400.html'), 400
+    return error_page('errors/400.html', 400)
 
 @main.app_errorhandler(401)
 def unauthorized(e):
     """处理401未授权错误"""
-    logger.warning(f"401错误 - 未授权访问: {request.url}")
+    log_client_error(401, '未授权访问')
     
-    # 如果是AJAX请求，返回JSON响应
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    # 如果是AJAX或API请求，返回JSON响应
+    if wants_json():
         response = jsonify({
             'error': '未授权',
             'message': '请先登录以访问此页面',
@@ -113,10 +158,10 @@ def unauthorized(e):
 @main.app_errorhandler(405)
 def method_not_allowed(e):
     """处理405方法不允许错误"""
-    logger.warning(f"405错误 - 方法不允许: {request.method} {request.url}")
+    log_client_error(405, '方法不允许')
     
-    # 如果是AJAX请求，返回JSON响应
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    # 如果是AJAX或API请求，返回JSON响应
+    if wants_json():
         return create_error_response(
             405,
             '方法不允许',
@@ -124,15 +169,15 @@ def method_not_allowed(e):
             f"请求路径: {request.url}"
         )
     
-    return render_template('errors/405.html'), 405
+    return error_page('errors/405.html', 405)
 
 @main.app_errorhandler(413)
 def request_entity_too_large(e):
     """处理413请求实体过大错误"""
-    logger.warning(f"413错误 - 请求实体过大: {request.url}")
+    log_client_error(413, '请求实体过大')
     
-    # 如果是AJAX请求，返回JSON响应
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    # 如果是AJAX或API请求，返回JSON响应
+    if wants_json():
         return create_error_response(
             413,
             '请求实体过大',
@@ -140,15 +185,15 @@ def request_entity_too_large(e):
             f"请求路径: {request.url}"
         )
     
-    return render_template('errors/413.html'), 413
+    return error_page('errors/413.html', 413)
 
 @main.app_errorhandler(429)
 def too_many_requests(e):
     """处理429请求过多错误"""
-    logger.warning(f"429错误 - 请求过多: {request.url}")
+    log_client_error(429, '请求过多')
     
-    # 如果是AJAX请求，返回JSON响应
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    # 如果是AJAX或API请求，返回JSON响应
+    if wants_json():
         return create_error_response(
             429,
             '请求过多',
@@ -156,14 +201,19 @@ def too_many_requests(e):
             f"请求路径: {request.url}"
         )
     
-    return render_template('errors/429.html'), 429
+    return error_page('errors/429.html', 429)
+
+@main.app_errorhandler(HashQueueFull)
+def hash_queue_full(e):
+    """密码哈希排队已满（登录、注册请求过多），按429处理"""
+    return too_many_requests(e)
 
 def handle_database_error(e):
     """处理数据库相关错误"""
-    logger.error(f"数据库错误: {str(e)}")
+    logger.error('数据库错误: %s', e)
     
-    # 如果是AJAX请求，返回JSON响应
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    # 如果是AJAX或API请求，返回JSON响应
+    if wants_json():
         response = jsonify({
             'error': '数据库错误',
             'message': '数据库操作失败，请稍后重试',
@@ -177,10 +227,10 @@ def handle_database_error(e):
 
 def handle_validation_error(e):
     """处理数据验证错误"""
-    logger.warning(f"数据验证错误: {str(e)}")
+    logger.warning('数据验证错误: %s', e)
     
-    # 如果是AJAX请求，返回JSON响应
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    # 如果是AJAX或API请求，返回JSON响应
+    if wants_json():
         response = jsonify({
             'error': '数据验证失败',
             'message': str(e),
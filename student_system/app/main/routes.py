@@ -1,19 +1,83 @@
-from flask import render_template, redirect, url_for, flash
+from flask import render_template, redirect, url_for, flash, request, current_app, abort, jsonify, \
+    Response, stream_with_context
+from markupsafe import Markup
 from . import main
 from .. import db
-from ..models import BasicInfo, Major
-from ..forms import BasicForm, EditForm
+from ..models import BasicInfo
+from ..forms import BasicForm, EditForm, ImportForm, SearchForm, BatchForm
+from ..pagination import keyset_paginate
+from ..cache import major_cache
+from ..decorators import admin_required, use_primary
+from .. import metrics
+from .. import importer
+from .. import exporter
+from .. import batch
+from ..search import search_query
+from ..ratelimit import limiter
+from ..page_cache import page_cache
+from ..stats import student_stats
+from ..instrumentation import instrumentation
+from ..feed import change_feed, resume_event_id
 from flask_login import login_required, current_user # (用于权限控制)
 from datetime import datetime
 
+def student_page(query, count_query):
+    """
+    按 StudentID 游标分页，返回 (当前页, 总数)；总数用 COUNT 查询得到，不再把整张表读进内存
+    注意：传入的 query 应带上 joinedload(BasicInfo.major)，模板里的 stud.major 才不会每行各查一次
+    """
+    page = keyset_paginate(query, BasicInfo.StudentID,
+                           after=request.args.get('after', type=int),
+                           before=request.args.get('before', type=int),
+                           per_page=current_app.config['STUDENTS_PER_PAGE'])
+    total = count_query.scalar()
+    return page, total
+
+def render_listing(query, count_query):
+    """
+    渲染学生列表页（index.html）：学生列表片段连同总数一起放进页面缓存，
+    query / count_query 是无参函数，只有缓存未命中时才会构造并执行查询
+    """
+    def render_rows():
+        page, total = student_page(query(), count_query())
+        return Markup(render_template('_students.html', studs=page.items, page=page)), total
+    rows_html, total = page_cache.fragment(render_rows)
+    return render_index(rows_html, total)
+
+def render_index(rows_html, total):
+    """用已渲染好的学生列表片段渲染 index.html（异步视图 async_views.py 也使用）"""
+    majors = major_cache.majors() # 专业列表走进程内缓存
+    return render_template('index.html', rows_html=rows_html, total=total, majors=majors,
+                           batch_form=batch_form())
+
+def batch_form():
+    """管理员在列表页上使用的批量操作表单，其他用户返回 None（列表中也不显示勾选框）"""
+    if not (current_user.is_authenticated and current_user.role == 'admin'):
+        return None
+    form = BatchForm()
+    form.major.choices = [(0, '未分配专业')] + major_cache.choices()
+    return form
+
+@main.app_template_global()
+def page_url(**cursor):
+    """生成翻页链接：保留当前页面的路径参数和查询参数，只替换游标"""
+    args = request.args.to_dict()
+    args.pop('after', None)
+    args.pop('before', None)
+    args.update(request.view_args or {})
+    args.update(cursor)
+    return url_for(request.endpoint, **args)
+
 @main.route('/') # 类中自带route方法，使用@app.route()装饰器定义路由
+@limiter.limit('RATELIMIT_LISTING', key='user')
+@page_cache.cached_page # 匿名用户直接返回缓存的整页
 def index(): #当访问根URL时，调用index函数
-    studs = BasicInfo.query.all() # 查询所有学生信息
-    majors = Major.query.all() # 查询所有专业
-    return render_template('index.html', studs=studs, majors=majors) # 渲染模板index.html，传递参数studs和majors
+    return render_listing(lambda: BasicInfo.query.options(db.joinedload(BasicInfo.major)),
+                          lambda: db.session.query(db.func.count(BasicInfo.StudentID))) # 分页查询学生信息并渲染模板index.html
 #分离前后端，将前端页面与后端逻辑分离，前端页面使用HTML、CSS、JavaScript等技术实现，后端逻辑使用Flask框架实现
 
 @main.route('/new', methods=['GET', 'POST']) # 定义路由，当访问/new时，调用new函数
+@use_primary # 表单要基于主库的最新数据
 @login_required # 确保用户登录后才能访问该路由
 def new():
     #  (任务五 权限控制)
@@ -22,13 +86,12 @@ def new():
         return redirect(url_for('main.index'))
     form = BasicForm()
     # 动态填充选项：(value, label) ，使用 major_name 作为显示文本
-    form.major.choices = [(m.id, m.major_name) for m in Major.query.order_by('major_name').all()]
+    form.major.choices = major_cache.choices()
     if form.validate_on_submit():
         stud = BasicInfo(StudentID=form.StudentID.data, 
                          Name=form.Name.data, 
                          Gender=form.Gender.data, 
-                         StudentBirthday=form.StudentBirthday.data, 
-                         Age=form.Age.data, 
+                         StudentBirthday=form.StudentBirthday.data, # 年龄由出生日期自动计算
                          major_id=form.major.data) # 直接使用表单中的major ID值
         db.session.add(stud)
         db.session.commit()
@@ -37,7 +100,63 @@ def new():
     return render_template('new.html', form=form) # 渲染模板new.html，在其中渲染表单form
 
 
+@main.route('/import', methods=['GET', 'POST']) # 批量导入学生
+@login_required
+def import_students():
+    #  (任务五 权限控制)
+    if current_user.role != 'admin':
+        flash('您没有权限执行此操作')
+        return redirect(url_for('main.index'))
+    form = ImportForm()
+    report = None
+    if form.validate_on_submit():
+        upload = form.file.data
+        # 上传文件由 werkzeug 流式写入临时文件，这里逐行读取，不会整体载入内存
+        # 超过 MAX_CONTENT_LENGTH 的上传会直接触发 413 错误处理
+        if upload.filename.lower().endswith('.xlsx'):
+            rows = importer.iter_xlsx_rows(upload.stream)
+        else:
+            rows = importer.iter_csv_rows(upload.stream)
+        report = importer.import_students(rows, batch_size=current_app.config['IMPORT_BATCH_SIZE'])
+        if report.aborted and report.last_line is None:
+            flash(f'文件无法解析: {report.aborted}', 'danger')
+        elif report.aborted:
+            # 此前的批次已经提交，报告中的条数就是实际导入的条数
+            flash(f'文件在第 {report.last_line} 行之后无法解析（{report.aborted}），'
+                  f'已导入 {report.inserted} 条，失败 {report.failed} 条', 'danger')
+        else:
+            flash(f'导入完成：成功 {report.inserted} 条，失败 {report.failed} 条',
+                  'success' if not report.failed else 'warning')
+    return render_template('import.html', form=form, report=report, columns=importer.IMPORT_COLUMNS)
+
+@main.route('/batch', methods=['POST']) # 批量修改专业 / 批量删除列表中勾选的学生
+@login_required
+def batch_students():
+    #  (任务五 权限控制)
+    if current_user.role != 'admin':
+        flash('您没有权限执行此操作')
+        return redirect(url_for('main.index'))
+    form = batch_form()
+    if not form.validate_on_submit():
+        for errors in form.errors.values():
+            flash(errors[0], 'warning')
+        return redirect(request.referrer or url_for('main.index'))
+    # 整批只用 UPDATE/DELETE ... WHERE StudentID IN (...)（按 BATCH_CHUNK_SIZE 分块）和一次提交
+    chunk_size = current_app.config['BATCH_CHUNK_SIZE']
+    if form.delete.data:
+        count = batch.delete_students(form.ids.data, chunk_size=chunk_size)
+        db.session.commit()
+        flash(f'已删除 {count} 名学生')
+    else:
+        major = major_cache.get(form.major.data)
+        count = batch.update_students(form.ids.data, {'major_id': major.id if major else None},
+                                      chunk_size=chunk_size)
+        db.session.commit()
+        flash(f"已将 {count} 名学生的专业改为{major.major_name if major else '未分配专业'}")
+    return redirect(request.referrer or url_for('main.index'))
+
 @main.route('/edit/<int:StudentID>', methods=['GET', 'POST']) # 定义路由，当访问/edit/StudentID时，调用edit函数
+@use_primary # 表单要基于主库的最新数据
 @login_required # 确保用户登录后才能访问该路由
 def edit(StudentID):
     #  (任务五 权限控制)
@@ -47,13 +166,12 @@ def edit(StudentID):
     stud = BasicInfo.query.get(StudentID)
     form = EditForm()
     # 同样需要动态填充选项
-    form.major.choices = [(m.id, m.major_name) for m in Major.query.order_by('major_name').all()]
+    form.major.choices = major_cache.choices()
     if form.validate_on_submit():
         stud.StudentID = form.StudentID.data
         stud.Name = form.Name.data
         stud.Gender = form.Gender.data
         stud.StudentBirthday = form.StudentBirthday.data # 直接使用datetime对象，不需要转换为字符串
-        stud.Age = form.Age.data
         stud.major_id = form.major.data # 直接使用表单中的major ID值
         db.session.commit()
         flash('学生信息更新成功！')
@@ -67,13 +185,13 @@ def edit(StudentID):
     else:
         # 如果是字符串，转换为datetime对象
         form.StudentBirthday.data = datetime.strptime(str(stud.StudentBirthday), '%Y-%m-%d')
-    form.Age.data = stud.Age
     # 页面加载时，设置下拉框的默认选中项
-    if stud.major:
+    if stud.major_id is not None:
         form.major.data = stud.major_id
     return render_template('edit.html', form=form) # 渲染模板edit.html，在其中渲染表单form
 
 @main.route('/delete/<int:StudentID>', methods=['GET', 'POST']) # 定义路由，当访问/delete/StudentID时，调用delete函数
+@use_primary # 表单要基于主库的最新数据
 @login_required # 确保用户登录后才能访问该路由
 def delete(StudentID):
     #  (任务五 权限控制)
@@ -87,11 +205,89 @@ def delete(StudentID):
     return redirect(url_for('main.index')) # (任务四修复) 重定向到根URL，很重要
 
 @main.route("/major/<int:major_id>")
+@limiter.limit('RATELIMIT_LISTING', key='user')
+@page_cache.cached_page
 def filter_by_major(major_id):
-    # 找到被点击的专业
-    major = Major.query.get_or_404(major_id)
-    # 使用 'major' 关系的反向查询 'students'
-    studs = major.students.all()
-    # 复用 index.html 模板，但只传入筛选后的学生
-    majors = Major.query.all() # 筛选页面也需要专业列表
-    return render_template('index.html', studs=studs, majors=majors)
\ No newline at end of file
+    # 找到被点击的专业（从缓存中查，不存在则返回404）
+    major = major_cache.get(major_id)
+    if major is None:
+        abort(404)
+    # 只查询该专业的学生，同样按游标分页；复用 index.html 模板，但只传入筛选后的学生
+    return render_listing(lambda: BasicInfo.query.filter_by(major_id=major.id).options(db.joinedload(BasicInfo.major)),
+                          lambda: db.session.query(db.func.count(BasicInfo.StudentID))
+                          .filter(BasicInfo.major_id == major.id))
+
+@main.route('/search')
+@limiter.limit('RATELIMIT_LISTING', key='user')
+def search():
+    """按姓名、学号前缀、性别、年龄范围和专业搜索学生，结果同样按游标分页"""
+    form = SearchForm(request.args, meta={'csrf': False})
+    form.major.choices = [(0, '不限')] + major_cache.choices()
+    page = total = None
+    if any(v for k, v in request.args.items() if k not in ('submit', 'after', 'before')) and form.validate():
+        query = search_query(name=form.name.data, name_mode=form.name_mode.data,
+                             student_id=form.student_id.data, gender=form.gender.data,
+                             age_min=form.age_min.data, age_max=form.age_max.data,
+                             major_id=form.major.data,
+                             use_name_index=current_app.config['SEARCH_NAME_INDEX'])
+        page, total = student_page(query.options(db.joinedload(BasicInfo.major)),
+                                   query.with_entities(db.func.count(BasicInfo.StudentID)))
+    return render_template('search.html', form=form, page=page, total=total,
+                           studs=page.items if page else [], batch_form=batch_form())
+
+@main.route('/stats')
+@limiter.limit('RATELIMIT_LISTING', key='user')
+def stats():
+    """统计页面：各专业人数、男女比例和年龄分布（JSON 版本为 /api/v1/stats）"""
+    return render_template('stats.html', summary=student_stats.summary())
+
+@main.route('/export')
+@limiter.limit('RATELIMIT_EXPORT', key='user')
+def export():
+    """
+    流式导出学生名单：/export?format=csv|ndjson&major_id=<专业id>
+    数据边查边发，第一批数据读出后立即开始响应，不会先把整张表读进内存
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exporter.FORMATS:
+        abort(400)
+    major_id = request.args.get('major_id', type=int)
+    if major_id is not None and major_cache.get(major_id) is None:
+        abort(404)
+    encode, content_type, ext = exporter.FORMATS[fmt]
+    rows = exporter.student_rows(major_id, batch_size=current_app.config['EXPORT_BATCH_SIZE'])
+    response = Response(stream_with_context(encode(rows)), content_type=content_type)
+    response.headers['Content-Disposition'] = f'attachment; filename=students.{ext}'
+    return response
+
+@main.route('/events')
+@limiter.limit('RATELIMIT_EVENTS', key='user')
+def events():
+    """
+    学生和专业变更的 Server-Sent Events 流，列表页用它原地更新行，不必定时刷新整页
+    断线重连时浏览器自动带上 Last-Event-ID（也可以用 ?last_event_id=），从该事件之后补发
+    """
+    if request.method == 'HEAD':
+        abort(405, valid_methods=['GET'])  # 没有响应体，不必占用连接
+    if change_feed.full():
+        abort(503)  # 连接数已达 FEED_MAX_CLIENTS
+    # 同步模式下每个连接占用一个线程，限时后结束，浏览器自动重连；大量连接应使用 asgi.py（异步视图不限时）
+    last_event_id = resume_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    stream = change_feed.stream(last_event_id, current_app.config['FEED_WSGI_MAX_SECONDS'])
+    return Response(stream, content_type='text/event-stream; charset=utf-8',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@main.route('/metrics')
+@admin_required
+def metrics_view():
+    """
+    运行指标（缓存命中率、各端点耗时等），仅管理员可见
+    默认返回 JSON；?format=prometheus 或 Accept 中列出 text/plain（Prometheus 抓取时）返回 Prometheus 文本格式
+    """
+    fmt = request.args.get('format')
+    if fmt is None and any(value.split(';')[0] in ('text/plain', 'application/openmetrics-text')
+                           for value, _ in request.accept_mimetypes):
+        fmt = 'prometheus'
+    if fmt == 'prometheus':
+        return Response(instrumentation.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    return jsonify(metrics.collect())
@@ -0,0 +1,12 @@
+# 运行指标注册表：各模块把返回统计字典的函数注册进来，由监控端点统一汇总输出
+_providers = {}
+
+
+def register(name, provider):
+    """注册一个指标来源，provider 为无参函数，返回 {指标名: 数值} 字典"""
+    _providers[name] = provider
+
+
+def collect():
+    """汇总所有已注册来源的当前指标"""
+    return {name: provider() for name, provider in _providers.items()}
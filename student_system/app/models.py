@@ -1,13 +1,47 @@
 from . import db  # 稍后在 __init__.py 中定义 db
+from flask import current_app
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import validates
+from .ages import age_on, age_in_years
+from .passwords import password_hasher
+from .events import on_commit
+from .lru import LRUCache
+from . import metrics
 
 # (注意：login_manager.user_loader 也会移到这里或 __init__)
 from . import login_manager # 稍后在 __init__.py 中定义 login_manager
 
+class UserPrincipal(UserMixin):
+    """缓存中的轻量用户对象，只包含页面和权限判断需要的 id、username、role"""
+    __slots__ = ('id', 'username', 'role')
+
+    def __init__(self, id, username, role):
+        self.id = id
+        self.username = username
+        self.role = role
+
+    def __repr__(self):
+        return f'<UserPrincipal {self.username}>'
+
+# 用户缓存：按用户 id 保存 UserPrincipal，容量和过期时间在 create_app 中按配置设置
+# 用户被修改时只有执行修改的进程会丢弃缓存条目，其他 worker 最多 USER_CACHE_TTL 秒后才看到新的角色
+user_cache = LRUCache(maxsize=1024, ttl=60)
+metrics.register('user_cache', user_cache.stats)
+
 @login_manager.user_loader # 3. 实现一个“用户加载”回调函数，确保 Flask-Login 能在需要时通过ID从数据库中重新获取用户信息。
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    if not current_app.config.get('USER_CACHE_ENABLED'):
+        return db.session.get(User, int(user_id))
+    user_id = int(user_id)
+    principal = user_cache.get(user_id)
+    if principal is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        principal = UserPrincipal(user.id, user.username, user.role)
+        user_cache.set(user_id, principal)
+    return principal
 
 class User(UserMixin, db.Model): # 定义模型类User，继承自UserMixin类（Flask-Login提供的类，用于实现用户认证功能）和db.Model类（SQLAlchemy提供的基类）
     __tablename__ = 'users' # 定义表名，这里设置为users
@@ -17,12 +51,24 @@ class User(UserMixin, db.Model): # 定义模型类User，继承自UserMixin类
     role = db.Column(db.Enum('admin', 'guest'), default='guest', nullable=False) # 定义角色字段，枚举类型，默认值为guest
     
     def set_password(self, password):
-        """设置密码，使用哈希加密"""
-        self.password_hash = generate_password_hash(password)
+        """设置密码，使用哈希加密（在密码哈希线程池中执行）"""
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """验证密码"""
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """密码哈希的算法或代价与当前配置不一致"""
+        return password_hasher.needs_rehash(self.password_hash)
+
+@on_commit(User)
+def _invalidate_user_cache(changes):
+    """用户被删除，或用户名、角色、密码被修改时，丢弃对应的缓存条目"""
+    for change in changes:
+        if change.op == 'deleted' or change.previous is None or \
+                {'username', 'role', 'password_hash'} & set(change.previous):
+            user_cache.pop(change.pk)
 
 class Major(db.Model):
     __tablename__ = 'majors'
@@ -34,13 +80,46 @@ class Major(db.Model):
     def __repr__(self):
         return f'<Major {self.major_name}>' # 定义repr方法，返回对象的字符串表示，这里返回专业名称
 
+class TableVersion(db.Model):
+    """数据表的版本号：表中数据每次提交变更后加一（见 versions.py），JSON 接口据此生成 ETag"""
+    __tablename__ = 'table_versions'
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False) # 最近一次变更的时间（UTC）
+
 class BasicInfo(db.Model): # 定义模型类BasicInfo，继承自db.Model类（SQLAlchemy提供的基类）
     __tablename__ = 'basicinfo' # 定义表名，这里设置为basicinfo
+    # 搜索用到的索引：按专业+姓名前缀、姓名前缀、性别+出生日期（年龄）范围查询时都不需要全表扫描
+    # 已有的数据库可以用 flask create-indexes 命令补建
+    __table_args__ = (
+        db.Index('ix_basicinfo_major_id_name', 'major_id', 'Name'),
+        db.Index('ix_basicinfo_name', 'Name'),
+        db.Index('ix_basicinfo_gender_birthday', 'Gender', 'StudentBirthday'),
+    )
     StudentID = db.Column(db.Integer, primary_key=True) # 定义列StudentID，整数类型，主键
     Name = db.Column(db.String(255), nullable=False) # 定义列Name，字符串类型，长度为255，不能为空
     Gender = db.Column(db.Enum('male', 'female'), nullable=False) # 定义列Gender，枚举类型，只能取male或female，不能为空
     StudentBirthday = db.Column(db.Date, nullable=False) # 定义列StudentBirthday，日期类型，不能为空
-    Age = db.Column(db.Integer, nullable=False) # 定义列Age，整数类型，不能为空
+    # 数据库中原有的Age列仍保留（NOT NULL），写入时按出生日期自动填写，不再作为年龄的来源；
+    # 已有数据可以用 flask reconcile-ages 命令批量校正
+    stored_age = db.Column('Age', db.Integer, nullable=False,
+                           default=lambda ctx: age_on(ctx.get_current_parameters().get('StudentBirthday')))
     # 新增外键列
     major_id = db.Column(db.Integer, db.ForeignKey('majors.id'))
-    # 注意，这里的外键列名应该与Major模型的主键列名保持一致，即majors.id，且major_id列须在basicinfo中手动添加
\ No newline at end of file
+    # 注意，这里的外键列名应该与Major模型的主键列名保持一致，即majors.id，且major_id列须在basicinfo中手动添加
+
+    @hybrid_property
+    def Age(self):
+        """年龄：由出生日期计算，不会随时间推移而过时"""
+        return age_on(self.StudentBirthday)
+
+    @Age.expression
+    def Age(cls):
+        # 在 SQL 中计算年龄（用于查询列表和 GROUP BY）；按年龄筛选时请用出生日期范围，见 ages.birthday_range
+        return age_in_years(cls.StudentBirthday)
+
+    @validates('StudentBirthday')
+    def _sync_stored_age(self, key, value):
+        """修改出生日期时同步数据库中保留的Age列"""
+        self.stored_age = age_on(value)
+        return value
@@ -0,0 +1,110 @@
+from functools import wraps
+import threading
+from flask import request, session, make_response, current_app
+from flask_login import current_user
+from .events import on_commit
+from .lru import LRUCache
+from .models import BasicInfo, Major
+from . import metrics
+
+
+class PageCache:
+    """
+    学生列表的页面缓存
+    - 匿名用户看到的页面完全相同，整页 HTML 按 (路由, 路径参数, 翻页游标) 缓存，命中时不查库也不渲染模板
+    - 已登录用户的页面含有用户名、管理员按钮等个人内容，只缓存学生列表片段及其翻页信息，外层页面照常渲染
+    缓存键中带有代数（generation），BasicInfo 或 Major 有变更提交时代数加一，旧条目自然失效
+    """
+
+    def __init__(self):
+        self._store = LRUCache(maxsize=512, ttl=60)
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.page_hits = 0
+        self.fragment_hits = 0
+
+    def init_app(self, app):
+        self._store.configure(app.config['PAGE_CACHE_SIZE'], app.config['PAGE_CACHE_TTL'])
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+        self._store.clear()
+
+    def _key(self, kind, *extra):
+        view_args = tuple(sorted((request.view_args or {}).items()))
+        return (self.generation, kind, request.endpoint, view_args,
+                request.args.get('after', type=int), request.args.get('before', type=int)) + extra
+
+    def cached_page(self, f):
+        """装饰器：缓存匿名用户看到的整页 HTML（有待显示的 flash 消息时不使用缓存）"""
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = self.page_key()
+            body = self.get_page(key)
+            if body is not None:
+                return make_response(body)
+            response = make_response(f(*args, **kwargs))
+            self.put_page(key, response)
+            return response
+        return decorated_function
+
+    def fragment(self, render):
+        """
+        取学生列表片段：render() 负责查询并渲染，返回可缓存的结果
+        管理员看到的片段带编辑/删除按钮，所以按是否为管理员分别缓存
+        """
+        key = self.fragment_key()
+        value = self.get_fragment(key)
+        if value is None:
+            value = render()
+            self.put_fragment(key, value)
+        return value
+
+    # 以下按步骤拆开的接口供 cached_page / fragment 和异步视图（app/main/async_views.py）共用，
+    # key 为 None 表示当前请求不使用缓存
+
+    def page_key(self):
+        if not current_app.config['PAGE_CACHE_ENABLED'] or current_user.is_authenticated \
+                or session.get('_flashes'):
+            return None
+        return self._key('page')
+
+    def get_page(self, key):
+        body = self._store.get(key) if key is not None else None
+        if body is not None:
+            self.page_hits += 1
+        return body
+
+    def put_page(self, key, response):
+        if key is not None and response.status_code == 200:
+            self._store.set(key, response.get_data())
+
+    def fragment_key(self):
+        if not current_app.config['PAGE_CACHE_ENABLED']:
+            return None
+        is_admin = current_user.is_authenticated and current_user.role == 'admin'
+        return self._key('fragment', is_admin)
+
+    def get_fragment(self, key):
+        value = self._store.get(key) if key is not None else None
+        if value is not None:
+            self.fragment_hits += 1
+        return value
+
+    def put_fragment(self, key, value):
+        if key is not None:
+            self._store.set(key, value)
+
+    def stats(self):
+        return dict(self._store.stats(), generation=self.generation,
+                    page_hits=self.page_hits, fragment_hits=self.fragment_hits)
+
+
+page_cache = PageCache()
+metrics.register('page_cache', page_cache.stats)
+
+
+@on_commit(BasicInfo, Major)
+def _invalidate_page_cache(changes):
+    page_cache.invalidate()
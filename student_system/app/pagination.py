@@ -0,0 +1,47 @@
+from collections import namedtuple
+
+# 一页结果：items 为当前页数据，next_cursor / prev_cursor 为翻页游标（没有则为 None）
+KeysetPage = namedtuple('KeysetPage', ['items', 'next_cursor', 'prev_cursor', 'per_page'])
+
+
+def keyset_paginate(query, column, after=None, before=None, per_page=50):
+    """
+    基于游标（keyset）的分页：按 column 排序，用 WHERE column > 游标 代替 OFFSET，
+    每页只扫描 per_page + 1 行，翻到多少页代价都一样。
+    after: 取游标之后的一页（下一页）；before: 取游标之前的一页（上一页）
+    """
+    rows = keyset_select(query, column, after, before, per_page).all()
+    return keyset_page(rows, column, after, before, per_page)
+
+
+def keyset_select(query, column, after=None, before=None, per_page=50):
+    """
+    给 Query 或 select() 语句加上游标条件、排序和 LIMIT（多取一行用来判断是否还有更多），
+    与 keyset_page 配合使用；异步查询（app/aio.py）执行语句后同样用 keyset_page 构造结果
+    """
+    if before is not None:
+        return query.where(column < before).order_by(column.desc()).limit(per_page + 1)
+    if after is not None:
+        query = query.where(column > after)
+    return query.order_by(column.asc()).limit(per_page + 1)
+
+
+def keyset_page(rows, column, after=None, before=None, per_page=50):
+    """由 keyset_select 查出的行构造一页结果"""
+    has_more = len(rows) > per_page
+    if before is not None:
+        rows = list(reversed(rows[:per_page]))
+        next_cursor = _key(rows[-1], column) if rows else None
+        prev_cursor = _key(rows[0], column) if rows and has_more else None
+        return KeysetPage(rows, next_cursor, prev_cursor, per_page)
+
+    rows = rows[:per_page]
+    next_cursor = _key(rows[-1], column) if rows and has_more else None
+    # 只要是从某个游标之后开始的，就一定有上一页
+    prev_cursor = _key(rows[0], column) if rows and after is not None else None
+    return KeysetPage(rows, next_cursor, prev_cursor, per_page)
+
+
+def _key(row, column):
+    """从一行结果中取出游标列的值"""
+    return getattr(row, column.key)
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+from werkzeug.security import generate_password_hash, check_password_hash
+from . import metrics
+
+
+class HashQueueFull(Exception):
+    """密码哈希线程池的排队已满；与 HTTP 无关，请求中由错误处理函数转换为429（见 main/errors.py）"""
+
+
+class PasswordHasher:
+    """
+    密码哈希/校验放到有界线程池中执行
+    scrypt/pbkdf2 的计算在 hashlib 中会释放 GIL，放到线程池里不会卡住其他请求的线程；
+    调用线程等待结果，同时计算的哈希数不超过线程数；
+    排队（含正在执行）的任务数超过 PASSWORD_HASH_QUEUE 时直接抛出 HashQueueFull，而不是让请求无限堆积
+    """
+
+    def __init__(self):
+        self.method = 'scrypt'
+        self._executor = None
+        self._slots = None
+        self._prefix = None
+        self._lock = threading.Lock()
+        self.workers = 0
+        self.queue_size = 0
+        self.rejected = 0
+        self.completed = 0
+
+    def init_app(self, app):
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self._prefix = None
+        self.workers = app.config['PASSWORD_HASH_WORKERS'] or os.cpu_count() or 1
+        self.queue_size = app.config['PASSWORD_HASH_QUEUE'] or self.workers * 4
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        metrics.register('password_hasher', self.stats)
+
+    def _get_executor(self):
+        # 线程池在第一次哈希时才创建，不用哈希密码的 CLI 命令和进程启动时不必创建
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        return self._executor
+
+    def _run(self, fn, *args):
+        if self._slots is None:
+            # 未初始化（如在 flask shell 之外直接使用模型）时同步执行
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashQueueFull(f'密码哈希排队已满（{self.queue_size}）')
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+            self.completed += 1
+
+    def hash(self, password):
+        """按配置的算法和代价生成密码哈希"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pw_hash, password):
+        """校验密码"""
+        return self._run(check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """哈希的算法或代价参数与当前配置不同（如调高了代价）时返回 True"""
+        if self._prefix is None:
+            # 配置可以只写算法名（如 'scrypt'），实际参数以 werkzeug 生成的哈希前缀为准
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return pw_hash.split('$', 1)[0] != self._prefix
+
+    def stats(self):
+        return {'completed': self.completed, 'rejected': self.rejected, 'queue_size': self.queue_size}
+
+
+password_hasher = PasswordHasher()
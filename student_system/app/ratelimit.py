@@ -0,0 +1,176 @@
+from collections import namedtuple
+from functools import wraps
+import math
+import threading
+import time
+from flask import request, g, abort, current_app
+from flask_login import current_user
+from .lru import LRUCache
+from . import metrics
+
+# 一次令牌桶检查的结果：是否放行、桶容量、剩余令牌、还需等待多少秒才能再次请求、多少秒后桶被填满
+Decision = namedtuple('Decision', ['allowed', 'limit', 'remaining', 'retry_after', 'reset'])
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(rate):
+    """解析 '10/minute'、'5/second' 这样的限速写法，返回 (次数, 周期秒数)"""
+    count, _, period = rate.partition('/')
+    return int(count), _PERIODS[period.strip().rstrip('s')]
+
+
+class MemoryBackend:
+    """进程内的令牌桶存储，桶的数量有上限，长时间不用的桶会被淘汰（淘汰等同于桶已填满）"""
+
+    def __init__(self, maxsize=100000):
+        self._buckets = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        """从桶中取一个令牌，rate 为每秒补充的令牌数，返回 (是否成功, 剩余令牌数)"""
+        with self._lock:
+            tokens, last = self._buckets.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets.set(key, (tokens, now), ttl=capacity / rate)
+        return allowed, tokens
+
+
+class RedisBackend:
+    """
+    多进程/多机共享的令牌桶存储，用一段 Lua 脚本在 Redis 中原子地完成“补充+取令牌”
+    client 只需提供 register_script()（redis-py 的接口），测试或本地开发时可以换成同接口的替身
+    """
+
+    SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 't') or ARGV[1])
+local last = tonumber(redis.call('HGET', KEYS[1], 'l') or ARGV[3])
+local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+tokens = math.min(capacity, tokens + (now - last) * rate)
+local allowed = 0
+if tokens >= 1 then tokens = tokens - 1; allowed = 1 end
+redis.call('HSET', KEYS[1], 't', tokens, 'l', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, client, prefix='ratelimit:'):
+        self._script = client.register_script(self.SCRIPT)
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url):
+        import redis  # 可选依赖，只有配置了 RATELIMIT_STORAGE_URL 时才需要
+        return cls(redis.Redis.from_url(url))
+
+    def take(self, key, capacity, rate, now):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[capacity, rate, now])
+        return bool(int(allowed)), float(tokens)
+
+
+def ip_key():
+    """按客户端 IP 限速（部署在反向代理后面时要配置 PROXY_FIX_X_FOR，否则所有客户端都是代理的 IP）"""
+    return request.remote_addr or 'unknown'
+
+
+def user_key():
+    """按登录用户限速，未登录时退化为按 IP"""
+    if current_user.is_authenticated:
+        return f'user:{current_user.get_id()}'
+    return ip_key()
+
+
+KEY_FUNCS = {'ip': ip_key, 'user': user_key}
+
+
+class Limiter:
+    """
+    令牌桶限速：在蓝图路由上用 @limiter.limit('10/minute', key='ip') 声明每个端点的限额，
+    超出时返回429（由 errors.py 中的 too_many_requests 处理），并附带 Retry-After 和 X-RateLimit-* 响应头
+    """
+
+    def __init__(self):
+        self._backend = None
+        self.storage_url = None
+        self.enabled = True
+        self.checks = 0
+        self.rejected = 0
+        self.elapsed_ns = 0
+
+    def init_app(self, app):
+        self.enabled = app.config['RATELIMIT_ENABLED']
+        if self.enabled and not app.config['PROXY_FIX_X_FOR']:
+            app.logger.warning('已启用限速但 PROXY_FIX_X_FOR 为 0：部署在反向代理后面时，所有客户端按代理的 IP 共用限额')
+        self.storage_url = app.config.get('RATELIMIT_STORAGE_URL')
+        self._backend = None
+        app.after_request(self._add_headers)
+        metrics.register('rate_limit', self.stats)
+
+    @property
+    def backend(self):
+        """令牌桶存储在第一次检查时才创建，CLI 命令和 worker 启动时不必导入 redis"""
+        if self._backend is None:
+            self._backend = RedisBackend.from_url(self.storage_url) if self.storage_url else MemoryBackend()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    def limit(self, rate, key='ip', methods=None, scope=None):
+        """
+        rate: 限速写法（如 '10/minute'），或保存限速写法的配置项名称（如 'RATELIMIT_LOGIN'）
+        key: 'ip'、'user'，或返回限速键的函数（如按提交的用户名限速）
+        methods: 只对这些 HTTP 方法限速，默认全部
+        scope: 桶的名字，默认为端点名；多个路由使用相同 scope 时共享同一个桶
+        """
+        key_func = KEY_FUNCS.get(key, key)
+
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if self.enabled and (methods is None or request.method in methods):
+                    self.check(rate, key_func, scope or request.endpoint)
+                return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+    def check(self, rate, key_func, scope):
+        start = time.perf_counter_ns()
+        if '/' not in rate:
+            rate = current_app.config[rate]
+        capacity, period = parse_rate(rate)
+        refill = capacity / period
+        allowed, tokens = self.backend.take(f'{scope}:{key_func()}', capacity, refill, time.time())
+        decision = Decision(allowed, capacity, int(tokens),
+                            0 if allowed else (1 - tokens) / refill,
+                            (capacity - tokens) / refill)
+        # 同一个请求经过多个限速器时，响应头反映剩余额度最少的那个
+        current = g.get('rate_limit')
+        if current is None or not decision.allowed or (current.allowed and decision.remaining < current.remaining):
+            g.rate_limit = decision
+        self.checks += 1
+        self.elapsed_ns += time.perf_counter_ns() - start
+        if not allowed:
+            self.rejected += 1
+            abort(429)
+
+    def _add_headers(self, response):
+        decision = g.get('rate_limit')
+        if decision is not None:
+            response.headers['X-RateLimit-Limit'] = str(decision.limit)
+            response.headers['X-RateLimit-Remaining'] = str(decision.remaining)
+            response.headers['X-RateLimit-Reset'] = str(math.ceil(decision.reset))
+            if not decision.allowed:
+                response.headers['Retry-After'] = str(max(1, math.ceil(decision.retry_after)))
+        return response
+
+    def stats(self):
+        return {'checks': self.checks, 'rejected': self.rejected,
+                'avg_check_us': round(self.elapsed_ns / self.checks / 1000, 2) if self.checks else 0}
+
+
+limiter = Limiter()
@@ -0,0 +1,152 @@
+import itertools
+import logging
+import time
+from functools import partial
+import sqlalchemy as sa
+from sqlalchemy import event
+from flask import g, has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# 这些方法的请求按只读处理，查询可以走只读副本
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# 写入后在用户会话中记录的时间戳：此前的只读请求仍然读主库（读己之写）
+STICKY_KEY = '_primary_until'
+
+
+class Replica:
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = False  # 第一次使用前先探测
+        self.retry_at = 0.0
+        self.reads = 0
+        self.failures = 0
+
+
+class ReplicaSet:
+    """
+    只读副本：轮询选择，连接失败或断开的副本标记为不可用，retry_seconds 秒后先用 SELECT 1 探测再恢复；
+    全部不可用时读主库
+    """
+
+    def __init__(self):
+        self.replicas = []
+        self.retry_seconds = 30
+        self.sticky_seconds = 5
+        self._counter = itertools.count()
+        self.primary_reads = 0
+
+    def init_app(self, app):
+        self.retry_seconds = app.config['REPLICA_RETRY_SECONDS']
+        self.sticky_seconds = app.config['REPLICA_STICKY_SECONDS']
+        # 副本与主库使用相同的连接池参数（每个副本各有一个连接池）
+        options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        self.replicas = [Replica(sa.create_engine(uri, **options))
+                         for uri in app.config['SQLALCHEMY_REPLICA_URIS']]
+        for replica in self.replicas:
+            event.listen(replica.engine, 'handle_error', partial(self._on_error, replica))
+        if self.replicas:
+            metrics.register('replicas', self.stats)
+
+    @property
+    def engines(self):
+        return [replica.engine for replica in self.replicas]
+
+    def choose(self):
+        """轮询取一个可用副本的引擎，没有可用副本时返回 None"""
+        count = len(self.replicas)
+        for _ in range(count):
+            replica = self.replicas[next(self._counter) % count]
+            if replica.healthy or (time.monotonic() >= replica.retry_at and self._probe(replica)):
+                replica.reads += 1
+                return replica.engine
+        self.primary_reads += 1
+        return None
+
+    def _probe(self, replica):
+        # 先推迟下次重试时间，探测期间其他线程直接跳过这个副本
+        replica.retry_at = time.monotonic() + self.retry_seconds
+        try:
+            with replica.engine.connect() as conn:
+                conn.exec_driver_sql('SELECT 1')
+        except sa.exc.DBAPIError:
+            return False
+        if replica.failures:
+            logger.warning('只读副本已恢复: %s', replica.engine.url)
+        replica.healthy = True
+        return True
+
+    def _on_error(self, replica, context):
+        # 连接失败（没有连接对象）或连接被断开时，认为副本不可用
+        if context.is_disconnect or context.connection is None:
+            if replica.healthy:
+                logger.warning('只读副本不可用，%d 秒后重试: %s', self.retry_seconds, replica.engine.url)
+            replica.healthy = False
+            replica.retry_at = time.monotonic() + self.retry_seconds
+            replica.failures += 1
+
+    def is_sticky(self):
+        """当前用户最近写过数据，读请求也要读主库"""
+        until = flask_session.get(STICKY_KEY)
+        if until is None:
+            return False
+        if until > time.time():
+            return True
+        flask_session.pop(STICKY_KEY)
+        return False
+
+    def stick(self):
+        flask_session[STICKY_KEY] = time.time() + self.sticky_seconds
+
+    def stats(self):
+        return {
+            'primary_reads': self.primary_reads,
+            'replicas': [{'url': replica.engine.url.render_as_string(hide_password=True),
+                          'healthy': replica.healthy, 'reads': replica.reads, 'failures': replica.failures}
+                         for replica in self.replicas],
+        }
+
+
+replicas = ReplicaSet()
+
+
+class RoutingSession(Session):
+    """
+    读写分离的会话：只读请求（GET 等）中的 SELECT 走只读副本，同一请求内固定使用同一个副本；
+    写入、flush、写请求、标记了 use_primary 的视图、非请求上下文（命令行等）以及刚写过数据的用户都走主库
+    没有配置副本时与 Flask-SQLAlchemy 默认的会话完全相同
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and replicas.replicas and has_request_context():
+            if self._reads_from_replica(clause):
+                engine = self.info.get('replica')
+                if engine is None:
+                    engine = self.info['replica'] = replicas.choose() or False
+                if engine:
+                    return engine
+            elif self._flushing or not isinstance(clause, sa.Select):
+                self.info['wrote'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        return (not self._flushing
+                and isinstance(clause, sa.Select)
+                and clause._for_update_arg is None
+                and request.method in READ_METHODS
+                and not g.get('db_primary')
+                and not replicas.is_sticky())
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_after_write(session):
+    """提交了写入后，该用户接下来 REPLICA_STICKY_SECONDS 秒内的读请求走主库，不会看到副本上的旧数据"""
+    if session.info.pop('wrote', False) and has_request_context():
+        replicas.stick()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_write(session):
+    session.info.pop('wrote', None)
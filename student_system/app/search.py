@@ -0,0 +1,229 @@
+import threading
+import time
+from . import db
+from .models import BasicInfo
+from .events import on_commit
+from .versions import versions, local_bumps
+from .ages import birthday_range
+from . import metrics
+
+# 学号是 INT 列，最多 10 位十进制数
+MAX_ID_DIGITS = 10
+
+
+class _Postings:
+    """姓名索引的数据：学号 -> 小写姓名，n-gram -> 学号集合"""
+
+    def __init__(self):
+        self.names = {}
+        self.grams = {}
+
+    @staticmethod
+    def ngrams(name):
+        grams = set(name)
+        grams.update(name[i:i + 2] for i in range(len(name) - 1))
+        return grams
+
+    def add(self, student_id, name):
+        # 表单提交的学号可能是字符串，统一转换成整数
+        student_id = int(student_id)
+        name = (name or '').lower()
+        self.remove(student_id)
+        self.names[student_id] = name
+        for gram in self.ngrams(name):
+            self.grams.setdefault(gram, set()).add(student_id)
+
+    def remove(self, student_id):
+        student_id = int(student_id)
+        name = self.names.pop(student_id, None)
+        if name is None:
+            return
+        for gram in self.ngrams(name):
+            ids = self.grams.get(gram)
+            if ids is not None:
+                ids.discard(student_id)
+                if not ids:
+                    del self.grams[gram]
+
+    def apply(self, changes):
+        """根据提交事件增量更新，遇到缺少列数据的批量变更时返回 False（需要重建）"""
+        for change in changes:
+            data = change.data
+            if change.op == 'deleted':
+                self.remove(change.pk)
+            elif change.op == 'updated' and data is not None and 'Name' not in data \
+                    and 'StudentID' not in (change.previous or ()):
+                continue  # 批量修改其他列（如专业），不影响姓名索引
+            elif data is None or 'StudentID' not in data or 'Name' not in data:
+                return False
+            elif change.op == 'created':
+                self.add(data['StudentID'], data['Name'])
+            elif {'StudentID', 'Name'} & set(change.previous or ()):
+                self.remove(change.previous.get('StudentID', data['StudentID']))
+                self.add(data['StudentID'], data['Name'])
+        return True
+
+
+class NameIndex:
+    """
+    内存中的姓名 n-gram 倒排索引，用于姓名“包含”搜索
+    中文姓名通常只有 2~3 个字，三元组（trigram）太长，所以索引单字和二元组：
+    查询串的每个二元组对应的学号集合取交集，即得到候选学号，再逐个确认子串确实存在
+    索引在第一次搜索时从数据库构建，之后通过 BasicInfo 的提交事件增量维护；
+    每次搜索前对比 basicinfo 的表版本号（见 versions.py），其他进程提交了修改时重建，
+    版本表不可用时索引最多使用 SEARCH_NAME_INDEX_TTL 秒
+    重建在锁外进行，期间的搜索继续使用旧索引（首次构建时退回 LIKE 查询），重建期间提交的变更在换入新索引后重放
+    """
+
+    TABLE = BasicInfo.__tablename__
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._postings = _Postings()
+        self._pending = None  # 重建期间收到的提交事件
+        self.ready = False
+        self.ttl = 300
+        self.version = None  # 构建时的表版本号
+        self.local_bumps = 0  # 构建时本进程提交让版本号增加的次数
+        self.built_at = 0.0
+        self.rebuilds = 0
+
+    def init_app(self, app):
+        self.ttl = app.config['SEARCH_NAME_INDEX_TTL']
+
+    def rebuild(self, batch_size=5000):
+        """从数据库重新构建索引，只读取学号和姓名两列"""
+        with self._build_lock:
+            self._rebuild(batch_size)
+
+    def _rebuild(self, batch_size=5000):
+        # 先记下版本号再读数据：读取期间其他进程的修改会让下次搜索再重建一次，不会漏掉
+        version, _ = versions(self.TABLE)
+        local = local_bumps(self.TABLE)
+        with self._lock:
+            self._pending = []
+        postings = _Postings()
+        stmt = db.select(BasicInfo.StudentID, BasicInfo.Name).execution_options(yield_per=batch_size)
+        try:
+            for student_id, name in db.session.execute(stmt):
+                postings.add(student_id, name)
+        finally:
+            with self._lock:
+                pending, self._pending = self._pending, None
+        with self._lock:
+            # 重放读取期间本进程提交的变更（重复应用不影响结果）
+            ready = postings.apply(pending)
+            self._postings = postings
+            self.ready = ready
+            self.version = version[0] if version is not None else None
+            self.local_bumps = local
+            self.built_at = time.monotonic()
+            self.rebuilds += 1
+
+    def invalidate(self):
+        """标记索引过期，下次搜索时重建"""
+        with self._lock:
+            self.ready = False
+
+    def apply(self, changes):
+        """根据提交事件增量更新索引，缺少列数据的批量变更会让索引整体过期"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(changes)
+            if self.ready and not self._postings.apply(changes):
+                self.ready = False
+
+    def stale(self):
+        """索引需要重建：尚未构建、超过 TTL，或表版本号的变化不全来自本进程已增量应用的提交"""
+        if not self.ready or time.monotonic() - self.built_at >= self.ttl:
+            return True
+        version, _ = versions(self.TABLE)
+        if version is None or self.version is None:
+            return False
+        return version[0] - self.version != local_bumps(self.TABLE) - self.local_bumps
+
+    def search(self, text):
+        """返回姓名中包含 text 的学号集合；索引正在由其他线程首次构建时返回 None（调用方退回 LIKE 查询）"""
+        if self.stale():
+            if self._build_lock.acquire(blocking=False):
+                try:
+                    self._rebuild()
+                finally:
+                    self._build_lock.release()
+            if not self.ready:
+                return None
+        text = text.lower()
+        with self._lock:
+            postings = self._postings
+            if len(text) == 1:
+                return set(postings.grams.get(text, ()))
+            grams = sorted((text[i:i + 2] for i in range(len(text) - 1)),
+                           key=lambda g: len(postings.grams.get(g, ())))
+            candidates = set(postings.grams.get(grams[0], ()))
+            for gram in grams[1:]:
+                candidates &= postings.grams.get(gram, set())
+                if not candidates:
+                    break
+            return {sid for sid in candidates if text in postings.names.get(sid, '')}
+
+    def stats(self):
+        return {'ready': int(self.ready), 'names': len(self._postings.names),
+                'grams': len(self._postings.grams), 'rebuilds': self.rebuilds}
+
+
+name_index = NameIndex()
+metrics.register('name_index', name_index.stats)
+
+
+@on_commit(BasicInfo)
+def _update_name_index(changes):
+    name_index.apply(changes)
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def student_id_prefix_filter(prefix):
+    """
+    学号前缀条件：把“以 prefix 开头”改写成若干个主键范围，
+    例如 12 -> [12,13) 或 [120,130) 或 [1200,1300) ...，每个范围都能走主键索引
+    """
+    if prefix.startswith('0'):
+        return BasicInfo.StudentID == 0 if prefix == '0' else db.false()
+    value = int(prefix)
+    ranges = []
+    for k in range(MAX_ID_DIGITS - len(prefix) + 1):
+        low, high = value * 10 ** k, (value + 1) * 10 ** k
+        ranges.append(db.and_(BasicInfo.StudentID >= low, BasicInfo.StudentID < high))
+    return db.or_(*ranges)
+
+
+def search_query(name=None, name_mode='contains', student_id=None, gender=None,
+                 age_min=None, age_max=None, major_id=None, use_name_index=False, max_index_ids=5000):
+    """根据搜索条件构造学生查询，各条件之间为“并且”关系"""
+    query = BasicInfo.query
+    if major_id:
+        query = query.filter(BasicInfo.major_id == major_id)
+    if gender:
+        query = query.filter(BasicInfo.Gender == gender)
+    # 年龄范围换算成出生日期范围，可以使用 (Gender, StudentBirthday) 索引
+    earliest, latest = birthday_range(age_min, age_max)
+    if earliest is not None:
+        query = query.filter(BasicInfo.StudentBirthday >= earliest)
+    if latest is not None:
+        query = query.filter(BasicInfo.StudentBirthday <= latest)
+    if student_id:
+        query = query.filter(student_id_prefix_filter(student_id))
+    if name:
+        if name_mode == 'prefix':
+            # 前缀匹配可以直接使用 Name 上的索引
+            query = query.filter(BasicInfo.Name.like(_escape_like(name) + '%', escape='\\'))
+        else:
+            ids = name_index.search(name) if use_name_index else None
+            if ids is not None and len(ids) <= max_index_ids:
+                query = query.filter(BasicInfo.StudentID.in_(ids)) if ids else query.filter(db.false())
+            else:
+                query = query.filter(BasicInfo.Name.like('%' + _escape_like(name) + '%', escape='\\'))
+    return query
@@ -0,0 +1,217 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from flask.sessions import SessionInterface, SecureCookieSession, SecureCookieSessionInterface, \
+    session_json_serializer
+from flask_login import user_logged_in
+from .lru import LRUCache
+from . import metrics
+
+
+class ServerSideSession(SecureCookieSession):
+    """
+    服务端会话：Cookie 中只有随机的会话 id，数据保存在存储后端
+    沿用 SecureCookieSession 的 modified / accessed 跟踪，只有被修改过的会话才会写回存储
+    """
+
+    def __init__(self, initial=None, sid=None, new=False):
+        super().__init__(initial)
+        self.sid = sid
+        self.new = new
+        self.skipped = False
+        self.rotate = False
+
+    def regenerate(self):
+        """换一个新的会话 id（登录时调用，防止会话固定攻击），旧 id 对应的数据会被删除"""
+        self.rotate = True
+        self.modified = True
+
+
+class MemoryStore:
+    """进程内存储：条数有上限（LRU 淘汰），过期的会话自动失效；多进程部署时各进程互不可见"""
+
+    def __init__(self, maxsize=10000):
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def get(self, sid):
+        return self._cache.get(sid)
+
+    def set(self, sid, data, ttl):
+        self._cache.set(sid, data, ttl=ttl)
+
+    def delete(self, sid):
+        self._cache.pop(sid)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class SQLiteStore:
+    """
+    SQLite 文件存储：同一台机器上的多个 worker 进程共享会话，重启后会话仍然有效
+    每个线程使用自己的连接；每写入 cleanup_every 次顺带清理一次过期的会话
+    """
+
+    def __init__(self, path, cleanup_every=1000):
+        self.path = path
+        self.cleanup_every = cleanup_every
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS sessions '
+                         '(sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self._connect().execute('SELECT data FROM sessions WHERE sid = ? AND expires > ?',
+                                      (sid, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, sid, data, ttl):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)',
+                         (sid, data, time.time() + ttl))
+            self._writes += 1
+            if self._writes % self.cleanup_every == 0:
+                conn.execute('DELETE FROM sessions WHERE expires <= ?', (time.time(),))
+
+    def delete(self, sid):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def stats(self):
+        count, = self._connect().execute('SELECT COUNT(*) FROM sessions').fetchone()
+        return {'size': count}
+
+
+class ServerSessionInterface(SessionInterface):
+    """
+    服务端会话接口，替换 Flask 默认的签名 Cookie 会话
+    - Cookie 只保存 32 个字符的随机 id，不需要签名和校验 HMAC，请求头和响应头都更小
+    - 路径以 skip_paths 中任一前缀开头的请求（默认是静态文件）完全不读取会话，也不会写回 Cookie
+      （Flask 在匹配路由之前就打开会话，所以按路径而不是端点判断）
+    - 没有会话 Cookie 的请求不访问存储；会话只在被修改时写回
+    """
+    serializer = session_json_serializer
+
+    def __init__(self, store, skip_paths=()):
+        self.store = store
+        self.skip_paths = tuple(skip_paths)
+        self.loads = 0
+        self.saves = 0
+        self.skipped = 0
+
+    def open_session(self, app, request):
+        if self.skip_paths and request.path.startswith(self.skip_paths):
+            self.skipped += 1
+            session = ServerSideSession()
+            session.skipped = True
+            return session
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            self.loads += 1
+            data = self.store.get(sid)
+            if data is not None:
+                return ServerSideSession(self.serializer.loads(data), sid=sid)
+        # 没有 Cookie，或者会话已过期/被淘汰：新会话，在第一次写入时才分配 id
+        return ServerSideSession(new=True)
+
+    def save_session(self, app, session, response):
+        if session.skipped:
+            return
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not session:
+            # 会话被清空（如退出登录）：删除存储中的数据和 Cookie
+            if session.modified and session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+                response.vary.add('Cookie')
+            return
+        if not (session.modified or self.should_set_cookie(app, session)):
+            return
+        if session.rotate and session.sid:
+            self.store.delete(session.sid)
+            session.sid = None
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(24)
+            session.new = True
+        self.store.set(session.sid, self.serializer.dumps(dict(session)),
+                       int(app.permanent_session_lifetime.total_seconds()))
+        self.saves += 1
+        # id 没变且不是永久会话时不必重发 Cookie
+        if session.new or session.permanent:
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                                httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                                secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+            response.vary.add('Cookie')
+
+    def stats(self):
+        return dict(self.store.stats(), loads=self.loads, saves=self.saves, skipped=self.skipped)
+
+
+class CookieSessionInterface(SecureCookieSessionInterface):
+    """
+    Flask 默认的签名 Cookie 会话，另外与 ServerSessionInterface 一样跳过 skip_paths 下的请求：
+    静态文件的响应不会因为读取了会话而带上 Vary: Cookie，共享缓存（CDN、代理）可以直接缓存
+    """
+
+    def __init__(self, skip_paths=()):
+        self.skip_paths = tuple(skip_paths)
+        self.skipped = 0
+
+    def open_session(self, app, request):
+        if self.skip_paths and request.path.startswith(self.skip_paths):
+            self.skipped += 1
+            session = self.session_class()
+            session.skipped = True
+            return session
+        return super().open_session(app, request)
+
+    def save_session(self, app, session, response):
+        if getattr(session, 'skipped', False):
+            return
+        super().save_session(app, session, response)
+
+    def stats(self):
+        return {'skipped': self.skipped}
+
+
+def _regenerate_on_login(sender, user, **extra):
+    from flask import session
+    if isinstance(session, ServerSideSession):
+        session.regenerate()
+
+
+def init_app(app):
+    """
+    按 SESSION_BACKEND 配置会话存储：'cookie'（Flask 默认的签名 Cookie，只加上按路径跳过）、'memory' 或 'sqlite'
+    """
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'cookie':
+        app.session_interface = CookieSessionInterface(app.config['SESSION_SKIP_PATHS'])
+        metrics.register('sessions', app.session_interface.stats)
+        return
+    if backend == 'memory':
+        store = MemoryStore(app.config['SESSION_MEMORY_SIZE'])
+    elif backend == 'sqlite':
+        store = SQLiteStore(app.config['SESSION_SQLITE_PATH'] or os.path.join(app.instance_path, 'sessions.sqlite3'))
+    else:
+        raise ValueError(f'未知的 SESSION_BACKEND: {backend}')
+    app.session_interface = ServerSessionInterface(store, app.config['SESSION_SKIP_PATHS'])
+    user_logged_in.connect(_regenerate_on_login, app)
+    metrics.register('sessions', app.session_interface.stats)
@@ -0,0 +1,131 @@
+from collections import Counter
+from datetime import date
+import threading
+import time
+from . import db
+from .models import BasicInfo, Major
+from .events import on_commit
+from .cache import major_cache
+from .ages import age_on
+from . import metrics
+
+# 计数器的维度：(专业id, 性别, 年龄)，年龄由出生日期计算，所以增量维护时需要这三列
+DIMENSIONS = ('major_id', 'Gender', 'StudentBirthday')
+
+
+class StudentStats:
+    """
+    学生统计计数器：按 (专业, 性别, 年龄) 分组的人数
+    首次使用或过期后用一条 GROUP BY 查询从数据库加载，之后随 BasicInfo 的提交事件增量加减，
+    生成统计报表只需遍历这些分组，与学生总数无关；年龄每天都可能变化，所以跨天后也会重新加载
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._expires = 0
+        self._day = None
+        self._generation = 0  # 每收到一批提交事件加一，用于发现加载期间的提交
+        self.loads = 0
+        self.increments = 0
+
+    def init_app(self, app):
+        self.ttl = app.config['STATS_TTL']
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._expires = 0
+
+    def _load(self):
+        age = BasicInfo.Age.label('age')
+        stmt = (db.select(BasicInfo.major_id, BasicInfo.Gender, age, db.func.count(BasicInfo.StudentID))
+                .select_from(BasicInfo)
+                .outerjoin(Major, BasicInfo.major_id == Major.id)
+                .group_by(BasicInfo.major_id, BasicInfo.Gender, age))
+        with self._lock:
+            generation = self._generation
+        counts = Counter({(major_id, gender, age): n for major_id, gender, age, n in db.session.execute(stmt)})
+        with self._lock:
+            self._counts = counts
+            # 查询期间有提交时，无法确定查询结果是否已包含这些变更（计数不能重复加减），下次读取时重新加载
+            self._expires = time.monotonic() + self.ttl if generation == self._generation else 0
+            self._day = date.today()
+            self.loads += 1
+
+    @staticmethod
+    def _key(data):
+        major_id = data['major_id']
+        return (int(major_id) if major_id is not None else None, data['Gender'], age_on(data['StudentBirthday']))
+
+    def apply(self, changes):
+        """
+        按提交事件增量调整计数，缺少所需列的变更（如批量操作）或旧值未知的修改
+        会让计数器在下次读取时重新加载
+        """
+        with self._lock:
+            self._generation += 1
+            if not self._expires:
+                return
+            for change in changes:
+                data = change.data
+                if data is None or any(d not in data for d in DIMENSIONS):
+                    self._expires = 0
+                    return
+                if change.op == 'created':
+                    self._counts[self._key(data)] += 1
+                elif change.op == 'deleted':
+                    self._counts[self._key(data)] -= 1
+                elif set(DIMENSIONS) & set(change.previous or ()):
+                    previous = {d: change.previous[d] for d in DIMENSIONS if d in change.previous}
+                    if None in previous.values():
+                        # 修改前属性已过期（未加载）时旧值记为 None，无法确定原来所在的分组
+                        self._expires = 0
+                        return
+                    self._counts[self._key(dict(data, **previous))] -= 1
+                    self._counts[self._key(data)] += 1
+                self.increments += 1
+
+    def summary(self):
+        """统计报表：总人数、各专业人数及男女人数、总体男女人数、年龄分布"""
+        if self._expires <= time.monotonic() or self._day != date.today():
+            self._load()
+        with self._lock:
+            counts = [(key, n) for key, n in self._counts.items() if n > 0]
+        by_major = {}
+        gender = Counter()
+        ages = Counter()
+        for (major_id, sex, age), n in counts:
+            row = by_major.setdefault(major_id, Counter())
+            row['count'] += n
+            row[sex] += n
+            gender[sex] += n
+            ages[age] += n
+        majors = []
+        for major in major_cache.majors():
+            row = by_major.pop(major.id, Counter())
+            majors.append({'id': major.id, 'major_name': major.major_name, 'count': row['count'],
+                           'male': row['male'], 'female': row['female']})
+        for major_id, row in by_major.items():
+            # 未分配专业（或专业刚被删除、缓存还未刷新）的学生
+            majors.append({'id': major_id, 'major_name': None, 'count': row['count'],
+                           'male': row['male'], 'female': row['female']})
+        return {
+            'total': sum(gender.values()),
+            'majors': majors,
+            'gender': {'male': gender['male'], 'female': gender['female']},
+            'ages': [{'age': age, 'count': ages[age]} for age in sorted(ages)],
+        }
+
+    def stats(self):
+        return {'groups': len(self._counts), 'loads': self.loads, 'increments': self.increments}
+
+
+student_stats = StudentStats()
+metrics.register('student_stats', student_stats.stats)
+
+
+@on_commit(BasicInfo)
+def _update_student_stats(changes):
+    student_stats.apply(changes)
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+from functools import wraps
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from flask import request, make_response
+from sqlalchemy import event, exc
+from . import db
+from .events import on_commit
+from .models import BasicInfo, Major, TableVersion
+
+logger = logging.getLogger(__name__)
+
+# 参与版本计数的模型 -> 表名
+VERSIONED_MODELS = {BasicInfo: BasicInfo.__tablename__, Major: Major.__tablename__}
+# 补建版本表失败（如数据库暂时不可用）后多少秒内不再重试，期间 JSON 接口不带 ETag
+RETRY_SECONDS = 30
+
+_lock = threading.Lock()
+_ready = weakref.WeakSet()  # 已确认版本表和记录存在的数据库引擎
+_retry_at = weakref.WeakKeyDictionary()
+_local_bumps = {}  # 表名 -> 本进程的提交让版本号增加的次数
+
+
+def _now():
+    # 数据库中保存不带时区的 UTC 时间，精确到秒（与 Last-Modified 的精度一致）
+    return datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+
+
+def ensure_rows(connection, tables=None):
+    """为还没有版本记录的表补上一行（版本号 0）"""
+    tables = set(tables or VERSIONED_MODELS.values())
+    table = TableVersion.__table__
+    existing = set(connection.scalars(db.select(table.c.table_name).where(table.c.table_name.in_(tables))))
+    missing = sorted(tables - existing)
+    if missing:
+        connection.execute(table.insert(), [{'table_name': name, 'version': 0, 'updated_at': _now()}
+                                            for name in missing])
+
+
+@event.listens_for(TableVersion.__table__, 'after_create')
+def _create_rows(target, connection, **kw):
+    ensure_rows(connection)
+
+
+def _create_table(engine):
+    with engine.begin() as conn:
+        TableVersion.__table__.create(conn, checkfirst=True)
+        ensure_rows(conn)
+
+
+def ensure_table():
+    """
+    确认 table_versions 表和各表的版本记录存在，缺少时补建（每个进程第一次读取版本号时执行一次），
+    已有的数据库不必先运行 flask create-version-table；无法补建时返回 False
+    """
+    engine = db.engine
+    if engine in _ready:
+        return True
+    with _lock:
+        if engine in _ready:
+            return True
+        if time.monotonic() < _retry_at.get(engine, 0):
+            return False
+        try:
+            try:
+                _create_table(engine)
+            except (exc.IntegrityError, exc.OperationalError, exc.ProgrammingError):
+                _create_table(engine)  # 其他进程同时在建表或补记录，再确认一次
+        except exc.DBAPIError as e:
+            logger.warning('无法创建表版本记录，%d 秒内 JSON 接口不带 ETag: %s', RETRY_SECONDS, e)
+            _retry_at[engine] = time.monotonic() + RETRY_SECONDS
+            return False
+        _ready.add(engine)
+        return True
+
+
+@on_commit(*VERSIONED_MODELS)
+def _bump_version(changes):
+    """
+    数据变更提交后，在单独的短事务中给表的版本号加一，所有 worker 算出的 ETag 随之改变
+    写事务本身不访问版本表，并发的写入不会在版本行上排队到提交为止；这里只做 UPDATE，
+    记录还不存在时（版本表尚未补建）没有基于它的 ETag，跳过即可
+    """
+    table = VERSIONED_MODELS[changes[0].model]
+    stmt = (db.update(TableVersion).where(TableVersion.table_name == table)
+            .values(version=TableVersion.version + 1, updated_at=_now()))
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(stmt)
+    except exc.DBAPIError as e:
+        logger.warning('更新 %s 的版本号失败: %s', table, e, extra={'sample_key': ('table_versions', table)})
+    else:
+        _local_bumps[table] = _local_bumps.get(table, 0) + 1
+
+
+def local_bumps(table):
+    """本进程的提交让表的版本号增加了多少次；进程内增量维护的数据据此区分自己的变更和其他进程的变更"""
+    return _local_bumps.get(table, 0)
+
+
+def versions(*tables):
+    """若干张表当前的 (版本号元组, 最近一次变更的时间)，一条主键查询；版本表不可用时返回 (None, None)"""
+    if not ensure_table():
+        return None, None
+    stmt = db.select(TableVersion.table_name, TableVersion.version, TableVersion.updated_at) \
+        .where(TableVersion.table_name.in_(tables))
+    rows = {row.table_name: row for row in db.session.execute(stmt)}
+    version = tuple(rows[t].version if t in rows else 0 for t in tables)
+    modified = max((row.updated_at for row in rows.values()), default=None)
+    return version, modified.replace(tzinfo=timezone.utc) if modified else None
+
+
+def conditional(*tables):
+    """
+    装饰器：为只读接口加上强 ETag 和 Last-Modified
+    ETag 由表版本号和请求路径（含查询参数）算出，客户端带着相同的 If-None-Match 再次请求时
+    直接返回 304，不执行视图函数：只查一次版本表，不查询数据本身，也不序列化数据
+    版本号保存在数据库中，在数据变更提交后更新，多 worker 部署时各进程算出的 ETag 相同
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            version, modified = versions(*tables)
+            if version is None:
+                return f(*args, **kwargs)
+            raw = f'{version}:{request.full_path}'
+            etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and modified is not None and modified <= since
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if modified is not None:
+                response.last_modified = modified
+            return response
+        return decorated_function
+    return decorator
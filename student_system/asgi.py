@@ -0,0 +1,14 @@
+# ASGI 入口（异步模式），与 run.py（WSGI）并存，例如：
+#   uvicorn asgi:app --workers 4
+# 需要额外安装 requirements-async.txt 中的依赖：asgiref、greenlet 以及异步数据库驱动（MySQL 用 aiomysql，SQLite 用 aiosqlite），
+# 没有 greenlet 或异步驱动时，学生列表和导出退回同步视图（在线程池中运行）；
+# 异步驱动的地址默认由 DATABASE_URL 推出（mysql+pymysql -> mysql+aiomysql），也可以用 ASYNC_DATABASE_URL 指定
+# 学生列表、按专业筛选、导出由异步视图处理，等待数据库时不占用线程；其余路由仍是同步视图，在线程池中运行
+# 实时更新的事件流（/events）应通过本入口提供：异步模式下连接不占用线程、不限时长；
+# 通过 run.py 等 WSGI 服务器提供时每个连接占用一个线程，只保持 FEED_WSGI_MAX_SECONDS 秒后由浏览器重连
+from app import create_app
+from app.aio import AsyncApp
+from app.main.async_views import ASYNC_VIEWS
+
+flask_app = create_app()
+app = AsyncApp(flask_app, ASYNC_VIEWS)
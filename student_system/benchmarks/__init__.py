@@ -0,0 +1,18 @@
+"""
+学生信息管理系统的基准测试
+
+在 student_system 目录下运行：
+    python -m benchmarks --students 10000 --requests 500 --concurrency 4 --output bench.json
+    python -m benchmarks --scenarios index,major_filter --set PAGE_CACHE_ENABLED=0 --compare bench.json
+
+通过 create_app 按基准测试配置创建应用，默认使用临时目录中的 SQLite 文件
+（--database-url 可以指向本地 MySQL），按指定数量生成专业、学生、用户数据，
+用 Flask 测试客户端在多个线程中并发执行各场景，输出每个场景的 p50/p95/p99 延迟、吞吐量和每个请求的 SQL 条数（JSON），
+不同提交的结果可以用 --compare 对比
+
+启动耗时检查（导入应用 + create_app，超出预算时返回非零状态）：
+    python -m benchmarks.startup --budget-ms 1500 --app-budget-ms 80
+
+会话存储开销对比（cookie / memory / sqlite 三种 SESSION_BACKEND）：
+    python -m benchmarks.sessions --requests 2000
+"""
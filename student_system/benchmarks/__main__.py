@@ -0,0 +1,57 @@
+import argparse
+import json
+import sys
+from .runner import run, compare
+from .scenarios import SCENARIOS
+
+
+def parse_overrides(values):
+    """--set KEY=VALUE 覆盖应用配置，值按 JSON 解析（如 0、false、"abc"），解析失败时当作字符串"""
+    overrides = {}
+    for item in values:
+        key, _, value = item.partition('=')
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+    return overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='学生信息管理系统基准测试')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"逗号分隔的场景名，可选：{', '.join(SCENARIOS)}")
+    parser.add_argument('--majors', type=int, default=20, help='专业数')
+    parser.add_argument('--students', type=int, default=10000, help='学生数')
+    parser.add_argument('--users', type=int, default=100, help='普通用户数')
+    parser.add_argument('--requests', type=int, default=200, help='每个场景计时的请求数')
+    parser.add_argument('--concurrency', type=int, default=4, help='并发线程数')
+    parser.add_argument('--warmup', type=int, default=5, help='每个线程预热（不计时）的请求数')
+    parser.add_argument('--database-url', help='数据库地址，默认使用临时目录中的 SQLite 文件（会清空其中的表）')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE', help='覆盖应用配置，可重复')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+    parser.add_argument('--output', help='结果 JSON 的保存路径，默认输出到标准输出')
+    parser.add_argument('--compare', metavar='BASELINE', help='与之前保存的结果 JSON 对比')
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知的场景：{', '.join(unknown)}")
+
+    result = run(scenarios, majors=args.majors, students=args.students, users=args.users,
+                 requests=args.requests, concurrency=args.concurrency, warmup=args.warmup,
+                 database_url=args.database_url, overrides=parse_overrides(args.set), seed_value=args.seed)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(json.load(f), result), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import sqlalchemy
+from sqlalchemy import event
+from config import Config
+from app import create_app, db
+from .seed import seed
+from .scenarios import SCENARIOS
+
+
+def benchmark_config(database_url=None, overrides=None):
+    """
+    基准测试使用的配置：Config 的子类
+    默认使用临时目录里的 SQLite 文件；关闭 CSRF（测试客户端不带令牌）和限速（否则大部分请求会被429拒绝）
+    """
+    if database_url is None:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='student-bench-'), 'bench.db')
+    attrs = {'SQLALCHEMY_DATABASE_URI': database_url, 'WTF_CSRF_ENABLED': False, 'RATELIMIT_ENABLED': False}
+    attrs.update(overrides or {})
+    return type('BenchmarkConfig', (Config,), attrs)
+
+
+class QueryCounter:
+    """按线程统计执行的 SQL 条数（测试客户端在调用线程中处理请求，所以线程内的计数就是该请求的查询数）"""
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def take(self):
+        count = getattr(self._local, 'count', 0)
+        self._local.count = 0
+        return count
+
+
+def percentile(values, q):
+    """最近秩法的百分位数，values 需已排序"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values) + 0.5) - 1))]
+
+
+def run_scenario(scenario, counter, requests, concurrency, warmup, seed=0):
+    """并发执行一个场景，返回该场景的统计"""
+    scenario.prepare(requests + warmup * concurrency)
+    per_thread = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    ready = threading.Barrier(concurrency + 1)
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client = scenario.app.test_client()
+        try:
+            scenario.setup(client)
+            for _ in range(warmup):
+                scenario.step(client, rng)
+        except BaseException:
+            ready.abort()  # 让其他线程和主线程不再等待，异常由 future.result() 抛出
+            raise
+        samples = []
+        ready.wait()
+        for _ in range(per_thread[index]):
+            counter.take()
+            start = time.perf_counter()
+            response = scenario.step(client, rng)
+            elapsed = time.perf_counter() - start
+            samples.append((elapsed, counter.take(), response.status_code))
+        return samples
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(worker, i) for i in range(concurrency)]
+        try:
+            ready.wait()
+        except threading.BrokenBarrierError:
+            pass
+        start = time.perf_counter()
+        samples = [sample for future in futures for sample in future.result()]
+        wall = time.perf_counter() - start
+
+    latencies = sorted(elapsed * 1000 for elapsed, _, _ in samples)
+    queries = [n for _, n, _ in samples]
+    return {
+        'requests': len(samples),
+        'errors': sum(status >= 400 for _, _, status in samples),
+        'throughput_rps': round(len(samples) / wall, 2) if wall else None,
+        'latency_ms': {
+            'p50': _round(percentile(latencies, 50)),
+            'p95': _round(percentile(latencies, 95)),
+            'p99': _round(percentile(latencies, 99)),
+            'mean': _round(sum(latencies) / len(latencies)) if latencies else None,
+            'max': _round(latencies[-1]) if latencies else None,
+        },
+        'queries_per_request': {
+            'mean': round(sum(queries) / len(queries), 2) if queries else None,
+            'max': max(queries, default=None),
+        },
+    }
+
+
+def run(scenarios, majors, students, users, requests, concurrency, warmup=5,
+        database_url=None, overrides=None, seed_value=0):
+    """生成数据并依次执行各场景，返回可以保存为 JSON 的结果"""
+    app = create_app(benchmark_config(database_url, overrides))
+    data = seed(app, majors=majors, students=students, users=users, seed=seed_value)
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        backend = db.engine.url.get_backend_name()
+    results = {}
+    for name in scenarios:
+        scenario = SCENARIOS[name](app, data)
+        results[name] = run_scenario(scenario, counter, requests, concurrency, warmup, seed_value)
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'database': backend,
+            'majors': majors, 'students': students, 'users': users,
+            'requests': requests, 'concurrency': concurrency, 'warmup': warmup,
+            'overrides': overrides or {},
+        },
+        'scenarios': results,
+    }
+
+
+def compare(baseline, current):
+    """与之前保存的结果对比，返回每个场景 p50/p95/吞吐量/查询数变化的文本表格"""
+    lines = [f"{'场景':<14}{'指标':<22}{'基准':>12}{'当前':>12}{'变化':>10}"]
+    metrics = (('latency_ms', 'p50'), ('latency_ms', 'p95'), ('throughput_rps', None), ('queries_per_request', 'mean'))
+    for name, result in current['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if old is None:
+            continue
+        for group, key in metrics:
+            before = old[group][key] if key else old[group]
+            after = result[group][key] if key else result[group]
+            change = f'{(after - before) / before * 100:+.1f}%' if before and after is not None else '-'
+            label = f'{group}.{key}' if key else group
+            lines.append(f'{name:<14}{label:<22}{before!s:>12}{after!s:>12}{change:>10}')
+    return '\n'.join(lines)
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,120 @@
+import itertools
+import random
+import threading
+from .seed import PASSWORD, student_row, insert_students
+
+
+class Scenario:
+    """
+    一个被测流程
+    setup(client) 在每个线程开始前执行一次（如登录），step(client, rng) 发出一个被计时的请求并返回响应
+    """
+    name = None
+
+    def __init__(self, app, data):
+        self.app = app
+        self.data = data
+
+    def prepare(self, total):
+        """所有线程开始前执行一次，total 为计划发出的请求数（含预热）"""
+
+    def setup(self, client):
+        pass
+
+    def step(self, client, rng):
+        raise NotImplementedError
+
+    def random_student(self, rng):
+        return rng.randint(*self.data['student_ids'])
+
+    def login(self, client, username='admin'):
+        response = client.post('/auth/login', data={'username': username, 'password': PASSWORD})
+        if response.status_code != 302:
+            raise RuntimeError(f'基准测试用户 {username} 登录失败')
+
+
+class Index(Scenario):
+    """匿名用户浏览学生列表：首页和随机位置的翻页"""
+    name = 'index'
+
+    def step(self, client, rng):
+        if rng.random() < 0.5:
+            return client.get('/')
+        return client.get(f'/?after={self.random_student(rng)}')
+
+
+class MajorFilter(Scenario):
+    """匿名用户按专业筛选"""
+    name = 'major_filter'
+
+    def step(self, client, rng):
+        return client.get(f"/major/{rng.choice(self.data['majors'])}")
+
+
+class Login(Scenario):
+    """用户登录（包含密码校验），每次都用新的客户端，相当于一个新会话"""
+    name = 'login'
+
+    def step(self, client, rng):
+        username = f"user{rng.randint(1, self.data['users'])}" if self.data['users'] else 'admin'
+        return self.app.test_client().post('/auth/login', data={'username': username, 'password': PASSWORD})
+
+
+class New(Scenario):
+    """管理员新增学生，学号接在已有数据之后"""
+    name = 'new'
+
+    def prepare(self, total):
+        self._ids = itertools.count(self.data['student_ids'][1] + 1_000_000)
+        self._lock = threading.Lock()
+
+    def setup(self, client):
+        self.login(client)
+
+    def step(self, client, rng):
+        with self._lock:
+            student_id = next(self._ids)
+        row = student_row(student_id, self.data['majors'], rng)
+        return client.post('/new', data={
+            'StudentID': student_id, 'Name': row['Name'], 'Gender': row['Gender'],
+            'StudentBirthday': row['StudentBirthday'].isoformat(), 'major': row['major_id'],
+        })
+
+
+class Edit(Scenario):
+    """管理员修改随机学生的姓名和专业"""
+    name = 'edit'
+
+    def setup(self, client):
+        self.login(client)
+
+    def step(self, client, rng):
+        row = student_row(self.random_student(rng), self.data['majors'], rng)
+        return client.post(f"/edit/{row['StudentID']}", data={
+            'StudentID': row['StudentID'], 'Name': row['Name'] + '改', 'Gender': row['Gender'],
+            'StudentBirthday': row['StudentBirthday'].isoformat(), 'major': row['major_id'],
+        })
+
+
+class Delete(Scenario):
+    """管理员删除学生；被删除的学生在开始前单独插入，不影响其他场景使用的数据"""
+    name = 'delete'
+
+    def prepare(self, total):
+        first = self.data['student_ids'][1] + 2_000_000
+        rng = random.Random(0)
+        with self.app.app_context():
+            insert_students([student_row(first + i, self.data['majors'], rng) for i in range(total)])
+        self._ids = iter(range(first, first + total))
+        self._lock = threading.Lock()
+
+    def setup(self, client):
+        self.login(client)
+
+    def step(self, client, rng):
+        with self._lock:
+            student_id = next(self._ids)
+        return client.post(f'/delete/{student_id}')
+
+
+SCENARIOS = {cls.name: cls for cls in (Index, MajorFilter, Login, New, Edit, Delete)}
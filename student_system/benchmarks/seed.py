@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+import random
+from app import db
+from app.models import User, Major, BasicInfo
+from app.ages import age_on
+from app.passwords import password_hasher
+
+# 基准测试用户的统一密码；所有用户共用同一个哈希，生成数据时只需计算一次
+PASSWORD = 'benchmark-password'
+# 学生学号从这里开始连续编号
+FIRST_STUDENT_ID = 100000
+
+
+def student_row(student_id, major_ids, rng):
+    birthday = date(1995, 1, 1) + timedelta(days=rng.randrange(365 * 10))
+    return {
+        'StudentID': student_id,
+        'Name': f'学生{student_id}',
+        'Gender': rng.choice(('male', 'female')),
+        'StudentBirthday': birthday,
+        'Age': age_on(birthday),
+        'major_id': rng.choice(major_ids) if major_ids else None,
+    }
+
+
+def insert_students(rows, batch_size=1000):
+    """按批 executemany 插入学生（与批量导入相同的方式），不经过 ORM 和变更事件"""
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(BasicInfo.__table__.insert(), rows[start:start + batch_size])
+    db.session.commit()
+
+
+def seed(app, majors=20, students=10000, users=100, seed=0):
+    """
+    重建表并生成数据，返回数据概况
+    用户名为 admin（管理员）和 user1..userN（普通用户），密码都是 PASSWORD
+    """
+    rng = random.Random(seed)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(Major.__table__.insert(), [{'major_name': f'专业{i}'} for i in range(1, majors + 1)])
+        db.session.commit()
+        major_ids = list(db.session.scalars(db.select(Major.id)))
+        insert_students([student_row(FIRST_STUDENT_ID + i, major_ids, rng) for i in range(students)])
+        pw_hash = password_hasher.hash(PASSWORD)
+        accounts = [{'username': 'admin', 'role': 'admin', 'password_hash': pw_hash}]
+        accounts += [{'username': f'user{i}', 'role': 'guest', 'password_hash': pw_hash} for i in range(1, users + 1)]
+        db.session.execute(User.__table__.insert(), accounts)
+        db.session.commit()
+    return {'majors': major_ids, 'students': students, 'users': users,
+            'student_ids': (FIRST_STUDENT_ID, FIRST_STUDENT_ID + students - 1)}
@@ -0,0 +1,105 @@
+"""
+启动耗时检查：在新的 Python 进程中测量导入应用和 create_app() 的耗时，超出预算时以非零状态退出，可以放进 CI
+
+    python -m benchmarks.startup --budget-ms 1500 --app-budget-ms 80
+
+tests/test_startup.py 用同样的测量在测试中检查预算（预算由 STARTUP_*_BUDGET_MS 环境变量调整）
+
+同时测量创建应用后第一个请求（/auth/login，渲染继承 bootstrap/base.html 并导入 bootstrap/wtf.html 的模板）的耗时，
+以及模板预编译的耗时和字节码缓存命中数；用 --env 对比不同配置，例如：
+    python -m benchmarks.startup --env TEMPLATE_WARMUP=0 --env TEMPLATE_BYTECODE_CACHE=0
+
+每次都在全新的解释器里运行（-X importtime），取多次的中位数；
+app_import_ms 只统计本项目模块（app、app.*、config）自身的导入耗时，是代码改动最直接影响的部分
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# 在子进程中执行：导入并创建应用，打印耗时（毫秒）
+PROBE = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+app.test_client().get('/auth/login')
+served = time.perf_counter()
+from app.templating import template_warmup
+print(json.dumps({'import_ms': (imported - start) * 1000, 'create_app_ms': (created - imported) * 1000,
+                  'first_request_ms': (served - created) * 1000, 'templates': template_warmup.stats()}))
+"""
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def app_module(name):
+    return name in ('app', 'config') or name.startswith('app.')
+
+
+def measure_once(database_url, extra_env=None):
+    env = dict(os.environ, DATABASE_URL=database_url, **(extra_env or {}))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE], cwd=APP_ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    own = 0
+    modules = {}
+    # -X importtime 的输出：import time: 自身微秒 | 累计微秒 | 模块名（缩进表示层级）
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if app_module(name):
+            own += int(self_us)
+            modules[name] = int(self_us) / 1000
+    result['app_import_ms'] = own / 1000
+    result['app_modules_ms'] = modules
+    return result
+
+
+def measure(runs=5, database_url='sqlite://', extra_env=None):
+    """
+    运行 runs 次，返回各项耗时的中位数（毫秒）以及本项目各模块的导入耗时、模板统计（最后一次）
+    第一次运行时模板字节码缓存可能还是空的，之后的运行相当于重启或扩容后的新 worker
+    """
+    samples = [measure_once(database_url, extra_env) for _ in range(runs)]
+    summary = {key: round(statistics.median(s[key] for s in samples), 1)
+               for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'app_import_ms')}
+    summary['total_ms'] = round(summary['import_ms'] + summary['create_app_ms'], 1)
+    summary['runs'] = runs
+    summary['templates'] = samples[-1]['templates']
+    summary['app_modules_ms'] = {name: round(ms, 2) for name, ms in
+                                 sorted(samples[-1]['app_modules_ms'].items(), key=lambda item: -item[1])}
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup', description='应用启动耗时检查')
+    parser.add_argument('--runs', type=int, default=5, help='测量次数，取中位数')
+    parser.add_argument('--budget-ms', type=float, help='导入 + create_app 总耗时的上限（毫秒）')
+    parser.add_argument('--app-budget-ms', type=float, help='本项目模块自身导入耗时的上限（毫秒）')
+    parser.add_argument('--database-url', default='sqlite://',
+                        help='创建应用时使用的数据库地址（启动时不会连接数据库，默认用 SQLite 避免依赖 MySQL 驱动）')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='传给子进程的环境变量（覆盖对应配置），可重复')
+    args = parser.parse_args(argv)
+
+    summary = measure(args.runs, args.database_url, dict(item.split('=', 1) for item in args.env))
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    failures = []
+    if args.budget_ms is not None and summary['total_ms'] > args.budget_ms:
+        failures.append(f"启动总耗时 {summary['total_ms']}ms 超出预算 {args.budget_ms}ms")
+    if args.app_budget_ms is not None and summary['app_import_ms'] > args.app_budget_ms:
+        failures.append(f"本项目模块导入耗时 {summary['app_import_ms']}ms 超出预算 {args.app_budget_ms}ms")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
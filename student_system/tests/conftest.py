@@ -0,0 +1,83 @@
+from datetime import date
+import threading
+import pytest
+from sqlalchemy import event
+from config import TestConfig
+from app import create_app, db
+from app.models import User, Major, BasicInfo
+from app.passwords import password_hasher
+
+PASSWORD = 'test-password'
+# 测试学生的学号从这里开始连续编号
+FIRST_STUDENT_ID = 100000
+
+
+class StatementCounter:
+    """统计引擎执行的 SQL 条数（按线程计数，测试客户端在调用线程中处理请求）"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def take(self):
+        count = getattr(self._local, 'count', 0)
+        self._local.count = 0
+        return count
+
+    def close(self):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def seed(students=600, majors=120, first_major_students=150):
+    """
+    建表并生成专业、学生和两个用户（admin 为管理员，guest 为普通用户，密码都是 PASSWORD）
+    学号最大的 first_major_students 名学生属于第一个专业，其余学生轮流分到其他专业（相邻学生的专业各不相同）
+    """
+    db.create_all()
+    db.session.execute(Major.__table__.insert(), [{'major_name': f'专业{i}'} for i in range(1, majors + 1)])
+    major_ids = list(db.session.scalars(db.select(Major.id)))
+    rows = []
+    for i in range(students):
+        major_id = major_ids[0] if i >= students - first_major_students else major_ids[1 + i % (majors - 1)]
+        rows.append({'StudentID': FIRST_STUDENT_ID + i, 'Name': f'学生{i}', 'Gender': ('male', 'female')[i % 2],
+                     'StudentBirthday': date(1995 + i % 10, 1 + i % 12, 1 + i % 28), 'Age': 20,
+                     'major_id': major_id})
+    db.session.execute(BasicInfo.__table__.insert(), rows)
+    pw_hash = password_hasher.hash(PASSWORD)
+    db.session.execute(User.__table__.insert(), [
+        {'username': 'admin', 'role': 'admin', 'password_hash': pw_hash},
+        {'username': 'guest', 'role': 'guest', 'password_hash': pw_hash},
+    ])
+    db.session.commit()
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        seed()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    with app.app_context():
+        counter = StatementCounter(db.engine)
+    yield counter
+    counter.close()
+
+
+def login(client, username='admin'):
+    return client.post('/auth/login', data={'username': username, 'password': PASSWORD})
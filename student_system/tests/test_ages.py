@@ -0,0 +1,56 @@
+"""
+年龄由出生日期计算：Python 端和 SQL 端算出的周岁一致，年龄范围换算成的出生日期范围不多不少；
+新建和修改出生日期时同步保留的 Age 列；flask reconcile-ages 分段校正已有数据
+"""
+from datetime import date, timedelta
+from conftest import FIRST_STUDENT_ID
+from app import db
+from app.ages import age_on, birthday_range
+from app.models import BasicInfo
+
+
+def test_age_on_boundaries():
+    assert age_on(date(2000, 5, 10), today=date(2020, 5, 9)) == 19
+    assert age_on(date(2000, 5, 10), today=date(2020, 5, 10)) == 20
+    # 2月29日出生的人在非闰年3月1日满岁
+    assert age_on(date(2004, 2, 29), today=date(2023, 2, 28)) == 18
+    assert age_on(date(2004, 2, 29), today=date(2023, 3, 1)) == 19
+    assert age_on('2000-05-10', today=date(2020, 5, 10)) == 20
+    assert age_on(None) is None
+
+
+def test_birthday_range_matches_age_on():
+    today = date(2024, 3, 1)
+    earliest, latest = birthday_range(min_age=18, max_age=20, today=today)
+    for day in (earliest, latest):
+        assert 18 <= age_on(day, today) <= 20
+    assert age_on(earliest - timedelta(days=1), today) == 21
+    assert age_on(latest + timedelta(days=1), today) == 17
+    assert birthday_range(today=today) == (None, None)
+
+
+def test_sql_age_matches_python(app):
+    with app.app_context():
+        rows = db.session.execute(db.select(BasicInfo.StudentBirthday, BasicInfo.Age)).all()
+    assert all(age == age_on(birthday) for birthday, age in rows)
+
+
+def test_stored_age_follows_birthday(app):
+    with app.app_context():
+        db.session.add(BasicInfo(StudentID=1, Name='新生', Gender='male', StudentBirthday=date(2001, 1, 1)))
+        db.session.get(BasicInfo, FIRST_STUDENT_ID).StudentBirthday = date(2002, 1, 1)
+        db.session.commit()
+        stored = dict(db.session.execute(db.text('SELECT StudentID, Age FROM basicinfo WHERE StudentID IN (1, :id)'),
+                                         {'id': FIRST_STUDENT_ID}).all())
+    assert stored == {1: age_on(date(2001, 1, 1)), FIRST_STUDENT_ID: age_on(date(2002, 1, 1))}
+
+
+def test_reconcile_ages(app):
+    # 测试数据的 Age 列都写成了 20
+    result = app.test_cli_runner().invoke(args=['reconcile-ages', '--batch-size', '7'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        rows = db.session.execute(db.text('SELECT StudentBirthday, Age FROM basicinfo')).all()
+    expected = sum(age_on(birthday) != 20 for birthday, _ in rows)
+    assert f'已校正 {expected} 条记录的年龄' in result.output
+    assert all(age == age_on(birthday) for birthday, age in rows)
@@ -0,0 +1,55 @@
+"""JSON 接口的条件 GET：ETag 由数据库中的表版本号算出，任何进程提交的变更都会让它失效"""
+from conftest import FIRST_STUDENT_ID, login
+from app import db
+from app.models import BasicInfo, TableVersion
+
+
+def test_not_modified_until_commit(app, client):
+    first = client.get('/api/v1/students?limit=5')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert not etag.startswith('W/')
+    assert client.get('/api/v1/students?limit=5', headers={'If-None-Match': etag}).status_code == 304
+
+    # 在请求之外提交（相当于另一个 worker 的写入）
+    with app.app_context():
+        db.session.get(BasicInfo, FIRST_STUDENT_ID).Name = '改名'
+        db.session.commit()
+    changed = client.get('/api/v1/students?limit=5', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['items'][0]['Name'] == '改名'
+
+
+def test_rolled_back_write_keeps_etag(app, client):
+    etag = client.get('/api/v1/majors').headers['ETag']
+    with app.app_context():
+        db.session.get(BasicInfo, FIRST_STUDENT_ID).Name = '改名'
+        db.session.flush()
+        db.session.rollback()
+    assert client.get('/api/v1/majors', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_bulk_write_changes_etag(client):
+    etag = client.get('/api/v1/stats').headers['ETag']
+    login(client)
+    response = client.delete('/api/v1/students/bulk', json={'ids': [FIRST_STUDENT_ID]})
+    assert response.get_json() == {'deleted': 1}
+    assert client.get('/api/v1/stats', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_missing_version_table(app, client):
+    # 升级前的数据库没有 table_versions：写入照常提交，JSON 接口第一次用到时补建
+    with app.app_context():
+        TableVersion.__table__.drop(db.engine)
+    login(client)
+    response = client.post(f'/delete/{FIRST_STUDENT_ID}')
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.get(BasicInfo, FIRST_STUDENT_ID) is None
+    etag = client.get('/api/v1/students?limit=5').headers['ETag']
+    assert client.get('/api/v1/students?limit=5', headers={'If-None-Match': etag}).status_code == 304
+    with app.app_context():
+        db.session.get(BasicInfo, FIRST_STUDENT_ID + 1).Name = '改名'
+        db.session.commit()
+    assert client.get('/api/v1/students?limit=5', headers={'If-None-Match': etag}).status_code == 200
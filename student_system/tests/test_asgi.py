@@ -0,0 +1,115 @@
+"""
+通过 AsyncApp（asgi.py 的 ASGI 应用）请求学生列表、导出和变更事件流
+安装了 requirements-async.txt 时走异步视图，缺少 greenlet 或异步驱动时应退回同步视图，结果相同
+"""
+import asyncio
+import pytest
+from sqlalchemy.exc import ArgumentError
+from config import TestConfig
+from conftest import FIRST_STUDENT_ID, seed
+from app import create_app, db
+
+pytest.importorskip('asgiref')
+
+from app.aio import AsyncApp, aio_db  # noqa: E402
+from app.main.async_views import ASYNC_VIEWS  # noqa: E402
+from app.feed import change_feed  # noqa: E402
+
+
+@pytest.fixture
+def asgi_app(tmp_path):
+    # 异步引擎要和同步引擎访问同一个数据库，不能用内存中的 SQLite
+    config = type('AsgiTestConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'), 'FEED_HEARTBEAT': 1})
+    flask_app = create_app(config)
+    with flask_app.app_context():
+        seed(students=30, majors=3, first_major_students=10)
+    yield AsyncApp(flask_app, ASYNC_VIEWS)
+    with flask_app.app_context():
+        db.engine.dispose()
+
+
+async def call(app, path, query=b'', until=None):
+    """
+    发送一个 GET 请求，返回 (状态码, 响应头, 响应体)
+    until: 流式响应收到包含该字节串的数据后模拟客户端断开
+    """
+    disconnect = asyncio.Event()
+    requested = False
+    status, headers, body = None, {}, b''
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status, headers, body
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in message['headers']}
+        elif message['type'] == 'http.response.body':
+            body += message.get('body', b'')
+            if until is not None and until in body:
+                disconnect.set()
+            if not message.get('more_body'):
+                disconnect.set()
+
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+             'query_string': query, 'headers': [(b'host', b'testserver')],
+             'client': ('127.0.0.1', 50000), 'server': ('testserver', 80)}
+    await asyncio.wait_for(app(scope, receive, send), 10)
+    return status, headers, body
+
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await aio_db.dispose()
+    return asyncio.run(main())
+
+
+def async_db_available():
+    try:
+        aio_db.check()
+    except (ImportError, ArgumentError):
+        return False
+    return True
+
+
+def test_index(asgi_app):
+    # 没有异步驱动时列表页交给同步视图，而不是返回500
+    assert ('main.index' in asgi_app.views) == async_db_available()
+    status, headers, body = run(call(asgi_app, '/'))
+    assert status == 200
+    assert f'id="student-{FIRST_STUDENT_ID}"'.encode() in body
+
+
+def test_export(asgi_app):
+    status, headers, body = run(call(asgi_app, '/export', b'format=csv'))
+    assert status == 200
+    assert headers['content-type'].startswith('text/csv')
+    lines = body.decode('utf-8-sig').strip().splitlines()
+    assert len(lines) == 31  # 表头 + 30 名学生
+
+
+def test_events(asgi_app):
+    async def scenario():
+        request = asyncio.ensure_future(call(asgi_app, '/events', until=b'"pk": 1'))
+        while not change_feed.stats()['clients'] and not request.done():
+            await asyncio.sleep(0.01)
+        change_feed.publish('student', {'op': 'deleted', 'pk': 1})
+        return await request
+
+    clients = change_feed.stats()['clients']
+    status, headers, body = run(scenario())
+    assert status == 200
+    assert headers['content-type'].startswith('text/event-stream')
+    assert b'event: student' in body
+    assert change_feed.stats()['clients'] == clients  # 断开后取消订阅
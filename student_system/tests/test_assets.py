@@ -0,0 +1,25 @@
+"""构建后的静态文件：带内容哈希的地址可以被浏览器和共享缓存长期缓存"""
+import pytest
+from config import TestConfig
+from app import create_app
+from app.assets import assets, build_app_assets
+
+
+@pytest.fixture
+def built_app(tmp_path):
+    app = create_app(type('AssetsTestConfig', (TestConfig,), {'ASSETS_DIR': str(tmp_path / 'assets')}))
+    build_app_assets(app)
+    return app
+
+
+def test_hashed_asset_is_publicly_cacheable(built_app):
+    client = built_app.test_client()
+    client.set_cookie('session', 'anything')
+    with built_app.test_request_context():
+        url = assets.url('style.css')
+    assert url.startswith('/assets/style.')
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert 'Cookie' not in response.vary
+    assert 'Set-Cookie' not in response.headers
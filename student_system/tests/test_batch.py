@@ -0,0 +1,30 @@
+"""批量删除/修改只为实际存在的学生发布变更事件"""
+import json
+from conftest import FIRST_STUDENT_ID, login
+from app.feed import change_feed
+
+
+def published(subscriber):
+    return [json.loads(text.split('data: ', 1)[1]) for _, text in subscriber.wait(0)]
+
+
+def test_bulk_delete_publishes_only_deleted_ids(client):
+    login(client)
+    subscriber = change_feed.subscribe()
+    try:
+        response = client.delete('/api/v1/students/bulk', json={'ids': [FIRST_STUDENT_ID, 99]})
+        assert response.get_json() == {'deleted': 1}
+        assert [(e['op'], e['pk']) for e in published(subscriber)] == [('deleted', FIRST_STUDENT_ID)]
+    finally:
+        change_feed.unsubscribe(subscriber)
+
+
+def test_bulk_update_publishes_only_updated_ids(client):
+    login(client)
+    subscriber = change_feed.subscribe()
+    try:
+        response = client.patch('/api/v1/students/bulk', json={'ids': [99, FIRST_STUDENT_ID + 1], 'major_id': 2})
+        assert response.get_json() == {'updated': 1}
+        assert [(e['op'], e['pk']) for e in published(subscriber)] == [('updated', FIRST_STUDENT_ID + 1)]
+    finally:
+        change_feed.unsubscribe(subscriber)
@@ -0,0 +1,101 @@
+"""
+错误响应和日志：匿名用户的错误页面只渲染一次，登录用户照常渲染；JSON 请求返回带路径的 JSON；
+重复的客户端错误日志按键和分组采样；非阻塞日志队列满时丢弃而不是等待
+"""
+import atexit
+import logging
+import threading
+from flask import template_rendered
+from conftest import login
+from app.logs import NonBlockingQueueHandler, SamplingFilter
+
+
+def test_anonymous_error_page_rendered_once(app, client):
+    client.get('/no-such-page')
+    rendered = []
+
+    def record(sender, template, context, **extra):
+        rendered.append(template.name)
+
+    with template_rendered.connected_to(record, app):
+        first = client.get('/scan/a.php')
+        second = client.get('/scan/b.php')
+        assert first.status_code == second.status_code == 404
+        assert first.get_data() == second.get_data()
+        assert 'Accept' in first.vary
+        assert rendered == []
+
+        login(client)
+        client.get('/')  # 取出登录时的 flash 消息
+        rendered.clear()
+        html = client.get('/scan/c.php').get_data(as_text=True)
+    assert 'Ciallo, admin' in html
+    assert 'errors/generic.html' in rendered
+
+def test_json_error(client):
+    response = client.get('/no-such-page', headers={'Accept': 'application/json'})
+    assert response.status_code == 404
+    assert response.get_json()['code'] == 404
+    assert response.get_json()['details'].endswith('/no-such-page')
+
+
+def make_record(message, sample_key=None):
+    record = logging.LogRecord('app', logging.WARNING, __file__, 1, message, None, None)
+    if sample_key is not None:
+        record.sample_key = sample_key
+    return record
+
+
+def test_sampling_filter():
+    sampler = SamplingFilter(window=60, repeats=2, limit=3)
+    results = [sampler.filter(make_record('404', (404, '/a'))) for _ in range(3)]
+    assert results == [True, True, False]
+    record = make_record('404', (404, '/b'))
+    assert sampler.filter(record)
+    assert record.msg.endswith('（此前另有 1 条同类日志被采样丢弃）')
+    assert not sampler.filter(make_record('404', (404, '/c')))  # 同组已达 limit
+    assert sampler.filter(make_record('other'))  # 没有 sample_key 不受影响
+    assert sampler.sampled == 2
+
+    sampler._window_start -= 60  # 进入下一个窗口
+    record = make_record('404', (404, '/a'))
+    assert sampler.filter(record)
+    assert record.msg.endswith('（此前另有 1 条同类日志被采样丢弃）')
+
+
+class BlockingHandler(logging.Handler):
+    """处理第一条日志时阻塞，直到 unblock 被设置"""
+
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.unblock.wait(5)
+        self.messages.append(record.getMessage())
+
+
+def test_queue_handler_drops_when_full():
+    target = BlockingHandler()
+    handler = NonBlockingQueueHandler([target], maxsize=2)
+    logger = logging.getLogger('tests.nonblocking')
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        args = ['原值']
+        logger.warning('参数 %s', args)
+        args[0] = '已修改'  # 参数在入队时已合并进消息
+        for i in range(10):
+            logger.warning('日志 %d', i)
+        assert handler.dropped > 0
+        assert handler.queued + handler.dropped == 11
+        target.unblock.set()
+        handler.queue.join()
+        handler.listener.stop()
+        atexit.unregister(handler.listener.stop)
+        assert target.messages[0] == "参数 ['原值']"
+        assert len(target.messages) == handler.queued
+    finally:
+        target.unblock.set()
+        logger.removeHandler(handler)
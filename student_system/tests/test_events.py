@@ -0,0 +1,88 @@
+"""
+同步（WSGI）模式下的变更事件流 /events：HEAD 请求和断开的连接不留下订阅，连接限时结束，
+重连到其他进程时只有期间数据有变化才发送 reset；已关闭的异步连接不影响其他连接收到事件
+"""
+import asyncio
+import time
+import pytest
+from config import TestConfig
+from conftest import FIRST_STUDENT_ID, seed
+from app import create_app, db
+from app.feed import change_feed
+from app.models import BasicInfo
+
+
+@pytest.fixture
+def feed_app():
+    config = type('FeedTestConfig', (TestConfig,), {'FEED_HEARTBEAT': 1, 'FEED_WSGI_MAX_SECONDS': 1})
+    app = create_app(config)
+    with app.app_context():
+        seed(students=10, majors=2, first_major_students=5)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_head_is_refused(feed_app):
+    client = feed_app.test_client()
+    clients = change_feed.stats()['clients']
+    for _ in range(3):
+        assert client.head('/events').status_code == 405
+    assert change_feed.stats()['clients'] == clients
+
+
+def test_closed_stream_unsubscribes(feed_app):
+    clients = change_feed.stats()['clients']
+    response = feed_app.test_client().get('/events', buffered=False)
+    body = iter(response.response)
+    assert next(body).startswith(b'retry: 3000\n')
+    assert change_feed.stats()['clients'] == clients + 1
+    response.close()
+    assert change_feed.stats()['clients'] == clients
+
+
+def test_wsgi_stream_is_time_limited(feed_app):
+    clients = change_feed.stats()['clients']
+    response = feed_app.test_client().get('/events')  # 读取完整响应体：FEED_WSGI_MAX_SECONDS 后结束
+    assert response.status_code == 200
+    assert response.get_data().startswith(b'retry: 3000\n')
+    assert change_feed.stats()['clients'] == clients
+
+
+def opening(app, last_event_id):
+    """发起一个事件流请求，返回开头两段数据（reset 或第一次心跳）后断开"""
+    response = app.test_client().get('/events', headers={'Last-Event-ID': last_event_id}, buffered=False)
+    body = iter(response.response)
+    try:
+        return b''.join([next(body), next(body)]).decode('utf-8')
+    finally:
+        response.close()
+
+
+def test_resume_on_other_process(feed_app):
+    # 另一个 worker 发出的 id：连接以来数据没有变化时当作新连接，不让页面重新加载
+    since = int(time.time()) + 1
+    first = opening(feed_app, f'otherworker-7-{since}')
+    assert 'id: ' in first and 'reset' not in first
+    assert first.split('id: ')[1].startswith(change_feed.epoch + '-')
+
+    with feed_app.app_context():
+        db.session.get(BasicInfo, FIRST_STUDENT_ID).Name = '改名'
+        db.session.commit()
+    # 连接时间早于这次修改：客户端可能错过了其他进程的变更
+    assert 'event: reset' in opening(feed_app, f'otherworker-7-{int(time.time()) - 5}')
+    # 没有连接时间的旧 id 无法判断，同样 reset
+    assert 'event: reset' in opening(feed_app, 'otherworker-7')
+
+
+def test_closed_event_loop_does_not_block_publish():
+    closed = change_feed.subscribe()
+    asyncio.run(closed.wait_async(0))  # 订阅绑定的事件循环随即关闭
+    live = change_feed.subscribe()
+    try:
+        change_feed.publish('major', {'op': 'deleted', 'pk': 1})
+        assert [text for _, text in live.wait(0)][0].startswith('id: ')
+        assert closed not in change_feed._subscribers
+    finally:
+        change_feed.unsubscribe(closed)
+        change_feed.unsubscribe(live)
@@ -0,0 +1,55 @@
+"""
+流式导出 /export：CSV 和 JSON Lines 的内容与数据库一致，可按专业筛选；
+响应是流式的，按 chunk_rows 分块输出，第一块只含表头和前 chunk_rows 行
+"""
+import csv
+import io
+import json
+from conftest import FIRST_STUDENT_ID
+from app import exporter
+
+
+def test_csv_export(client):
+    response = client.get('/export')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename=students.csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == exporter.EXPORT_COLUMNS
+    assert len(rows) == 601
+    assert rows[1][:3] == [str(FIRST_STUDENT_ID), '学生0', 'male']
+    assert [int(r[0]) for r in rows[1:]] == sorted(int(r[0]) for r in rows[1:])
+
+
+def test_ndjson_export_by_major(client):
+    response = client.get('/export?format=ndjson&major_id=1')
+    assert response.content_type == 'application/x-ndjson; charset=utf-8'
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    # 学号最大的 150 名学生属于第一个专业
+    assert [r['StudentID'] for r in records] == list(range(FIRST_STUDENT_ID + 450, FIRST_STUDENT_ID + 600))
+    assert {r['major_name'] for r in records} == {'专业1'}
+    assert records[0]['StudentBirthday'] == '1995-07-03'
+
+
+def test_bad_requests(client):
+    assert client.get('/export?format=xml').status_code == 400
+    assert client.get('/export?major_id=9999').status_code == 404
+
+
+def test_export_is_streamed(app, client):
+    app.config['EXPORT_BATCH_SIZE'] = 100
+    response = client.get('/export', buffered=False)
+    assert response.is_streamed
+    body = iter(response.response)
+    try:
+        first = next(body)
+        # 第一块只有表头和前 500 行
+        assert first.decode('utf-8').count('\n') == 501
+    finally:
+        response.close()
+
+
+def test_encoders_chunk_rows():
+    rows = [(i, f'学生{i}', 'male', None, 20, None) for i in range(5)]
+    assert [chunk.count('\n') for chunk in exporter.iter_csv(iter(rows), chunk_rows=2)] == [3, 2, 1]  # 第一块含表头
+    assert [chunk.count('\n') for chunk in exporter.iter_ndjson(iter(rows), chunk_rows=2)] == [2, 2, 1]
+    assert list(exporter.iter_csv(iter(rows), chunk_rows=2, header=False))[0].startswith('0,学生0,')
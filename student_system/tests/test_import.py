@@ -0,0 +1,56 @@
+"""
+批量导入：文件读到一半无法解析时返回已导入部分的报告；检查之后出现的学号冲突逐行处理，不会变成500
+"""
+import io
+from types import SimpleNamespace
+from conftest import FIRST_STUDENT_ID, login
+from app import db
+from app import importer
+from app.cache import major_cache
+from app.models import BasicInfo
+
+HEADER = 'StudentID,Name,Gender,StudentBirthday,major_name\n'
+
+
+def csv_rows(first_id, count):
+    return ''.join(f'{first_id + i},导入{i},male,2000-01-01,专业1\n' for i in range(count))
+
+
+def student_count():
+    return db.session.scalar(db.select(db.func.count(BasicInfo.StudentID)))
+
+
+def test_decode_error_returns_partial_report(app):
+    # 文本按块解码，坏字节要放在第一个块之后，前面的批次才会先提交
+    data = (HEADER + csv_rows(1, 400)).encode('utf-8') + b'\xff\xfe\n'
+    with app.app_context():
+        before = student_count()
+        report = importer.import_students(importer.iter_csv_rows(io.BytesIO(data)), batch_size=50)
+        assert report.aborted
+        assert report.inserted > 0
+        assert student_count() - before == report.inserted
+
+
+def test_conflicting_insert_falls_back_to_rows(app, monkeypatch):
+    rows = [(2, {'StudentID': '1', 'Name': '新生', 'Gender': 'male', 'StudentBirthday': '2000-01-01',
+                 'major_name': '专业1'}),
+            (3, {'StudentID': str(FIRST_STUDENT_ID), 'Name': '重复', 'Gender': 'male',
+                 'StudentBirthday': '2000-01-01', 'major_name': '专业1'})]
+    with app.app_context():
+        major_cache.choices()  # 先填好专业缓存
+        # 已存在学号的检查查不到任何学号：相当于检查之后，另一个请求插入了 FIRST_STUDENT_ID
+        monkeypatch.setattr(db.session, 'query', lambda *args: SimpleNamespace(filter=lambda *args: []))
+        report = importer.import_students(iter(rows))
+        assert report.inserted == 1
+        assert report.errors == [(3, FIRST_STUDENT_ID, '学号已存在')]
+        assert db.session.get(BasicInfo, 1).Name == '新生'
+        assert db.session.get(BasicInfo, FIRST_STUDENT_ID).Name == '学生0'
+
+
+def test_import_page_reports_partial_import(client):
+    login(client)
+    data = (HEADER + csv_rows(1, 400)).encode('utf-8') + b'\xff\xfe\n'
+    response = client.post('/import', data={'file': (io.BytesIO(data), 'students.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert '之后无法解析' in response.get_data(as_text=True)
@@ -0,0 +1,73 @@
+"""
+请求级性能统计：直方图分桶与 Prometheus 的 le 语义一致；分位数只按最近的时间窗口计算；
+启用后按端点记录请求数、SQL 条数，输出 Prometheus 文本，慢请求连同 SQL 写入日志
+"""
+import logging
+import re
+import pytest
+from config import TestConfig
+from conftest import login, seed
+from app import create_app, db
+from app.instrumentation import EndpointStats, Histogram, LATENCY_BUCKETS, instrumentation
+
+
+def test_histogram_buckets_and_quantiles():
+    hist = Histogram()
+    for value in (0.005, 0.006, 0.2, 30):
+        hist.observe(value)
+    # 等于上限的值落在该桶（le="0.005"），超过最大上限的值落在 +Inf 桶
+    assert hist.counts[0] == 1 and hist.counts[1] == 1 and hist.counts[-1] == 1
+    assert hist.count == 4 and hist.sum == pytest.approx(30.211)
+    assert hist.quantile(0.5) == 0.01
+    assert hist.quantile(0.99) == LATENCY_BUCKETS[-1]
+    assert Histogram().quantile(0.5) is None
+
+
+def test_rolling_window_drops_old_observations():
+    stats = EndpointStats(window=60, windows=2)
+    record = {'sql_count': 1, 'sql_seconds': 0.0, 'template_seconds': 0.0, 'response_bytes': 0, 'status': 200}
+    stats.observe(dict(record, seconds=5.0), now=0)
+    stats.observe(dict(record, seconds=0.01), now=61)
+    stats.observe(dict(record, seconds=0.01), now=121)
+    assert stats.latency.count == 3
+    assert stats.rolling(now=121).count == 2
+    assert stats.rolling(now=121).quantile(0.99) == 0.01
+
+
+@pytest.fixture
+def instrumented_app():
+    config = type('InstrumentedTestConfig', (TestConfig,), {'INSTRUMENTATION_ENABLED': True, 'SLOW_REQUEST_MS': 0})
+    app = create_app(config)
+    with app.app_context():
+        seed(students=10, majors=2, first_major_students=5)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_requests_are_recorded(instrumented_app, caplog):
+    client = instrumented_app.test_client()
+    before = instrumentation.stats().get('main.index', {}).get('count', 0)
+    with caplog.at_level(logging.WARNING, logger='app.instrumentation'):
+        for _ in range(3):
+            assert client.get('/').status_code == 200
+    stats = instrumentation.stats()['main.index']
+    assert stats['count'] == before + 3
+    assert stats['avg_sql_count'] > 0
+    # SLOW_REQUEST_MS=0：每个请求都写慢请求日志，日志中带有执行的 SQL
+    slow = [r.getMessage() for r in caplog.records if r.getMessage().startswith('慢请求 GET / (main.index)')]
+    assert len(slow) == 3 and 'SELECT' in slow[0]
+
+
+def test_prometheus_output(instrumented_app):
+    client = instrumented_app.test_client()
+    login(client)
+    client.get('/')
+    text = client.get('/metrics?format=prometheus').get_data(as_text=True)
+    buckets = [int(n) for n in re.findall(r'http_request_duration_seconds_bucket\{endpoint="main.index",le="[^"]+"\} (\d+)', text)]
+    count = int(re.search(r'http_request_duration_seconds_count\{endpoint="main.index"\} (\d+)', text).group(1))
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    assert buckets == sorted(buckets) and buckets[-1] == count
+    assert 'student_system_major_cache_hits ' in text
+    assert client.get('/metrics').get_json()['requests']['main.index']['count'] == count
@@ -0,0 +1,31 @@
+"""学生列表每次渲染执行的 SQL 条数与每页条数无关（专业随学生一起 JOIN 查出，不会每行各查一次）"""
+import pytest
+from conftest import login
+
+PAGE_SIZES = (5, 20, 100)
+
+
+def listing_statements(app, client, statements, url):
+    counts = []
+    for per_page in PAGE_SIZES:
+        app.config['STUDENTS_PER_PAGE'] = per_page
+        client.get(url)  # 预热专业缓存、用户缓存
+        statements.take()
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).count('class="student-row"') == per_page
+        counts.append(statements.take())
+    return counts
+
+
+@pytest.mark.parametrize('url', ['/', '/major/1'])
+def test_anonymous_listing_statements_constant(app, client, statements, url):
+    counts = listing_statements(app, client, statements, url)
+    assert len(set(counts)) == 1, counts
+
+
+@pytest.mark.parametrize('url', ['/', '/major/1'])
+def test_logged_in_listing_statements_constant(app, client, statements, url):
+    assert login(client).status_code == 302
+    counts = listing_statements(app, client, statements, url)
+    assert len(set(counts)) == 1, counts
@@ -0,0 +1,74 @@
+"""
+专业列表缓存：缓存命中后页面不再查询专业表；Major 的变更提交后立即失效；
+查询期间发生的失效不会把旧数据写回缓存；命中/未命中计数出现在 /metrics 中
+"""
+from sqlalchemy import event
+from conftest import login
+from app import db
+from app.cache import major_cache
+from app.models import Major
+
+
+def major_statements(engine):
+    """记录查询 majors 表的 SELECT 语句"""
+    seen = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM majors' in statement:
+            seen.append(statement)
+    event.listen(engine, 'before_cursor_execute', record)
+    return seen, lambda: event.remove(engine, 'before_cursor_execute', record)
+
+
+def test_pages_do_not_query_majors_when_cached(app, client):
+    login(client)
+    for url in ('/', '/major/1', '/new'):
+        client.get(url)  # 预热
+    with app.app_context():
+        seen, stop = major_statements(db.engine)
+    try:
+        hits = major_cache.hits
+        for url in ('/', '/major/1', '/new', '/edit/100000'):
+            assert client.get(url).status_code == 200
+    finally:
+        stop()
+    assert seen == []
+    assert major_cache.hits > hits
+
+
+def test_commit_invalidates(app):
+    with app.app_context():
+        assert major_cache.get(1).major_name == '专业1'
+        db.session.get(Major, 1).major_name = '计算机'
+        db.session.commit()
+        assert major_cache.get(1).major_name == '计算机'
+        assert '计算机' in dict(major_cache.choices()).values()
+
+
+def test_invalidation_during_load_is_not_cached(app):
+    with app.app_context():
+        major_cache.invalidate()
+        seen, stop = major_statements(db.engine)
+        invalidated = []
+
+        def invalidate_once(conn, cursor, statement, *args):
+            if 'FROM majors' in statement and not invalidated:
+                invalidated.append(1)  # 相当于查询期间另一个请求提交了专业变更
+                major_cache.invalidate()
+        event.listen(db.engine, 'before_cursor_execute', invalidate_once)
+        try:
+            major_cache.majors()
+            major_cache.majors()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', invalidate_once)
+            stop()
+    # 第一次的结果可能已过时，没有写回缓存，第二次重新查询
+    assert len(seen) == 2
+
+
+def test_counters_in_metrics(client):
+    login(client)
+    client.get('/')
+    stats = client.get('/metrics').get_json()['major_cache']
+    assert set(stats) == {'hits', 'misses', 'invalidations', 'version'}
+    assert stats['misses'] >= 1
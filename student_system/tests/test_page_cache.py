@@ -0,0 +1,72 @@
+"""
+列表页缓存：匿名用户的整页命中时不执行 SQL；学生或专业的变更提交后缓存失效；
+翻页游标是缓存键的一部分；已登录用户只共享学生列表片段，管理员按钮和用户名不会出现在别人的页面中
+"""
+import pytest
+from config import TestConfig
+from conftest import FIRST_STUDENT_ID, login, seed, StatementCounter
+from app import create_app, db
+from app.models import BasicInfo, Major
+from app.page_cache import page_cache
+
+
+@pytest.fixture
+def cached_app():
+    config = type('PageCacheTestConfig', (TestConfig,), {'PAGE_CACHE_ENABLED': True, 'STUDENTS_PER_PAGE': 20})
+    app = create_app(config)
+    with app.app_context():
+        seed()
+        statements = StatementCounter(db.engine)
+    page_cache.invalidate()
+    yield app, statements
+    statements.close()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_anonymous_page_hit_runs_no_sql(cached_app):
+    app, statements = cached_app
+    client = app.test_client()
+    first = client.get('/major/1').get_data()
+    statements.take()
+    hits = page_cache.page_hits
+    assert client.get('/major/1').get_data() == first
+    assert statements.take() == 0
+    assert page_cache.page_hits == hits + 1
+    # 另一页是不同的缓存条目
+    second = client.get(f'/major/1?after={FIRST_STUDENT_ID + 469}').get_data(as_text=True)
+    assert f'student-{FIRST_STUDENT_ID + 470}"' in second and second.encode() != first
+
+
+def test_commit_invalidates(cached_app):
+    app, _ = cached_app
+    client = app.test_client()
+    assert '学生0<' in client.get('/').get_data(as_text=True)
+    with app.app_context():
+        db.session.get(BasicInfo, FIRST_STUDENT_ID).Name = '改名'
+        db.session.commit()
+    html = client.get('/').get_data(as_text=True)
+    assert '改名<' in html and '学生0<' not in html
+
+    with app.app_context():
+        db.session.get(Major, 1).major_name = '计算机'
+        db.session.commit()
+    assert '计算机' in client.get('/major/1').get_data(as_text=True)
+
+
+def test_personal_content_not_shared(cached_app):
+    app, _ = cached_app
+    admin, guest, anonymous = app.test_client(), app.test_client(), app.test_client()
+    login(admin)
+    login(guest, 'guest')
+    assert '删除</a>' in admin.get('/').get_data(as_text=True)
+    fragment_hits = page_cache.fragment_hits
+    html = guest.get('/').get_data(as_text=True)
+    assert 'Ciallo, guest' in html and '删除</a>' not in html
+    guest.get('/')
+    assert page_cache.fragment_hits == fragment_hits + 1
+    html = anonymous.get('/').get_data(as_text=True)
+    assert 'Ciallo' not in html and '删除</a>' not in html
+    # 管理员再次访问命中自己的片段，仍带编辑/删除按钮
+    assert '删除</a>' in admin.get('/').get_data(as_text=True)
@@ -0,0 +1,70 @@
+"""
+学号游标分页：逐页向后、向前翻页都不重复、不遗漏；翻页期间删除的学生不会让下一页跳过或重复；
+列表页的翻页链接带上游标和原有的路径参数
+"""
+import re
+from conftest import FIRST_STUDENT_ID
+from app import db
+from app.models import BasicInfo
+from app.pagination import keyset_paginate
+
+ALL_IDS = list(range(FIRST_STUDENT_ID, FIRST_STUDENT_ID + 600))
+
+
+def ids(page):
+    return [s.StudentID for s in page.items]
+
+
+def test_forward_and_backward_cover_every_row(app):
+    with app.app_context():
+        pages, after = [], None
+        while True:
+            page = keyset_paginate(BasicInfo.query, BasicInfo.StudentID, after=after, per_page=70)
+            pages.append(ids(page))
+            if page.next_cursor is None:
+                break
+            after = page.next_cursor
+        assert sum(pages, []) == ALL_IDS
+        assert all(len(p) == 70 for p in pages[:-1]) and len(pages[-1]) == 600 % 70
+        assert keyset_paginate(BasicInfo.query, BasicInfo.StudentID, per_page=70).prev_cursor is None
+
+        # 从最后一页用 before 游标往回翻，得到同样的分页
+        backward, before = [], page.prev_cursor
+        while before is not None:
+            page = keyset_paginate(BasicInfo.query, BasicInfo.StudentID, before=before, per_page=70)
+            backward.insert(0, ids(page))
+            before = page.prev_cursor
+        assert sum(backward, []) == ALL_IDS[:-(600 % 70)]
+        assert backward[-1] == pages[-2]
+
+
+def test_exact_multiple_has_no_empty_last_page(app):
+    with app.app_context():
+        page = keyset_paginate(BasicInfo.query, BasicInfo.StudentID, after=ALL_IDS[499], per_page=100)
+        assert ids(page) == ALL_IDS[500:]
+        assert page.next_cursor is None
+        assert page.prev_cursor == ALL_IDS[500]
+
+
+def test_row_deleted_between_pages(app):
+    with app.app_context():
+        first = keyset_paginate(BasicInfo.query, BasicInfo.StudentID, per_page=10)
+        # 游标所指的学生（本页最后一行）和下一页的第一行在翻页前被删除
+        db.session.execute(db.delete(BasicInfo).where(BasicInfo.StudentID.in_([ALL_IDS[9], ALL_IDS[10]])))
+        db.session.commit()
+        second = keyset_paginate(BasicInfo.query, BasicInfo.StudentID, after=first.next_cursor, per_page=10)
+        assert ids(second) == ALL_IDS[11:21]
+        back = keyset_paginate(BasicInfo.query, BasicInfo.StudentID, before=second.prev_cursor, per_page=10)
+        assert ids(back) == ALL_IDS[:9]
+        assert back.prev_cursor is None
+
+
+def test_listing_pager_links(app, client):
+    app.config['STUDENTS_PER_PAGE'] = 20
+    html = client.get('/major/1').get_data(as_text=True)
+    next_url = re.search(r'<li class="next"><a href="([^"]+)"', html).group(1)
+    assert next_url.startswith('/major/1?') and 'after=' in next_url
+    assert '<li class="previous">' not in html
+    html = client.get(next_url.replace('&amp;', '&')).get_data(as_text=True)
+    assert 'before=' in re.search(r'<li class="previous"><a href="([^"]+)"', html).group(1)
+    assert html.count('class="student-row"') == 20
@@ -0,0 +1,27 @@
+"""密码哈希线程池排满时抛出 HashQueueFull（不依赖请求上下文），登录请求得到429"""
+import threading
+import pytest
+from conftest import PASSWORD
+from app.passwords import password_hasher, HashQueueFull
+
+
+@pytest.fixture
+def full_queue(app):
+    slots = password_hasher._slots
+    password_hasher._slots = threading.BoundedSemaphore(1)
+    password_hasher._slots.acquire()
+    yield
+    password_hasher._slots = slots
+
+
+def test_full_queue_raises_outside_request(full_queue):
+    with pytest.raises(HashQueueFull):
+        password_hasher.hash(PASSWORD)
+
+
+def test_full_queue_returns_429(client, full_queue):
+    response = client.post('/auth/login', data={'username': 'admin', 'password': PASSWORD})
+    assert response.status_code == 429
+    api = client.post('/auth/login', data={'username': 'admin', 'password': PASSWORD},
+                      headers={'Accept': 'application/json'})
+    assert api.status_code == 429 and api.get_json()['code'] == 429
@@ -0,0 +1,62 @@
+"""
+登录限速按 IP + 用户名计数：别人用错误密码不能把用户锁在登录页外；PROXY_FIX_X_FOR 打开时按 X-Forwarded-For 区分客户端
+每个端点各有一个桶；限速默认关闭
+"""
+import importlib
+import pytest
+import config
+from config import TestConfig
+from conftest import PASSWORD, seed
+from app import create_app, db
+
+
+class LimitedConfig(TestConfig):
+    RATELIMIT_ENABLED = True
+    RATELIMIT_LOGIN = '100/minute'
+    RATELIMIT_LOGIN_USER = '3/minute'
+    PROXY_FIX_X_FOR = 1
+
+
+@pytest.fixture
+def limited_client():
+    app = create_app(LimitedConfig)
+    with app.app_context():
+        seed(students=10, majors=2, first_major_students=5)
+    yield app.test_client()
+    with app.app_context():
+        db.engine.dispose()
+
+
+def attempt(client, ip, password):
+    return client.post('/auth/login', data={'username': 'admin', 'password': password},
+                       headers={'X-Forwarded-For': ip})
+
+
+def test_bad_passwords_do_not_lock_out_other_clients(limited_client):
+    for _ in range(3):
+        assert attempt(limited_client, '203.0.113.1', 'wrong').status_code == 200
+    assert attempt(limited_client, '203.0.113.1', 'wrong').status_code == 429
+    # 同一账号从另一个 IP 登录不受影响
+    assert attempt(limited_client, '203.0.113.2', PASSWORD).status_code == 302
+
+
+def test_endpoints_have_separate_buckets():
+    config = type('ListingLimitConfig', (LimitedConfig,), {'RATELIMIT_LISTING': '2/minute'})
+    app = create_app(config)
+    with app.app_context():
+        seed(students=10, majors=2, first_major_students=5)
+    client = app.test_client()
+    for _ in range(2):
+        assert client.get('/').status_code == 200
+    assert client.get('/').status_code == 429
+    # 首页的额度用完不影响其他列表端点
+    assert client.get('/search').status_code == 200
+    assert client.get('/stats').status_code == 200
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_disabled_unless_configured(monkeypatch):
+    # 没有显式打开时不限速，避免部署在代理后面、还没配置 PROXY_FIX_X_FOR 时所有客户端共用一个桶
+    monkeypatch.delenv('RATELIMIT_ENABLED', raising=False)
+    assert importlib.reload(config).Config.RATELIMIT_ENABLED is False
@@ -0,0 +1,102 @@
+"""
+读写分离：只读请求的查询走只读副本；写请求、use_primary 视图和命令行走主库；
+写入后同一用户的读请求在 REPLICA_STICKY_SECONDS 内读主库；不可用的副本被跳过，全部不可用时读主库
+主库和副本是两个 SQLite 文件，副本中第一个学生的姓名不同，借此区分查询读的是哪个库
+"""
+import shutil
+import sqlite3
+import pytest
+from config import TestConfig
+from conftest import FIRST_STUDENT_ID, login, seed
+from app import create_app, db
+from app.replicas import replicas
+
+
+def make_app(tmp_path, replica_names, sticky=5):
+    primary = tmp_path / 'primary.sqlite3'
+    config = type('ReplicaTestConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{primary}',
+        'SQLALCHEMY_REPLICA_URIS': tuple(f'sqlite:///{tmp_path / name}' for name in replica_names),
+        'REPLICA_STICKY_SECONDS': sticky,
+    })
+    app = create_app(config)
+    with app.app_context():
+        seed(students=10, majors=2, first_major_students=5)
+        db.engine.dispose()
+    replica = tmp_path / 'replica.sqlite3'
+    shutil.copy(primary, replica)
+    with sqlite3.connect(replica) as conn:
+        conn.execute('UPDATE basicinfo SET Name = ? WHERE StudentID = ?', ('副本', FIRST_STUDENT_ID))
+    return app
+
+
+@pytest.fixture
+def cleanup():
+    apps = []
+    yield apps
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+    for engine in replicas.engines:
+        engine.dispose()
+
+
+def edit(client):
+    return client.post(f'/edit/{FIRST_STUDENT_ID + 1}', data={
+        'StudentID': FIRST_STUDENT_ID + 1, 'Name': '改名', 'Gender': 'female', 'StudentBirthday': '1996-02-02',
+        'major': 1})
+
+
+def first_name(client):
+    html = client.get('/').get_data(as_text=True)
+    return '副本' if '副本<' in html else '主库'
+
+
+def test_reads_go_to_replica_until_user_writes(tmp_path, cleanup):
+    app = make_app(tmp_path, ['replica.sqlite3'])
+    cleanup.append(app)
+    client = app.test_client()
+    login(client)
+    assert first_name(client) == '副本'
+    # 编辑页面标记了 use_primary，表单填入主库的数据
+    assert 'value="学生0"' in client.get(f'/edit/{FIRST_STUDENT_ID}').get_data(as_text=True)
+
+    assert edit(client).status_code == 302
+    # 刚写过数据：读主库，看得到自己的修改
+    html = client.get('/').get_data(as_text=True)
+    assert '改名<' in html and '副本<' not in html
+    # 其他用户仍然读副本
+    assert first_name(app.test_client()) == '副本'
+    with app.app_context():
+        # 命令行等非请求上下文读主库
+        assert db.session.execute(db.text('SELECT Name FROM basicinfo WHERE StudentID = :id'),
+                                  {'id': FIRST_STUDENT_ID}).scalar() == '学生0'
+
+
+def test_sticky_reads_expire(tmp_path, cleanup):
+    app = make_app(tmp_path, ['replica.sqlite3'], sticky=0)
+    cleanup.append(app)
+    client = app.test_client()
+    login(client)
+    assert edit(client).status_code == 302
+    assert first_name(client) == '副本'
+
+
+def test_unavailable_replica_is_skipped(tmp_path, cleanup):
+    # 不存在的目录：连接失败
+    app = make_app(tmp_path, ['missing/replica.sqlite3', 'replica.sqlite3'])
+    cleanup.append(app)
+    client = app.test_client()
+    assert [first_name(client) for _ in range(4)] == ['副本'] * 4
+    stats = replicas.stats()['replicas']
+    assert stats[0]['healthy'] is False and stats[0]['reads'] == 0
+    assert stats[1]['reads'] >= 4
+
+
+def test_all_replicas_down_reads_primary(tmp_path, cleanup):
+    app = make_app(tmp_path, ['missing/replica.sqlite3'])
+    cleanup.append(app)
+    primary_reads = replicas.primary_reads
+    assert first_name(app.test_client()) == '主库'
+    assert replicas.primary_reads > primary_reads
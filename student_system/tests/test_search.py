@@ -0,0 +1,50 @@
+"""
+姓名 n-gram 索引：本进程的提交增量更新，其他进程的提交通过表版本号发现后重建；
+首次构建期间的搜索不等待（退回 LIKE 查询）
+"""
+from conftest import FIRST_STUDENT_ID
+from app import db
+from app.models import BasicInfo, TableVersion
+from app.search import NameIndex, name_index, search_query
+
+
+def test_own_commits_update_index_incrementally(app):
+    name_index.invalidate()
+    with app.app_context():
+        assert name_index.search('学生12') == {FIRST_STUDENT_ID + i for i in (12, *range(120, 130))}
+        rebuilds = name_index.rebuilds
+        db.session.get(BasicInfo, FIRST_STUDENT_ID).Name = '张三丰'
+        db.session.commit()
+    with app.app_context():
+        assert name_index.search('三丰') == {FIRST_STUDENT_ID}
+        # 版本号的变化来自本进程已增量应用的提交，不需要重建
+        assert name_index.rebuilds == rebuilds
+
+
+def test_other_process_commit_triggers_rebuild(app):
+    index = NameIndex()
+    with app.app_context():
+        assert index.search('李四') == set()
+        # 另一个 worker 的写入：本进程收不到提交事件，只能看到版本号变化
+        db.session.execute(db.update(BasicInfo).where(BasicInfo.StudentID == FIRST_STUDENT_ID).values(Name='李四'))
+        db.session.execute(db.update(TableVersion).where(TableVersion.table_name == BasicInfo.__tablename__)
+                           .values(version=TableVersion.version + 1))
+        db.session.commit()
+    with app.app_context():
+        assert index.search('李四') == {FIRST_STUDENT_ID}
+        assert index.rebuilds == 2
+
+
+def test_search_does_not_wait_for_first_build(app):
+    index = NameIndex()
+    with app.app_context():
+        with index._build_lock:  # 相当于另一个线程正在构建
+            assert index.search('学生1') is None
+        assert FIRST_STUDENT_ID + 1 in index.search('学生1')
+
+
+def test_search_query_with_index(app):
+    with app.app_context():
+        query = search_query(name='生59', use_name_index=True)
+        assert {s.StudentID for s in query} == {FIRST_STUDENT_ID + i for i in (59, *range(590, 600))}
+
@@ -0,0 +1,88 @@
+"""
+服务端会话（memory / sqlite 后端）：Cookie 中只有随机 id；登录时更换 id 并删除旧数据；
+没有修改会话的请求不写存储；静态文件不读取会话；sqlite 后端的会话在多个进程间共享
+"""
+import pytest
+from config import TestConfig
+from conftest import login, seed
+from app import create_app, db
+
+
+def make_app(backend, path=None):
+    config = type('SessionTestConfig', (TestConfig,), {'SESSION_BACKEND': backend, 'SESSION_SQLITE_PATH': path})
+    app = create_app(config)
+    with app.app_context():
+        seed(students=10, majors=2, first_major_students=5)
+    return app
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def session_app(request, tmp_path):
+    app = make_app(request.param, str(tmp_path / 'sessions.sqlite3'))
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def sid(client):
+    cookie = client.get_cookie('session')
+    return cookie.value if cookie else None
+
+
+def test_login_rotates_session_id(session_app):
+    client = session_app.test_client()
+    store = session_app.session_interface.store
+    login(client)
+    client.get('/auth/logout')  # 退出后会话中还有 flash 消息，id 不变
+    before = sid(client)
+    assert before and len(before) == 32 and store.get(before) is not None
+    assert login(client).status_code == 302
+    after = sid(client)
+    assert after != before
+    assert store.get(before) is None
+    assert client.get('/new').status_code == 200
+
+
+def test_unmodified_session_is_not_saved(session_app):
+    client = session_app.test_client()
+    interface = session_app.session_interface
+    response = client.get('/')
+    assert 'Set-Cookie' not in response.headers and sid(client) is None
+    login(client)
+    client.get('/')  # 取出登录时的 flash 消息
+    saves = interface.saves
+    response = client.get('/')
+    assert interface.saves == saves
+    assert 'Set-Cookie' not in response.headers
+
+
+def test_static_files_skip_session(session_app):
+    client = session_app.test_client()
+    login(client)
+    loads = session_app.session_interface.loads
+    response = client.get('/static/style.css')
+    assert response.status_code == 200
+    assert 'Cookie' not in response.vary
+    assert session_app.session_interface.loads == loads
+
+
+def test_logout_keeps_user_logged_out(session_app):
+    client = session_app.test_client()
+    login(client)
+    client.get('/auth/logout')
+    assert client.get('/new').status_code == 302
+
+
+def test_sqlite_sessions_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'sessions.sqlite3')
+    first, second = make_app('sqlite', path), make_app('sqlite', path)
+    client = first.test_client()
+    login(client)
+    # 另一个 worker（独立的应用和数据库连接）带着同一个 Cookie 也能认出登录用户
+    other = second.test_client()
+    other.set_cookie('session', sid(client))
+    assert other.get('/new').status_code == 200
+    for app in (first, second):
+        with app.app_context():
+            db.engine.dispose()
@@ -0,0 +1,29 @@
+"""
+启动耗时预算：在新的解释器中测量导入应用和 create_app() 的耗时（benchmarks/startup.py，取多次的中位数）
+预算可以用环境变量按机器调整；超出预算说明启动路径上多了昂贵的导入或初始化
+"""
+import os
+import click
+from config import TestConfig
+from app import create_app
+from benchmarks.startup import measure
+
+IMPORT_BUDGET_MS = float(os.environ.get('STARTUP_IMPORT_BUDGET_MS') or 1500)
+CREATE_APP_BUDGET_MS = float(os.environ.get('STARTUP_CREATE_APP_BUDGET_MS') or 500)
+APP_IMPORT_BUDGET_MS = float(os.environ.get('STARTUP_APP_IMPORT_BUDGET_MS') or 150)
+
+
+def test_startup_within_budget():
+    summary = measure(runs=3)
+    assert summary['import_ms'] <= IMPORT_BUDGET_MS, summary
+    assert summary['create_app_ms'] <= CREATE_APP_BUDGET_MS, summary
+    assert summary['app_import_ms'] <= APP_IMPORT_BUDGET_MS, summary['app_modules_ms']
+
+
+def test_cli_commands_skip_template_warmup():
+    with click.Context(click.Command('create-indexes'), info_name='create-indexes'):
+        app = create_app(TestConfig)
+    assert len(app.jinja_env.cache) == 0
+    with click.Context(click.Command('run'), info_name='run'):
+        app = create_app(TestConfig)
+    assert len(app.jinja_env.cache) > 0
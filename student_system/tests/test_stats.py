@@ -0,0 +1,59 @@
+"""
+统计计数器：提交事件增量维护；加载期间的提交和旧值未知的修改都会让计数器重新加载，不会算错
+"""
+from datetime import date
+from sqlalchemy import event
+from conftest import FIRST_STUDENT_ID
+from app import db
+from app.events import ChangeEvent
+from app.models import BasicInfo
+from app.stats import student_stats
+
+
+def test_incremental_counts(app):
+    student_stats.invalidate()
+    with app.app_context():
+        before = student_stats.summary()
+        loads = student_stats.loads
+        db.session.delete(db.session.get(BasicInfo, FIRST_STUDENT_ID))
+        db.session.commit()
+    with app.app_context():
+        after = student_stats.summary()
+    assert after['total'] == before['total'] - 1
+    assert student_stats.loads == loads
+
+
+def test_expired_previous_value_reloads(app):
+    student_stats.invalidate()
+    with app.app_context():
+        before = student_stats.summary()['gender']
+        stud = db.session.get(BasicInfo, FIRST_STUDENT_ID)  # 学号最小的学生是男生
+        db.session.expire(stud, ['Gender'])
+        stud.Gender = 'female'  # 没有加载旧值，提交事件中的旧值为 None
+        db.session.commit()
+    with app.app_context():
+        after = student_stats.summary()['gender']
+    assert after == {'male': before['male'] - 1, 'female': before['female'] + 1}
+
+
+def test_commit_during_load_is_not_lost(app):
+    student_stats.invalidate()
+    with app.app_context():
+        committed = []
+
+        def concurrent_commit(conn, cursor, statement, *args):
+            if 'GROUP BY' in statement and not committed:
+                # 相当于 GROUP BY 执行期间另一个线程提交了一名新学生
+                committed.append(1)
+                student_stats.apply([ChangeEvent('created', BasicInfo, 1, {
+                    'StudentID': 1, 'major_id': None, 'Gender': 'male', 'StudentBirthday': date(2000, 1, 1)}, None)])
+
+        event.listen(db.engine, 'before_cursor_execute', concurrent_commit)
+        try:
+            student_stats.summary()
+            loads = student_stats.loads
+            student_stats.summary()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', concurrent_commit)
+    # 无法确定查询结果是否包含那次提交，下次读取时重新加载
+    assert student_stats.loads == loads + 1
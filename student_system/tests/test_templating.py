@@ -0,0 +1,45 @@
+"""
+模板字节码缓存和预编译：第一个进程编译模板并写入缓存目录，之后的进程直接读取字节码；
+模板源码改变后缓存的字节码不再使用；预编译覆盖应用自身和 flask_bootstrap 的模板
+"""
+from jinja2 import DictLoader, Environment
+from config import TestConfig
+from app import create_app
+from app.templating import CountingBytecodeCache, template_warmup
+
+
+def make_app(cache_dir):
+    config = type('TemplateCacheTestConfig', (TestConfig,), {'TEMPLATE_BYTECODE_CACHE': True,
+                                                             'TEMPLATE_CACHE_DIR': str(cache_dir)})
+    return create_app(config)
+
+
+def test_bytecode_shared_between_processes(tmp_path):
+    first = make_app(tmp_path).jinja_env.bytecode_cache
+    assert first.hits == 0 and first.misses == template_warmup.templates
+    assert len(list(tmp_path.iterdir())) == template_warmup.templates
+
+    second = make_app(tmp_path).jinja_env.bytecode_cache
+    assert second.misses == 0 and second.hits == template_warmup.templates
+
+
+def test_changed_source_is_recompiled(tmp_path):
+    cache = CountingBytecodeCache(str(tmp_path))
+
+    def load(source):
+        Environment(loader=DictLoader({'page.html': source}), bytecode_cache=cache).get_template('page.html')
+
+    load('<p>{{ name }}</p>')
+    load('<p>{{ name }}</p>')
+    assert (cache.misses, cache.hits) == (1, 1)
+    load('<p>{{ name|upper }}</p>')  # 源码校验和不同，不使用旧的字节码
+    assert (cache.misses, cache.hits) == (2, 1)
+
+
+def test_warmup_compiles_all_templates():
+    app = create_app(TestConfig)
+    names = [n for n in app.jinja_env.list_templates() if n.endswith('.html')]
+    assert template_warmup.templates == len(names)
+    assert any(n.startswith('bootstrap/') for n in names)
+    assert len(app.jinja_env.cache) >= len(names)
+    assert app.test_client().get('/auth/login').status_code == 200
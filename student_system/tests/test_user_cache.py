@@ -0,0 +1,19 @@
+"""已登录用户的缓存：后续请求不再查询用户表，本进程修改角色时立即失效"""
+from conftest import login
+from app import db
+from app.models import User, user_cache
+
+
+def test_cached_user_until_role_change(app, client):
+    user_cache.clear()
+    login(client)
+    assert client.get('/import').status_code == 200
+    hits = user_cache.hits
+    assert client.get('/import').status_code == 200
+    assert user_cache.hits > hits
+
+    with app.app_context():
+        db.session.execute(db.select(User).filter_by(username='admin')).scalar_one().role = 'guest'
+        db.session.commit()
+    # 降级后的管理员不能再进入导入页面
+    assert client.get('/import').status_code == 302